@@ -0,0 +1,91 @@
+"""Benchmark da leitura de pacotes: leitura direta do status do dpkg x dpkg-query.
+
+Gera um arquivo de status sintético (com descrições longas, dependências e
+pacotes multi-arch, como um status real) em uma pasta temporária e mede:
+
+  - packages.read_dpkg_status(): leitura direta do arquivo (usada sem dpkg-query);
+  - packages.read_dpkg_query(): dpkg-query --admindir=<pasta> -W, a primeira
+    leitura normal (se o dpkg-query estiver instalado), conferindo que os dois
+    caminhos listam os mesmos pacotes, versões e arquiteturas na mesma ordem;
+  - packages.read_cached(): nova leitura com o arquivo inalterado.
+
+  python bench_packages.py --packages 20000 --rounds 5
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import packages
+
+ARCHITECTURES = ['amd64', 'amd64', 'amd64', 'all', 'i386']
+SECTIONS = ['libs', 'utils', 'admin', 'net', 'devel', 'python', 'x11']
+
+
+def write_status(path, count, seed=42):
+    """Grava um arquivo de status do dpkg com 'count' pacotes sintéticos (e o próprio dpkg)."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        names = ['dpkg'] + [f"pkg-{rng.choice(SECTIONS)}-{index:06d}" for index in range(count - 1)]
+        for name in names:
+            architecture = 'amd64' if name == 'dpkg' else rng.choice(ARCHITECTURES)
+            status = 'install ok installed' if rng.random() > 0.02 else 'deinstall ok config-files'
+            f.write(f"Package: {name}\nStatus: {status}\nPriority: optional\nSection: {rng.choice(SECTIONS)}\n"
+                    f"Installed-Size: {rng.randint(10, 90000)}\nMaintainer: Equipe <pkg@example.org>\n"
+                    f"Architecture: {architecture}\n")
+            if architecture != 'all' and rng.random() < 0.4:
+                f.write("Multi-Arch: same\n")
+            f.write(f"Version: {rng.randint(0, 9)}.{rng.randint(0, 40)}-{rng.randint(1, 9)}\n"
+                    f"Depends: libc6 (>= 2.34), libssl3 (>= 3.0.0), zlib1g (>= 1:1.1.4)\n"
+                    f"Description: pacote sintético {name}\n")
+            for _ in range(rng.randint(2, 8)):
+                f.write(" Texto longo da descrição, como nos pacotes reais, que a leitura precisa pular.\n")
+            f.write("\n")
+
+
+def timed(function, rounds):
+    durations = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+def print_timing(title, durations):
+    print(f"{title:<40} mediana {statistics.median(durations) * 1000:9.2f} ms   "
+          f"mín {min(durations) * 1000:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura do banco de pacotes do dpkg.")
+    parser.add_argument('--packages', type=int, default=20000, help="quantidade de pacotes no status sintético")
+    parser.add_argument('--rounds', type=int, default=5, help="repetições de cada medida")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as admindir:
+        status = os.path.join(admindir, 'status')
+        write_status(status, args.packages, args.seed)
+        print(f"Status sintético: {args.packages} pacotes, {os.path.getsize(status) / 1024 / 1024:.1f} MB")
+
+        native, durations = timed(lambda: packages.read_dpkg_status(status), args.rounds)
+        print_timing("Leitura direta (read_dpkg_status)", durations)
+        if shutil.which('dpkg-query'):
+            query, durations = timed(lambda: packages.read_dpkg_query(status), args.rounds)
+            print_timing("Subprocesso (read_dpkg_query)", durations)
+            same = query == native
+            print(f"Mesmos pacotes, versões e ordem do dpkg-query: {'sim' if same else 'NÃO'} ({len(native)} pacotes)")
+        else:
+            print("dpkg-query não instalado: comparação com o subprocesso ignorada.")
+        packages.read_cached(status, packages.read_dpkg)
+        _, durations = timed(lambda: packages.read_cached(status, packages.read_dpkg), args.rounds)
+        print_timing("Leitura com o arquivo inalterado (cache)", durations)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,190 +1,317 @@
 import platform
-import psutil
 import socket
 import uuid
 import re
 import json
-import requests
 import datetime
 import subprocess
 import os
+import sys
 import getpass
-
-try:
-    import wmi
-except ImportError:
-    # Se a importação falhar (não está no Windows ou não está instalado), wmi será None
-    wmi = None
+import gzip
+import argparse
+import collections
+import random
+import sqlite3
+from contextlib import closing
+import threading
+import time
+
+# Conexões WMI, leituras de /sys e comandos compartilhados entre as coletas
+import sessions
+import smart
+# Seções do documento e hash de cada uma, compartilhados com o servidor
+from inventory_sections import SECTIONS, section_hash
+
+# Módulos pesados (psutil, requests, zstandard, wmi) são importados só na função
+# que os usa: o agente roda com frequência em milhares de máquinas e caminhos
+# que não coletam ou não enviam (--help, --replay, --benchmark) não pagam por eles.
+# O orçamento de tempo de importação é conferido por agent/verify_imports.py.
 
 # IMPORTANTE: Altere para o IP do seu servidor se não estiver rodando na mesma máquina
 API_URL = "http://127.0.0.1:5000/api/inventory"
 
-
-def get_device_model():
+# Compressão do corpo enviado à API: "zstd", "gzip" ou "identity" (sem compressão).
+# Se o servidor recusar a codificação (415), o envio cai para uma que ele aceite.
+# zstd é opcional: sem o pacote 'zstandard' o envio usa gzip.
+PAYLOAD_ENCODING = "zstd"
+
+# Hashes das seções enviadas com sucesso na última execução
+SECTION_HASHES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.section_hashes.json')
+
+# Tempo máximo (segundos) de cada coleta; uma coleta travada (ex.: "sudo smartctl")
+# é abandonada com status "timeout" e o relatório segue com o valor padrão dela.
+PROBE_TIMEOUT_DEFAULT = 20
+PROBE_TIMEOUTS = {
+    'installed_software': 60,
+    'windows_update_status': 60,
+    'storage_health': 30,
+}
+
+# SMART: os discos são lidos em paralelo, cada um com seu timeout. A coleta inteira
+# tem um prazo menor que o timeout dela: discos que não responderem até lá (ex.: mais
+# discos lentos que threads) entram como "Erro" sem descartar os que já responderam.
+SMART_TIMEOUT = 15
+SMART_MAX_WORKERS = 8
+SMART_DEADLINE = 25
+
+# Módulos cuja importação é medida pelo --profile
+HEAVY_MODULES = ('psutil', 'requests', 'wmi')
+
+# Cache local das coletas: o resultado é reaproveitado até vencer o prazo
+# (segundos) da coleta. Coletas fora desta tabela (discos, IP, monitores,
+# saúde do armazenamento) rodam em toda execução.
+PROBE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.probe_cache.json')
+HOUR = 3600
+DAY = 24 * HOUR
+PROBE_CACHE_TTLS = {
+    'serial_number': 7 * DAY,
+    'device_model': 7 * DAY,
+    'os_info': 7 * DAY,
+    'ram_slots': 7 * DAY,
+    'gpu_info': 7 * DAY,
+    'windows_update_status': HOUR,
+    'installed_software': HOUR,
+}
+# Arquivos que invalidam o cache da coleta quando mudam (data de modificação e tamanho).
+# Todo o cache também é descartado quando a máquina reinicia.
+PROBE_CACHE_FILES = {
+    'installed_software': ('/var/lib/dpkg/status', '/var/lib/rpm/rpmdb.sqlite', '/var/lib/rpm/Packages'),
+}
+# Diferença (segundos) no horário de boot aceita como a mesma inicialização
+BOOT_TIME_TOLERANCE = 5
+
+# Modo daemon (--daemon): intervalo padrão entre envios e variação aleatória
+# (fração do intervalo) para que as máquinas não enviem todas no mesmo minuto.
+# Um pedido de espera do servidor ('next_report_after', sob carga) só alonga o intervalo.
+DAEMON_INTERVAL = 4 * HOUR
+DAEMON_JITTER = 0.2
+DAEMON_MIN_INTERVAL = 60
+DAEMON_MAX_INTERVAL = 7 * DAY
+
+# Spool local: todo relatório é gravado aqui antes do envio e só sai depois que o
+# servidor o aceita, então um relatório feito fora da rede não se perde. Por padrão
+# só o relatório mais recente de cada host é mantido (os anteriores ficam obsoletos);
+# com SPOOL_KEEP_HISTORY todos são reenviados, em ordem, para o histórico do servidor.
+SPOOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.spool.db')
+SPOOL_KEEP_HISTORY = False
+SPOOL_MAX_AGE = 30 * DAY
+SPOOL_MAX_BYTES = 50 * 1024 * 1024
+# Espera (segundos) do daemon após uma falha de envio; dobra a cada nova falha
+SPOOL_RETRY_BASE = 60
+
+
+# Registro das coletas: nome -> Probe. Cada coleta recebe as sessões compartilhadas
+# ('ctx', ver sessions.py) e pode lançar exceções: quem executa registra o status
+# e usa o valor padrão.
+Probe = collections.namedtuple('Probe', 'function default uses_wmi')
+PROBES = {}
+
+
+def probe(name, default="Desconhecido", uses_wmi=False):
+    """Registra a função decorada como a coleta 'name'."""
+    def register(function):
+        PROBES[name] = Probe(function, default, uses_wmi)
+        return function
+    return register
+
+
+@probe('device_model', uses_wmi=True)
+def get_device_model(ctx):
     """Obtém o modelo do aparelho (ex: Dell Latitude, Lenovo ThinkPad)."""
-    uname = platform.uname()
-    if uname.system == "Windows" and wmi:
-        try:
-            c = wmi.WMI()
-            cs = c.Win32_ComputerSystem()[0]
-            manufacturer = cs.Manufacturer.strip()
-            model = cs.Model.strip()
-            return f"{manufacturer} {model}"
-        except Exception:
-            return "Desconhecido"
-    elif uname.system == "Linux":
-        try:
-            with open("/sys/class/dmi/id/sys_vendor", "r") as f:
-                manufacturer = f.read().strip()
-            with open("/sys/class/dmi/id/product_name", "r") as f:
-                model = f.read().strip()
-            return f"{manufacturer} {model}"
-        except Exception:
-            return "Desconhecido"
+    if ctx.system == "Windows" and ctx.has_wmi:
+        cs = ctx.wmi.query('Win32_ComputerSystem')[0]
+        manufacturer = cs.Manufacturer.strip()
+        model = cs.Model.strip()
+        return f"{manufacturer} {model}"
+    elif ctx.system == "Linux":
+        manufacturer = ctx.sysfs.read("/sys/class/dmi/id/sys_vendor")
+        model = ctx.sysfs.read("/sys/class/dmi/id/product_name")
+        return f"{manufacturer} {model}"
     else:
         return "Desconhecido"
 
 
-def get_serial_number():
+@probe('serial_number', uses_wmi=True)
+def get_serial_number(ctx):
     """Obtém o número de série do dispositivo."""
-    try:
-        if platform.system() == "Windows" and wmi:
-            c = wmi.WMI()
-            bios = c.Win32_BIOS()[0]
-            return bios.SerialNumber.strip()
-        elif platform.system() == "Linux":
-            try:
-                with open("/sys/class/dmi/id/product_serial", "r") as f:
-                    return f.read().strip()
-            except Exception:
-                return "Desconhecido"
-        else:
-            return "Desconhecido"
-    except Exception:
+    if ctx.system == "Windows" and ctx.has_wmi:
+        bios = ctx.wmi.query('Win32_BIOS')[0]
+        return bios.SerialNumber.strip()
+    elif ctx.system == "Linux":
+        return ctx.sysfs.read("/sys/class/dmi/id/product_serial")
+    else:
         return "Desconhecido"
 
 
-def get_ram_slots():
+@probe('os_info', default=None, uses_wmi=True)
+def get_os_info(ctx):
+    """Retorna o sistema operacional, a arquitetura e o modelo da CPU."""
+    if ctx.system == "Windows" and ctx.has_wmi:
+        os_info = ctx.wmi.query('Win32_OperatingSystem')[0]
+        cpu_info = ctx.wmi.query('Win32_Processor')[0]
+        return {'os': os_info.Caption.strip(), 'architecture': os_info.OSArchitecture.strip(),
+                'cpu_model': cpu_info.Name.strip()}
+    return basic_os_info()
+
+
+def basic_os_info():
+    """Sistema operacional, arquitetura e CPU pelo módulo 'platform' (sem WMI)."""
+    uname = platform.uname()
+    name = f"Windows {uname.release}" if uname.system == "Windows" else f"{uname.system} {uname.release}"
+    return {'os': name, 'architecture': uname.machine, 'cpu_model': platform.processor()}
+
+
+@probe('ram_slots', uses_wmi=True)
+def get_ram_slots(ctx):
     """Obtém informações sobre os slots de RAM."""
-    try:
-        if platform.system() == "Windows" and wmi:
-            c = wmi.WMI()
-            slots = c.Win32_PhysicalMemory()
-            return f"{len(slots)} slots ocupados"
-        elif platform.system() == "Linux":
-            try:
-                output = subprocess.check_output(
-                    "dmidecode -t memory | grep -i 'Locator'", shell=True, stderr=subprocess.DEVNULL).decode()
-                slots = [line for line in output.splitlines() if line.strip()]
-                return f"{len(slots)} slots ocupados"
-            except Exception:
-                return "Desconhecido"
-        else:
-            return "Não disponível"
-    except Exception:
-        return "Desconhecido"
+    if ctx.system == "Windows" and ctx.has_wmi:
+        slots = ctx.wmi.query('Win32_PhysicalMemory')
+        return f"{len(slots)} slots ocupados"
+    elif ctx.system == "Linux":
+        output = ctx.commands.run(['dmidecode', '-t', 'memory'])
+        slots = [line for line in output.splitlines() if 'locator' in line.lower()]
+        return f"{len(slots)} slots ocupados"
+    else:
+        return "Não disponível"
 
 
-def get_installed_software():
-    """Obtém uma lista de softwares instalados."""
+@probe('disks', default=[])
+def get_disks(ctx):
+    """Lista as partições montadas com o uso de cada uma."""
+    import psutil
+    disks = []
+    for particao in psutil.disk_partitions():
+        if 'loop' in particao.opts or particao.fstype == '':
+            continue
+        try:
+            uso = psutil.disk_usage(particao.mountpoint)
+            disks.append({
+                'device': particao.device, 'mountpoint': particao.mountpoint,
+                'total_gb': round(uso.total / (1024**3), 2),
+                'used_gb': round(uso.used / (1024**3), 2), 'percent_used': uso.percent
+            })
+        except PermissionError:
+            continue
+    return disks
+
+
+@probe('ip_address', default='127.0.0.1')
+def get_ip_address(ctx):
     try:
-        if platform.system() == "Windows":
-            try:
-                output = subprocess.check_output(
-                    'powershell -Command "Get-ItemProperty HKLM:\\Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\* | Select-Object DisplayName | Format-Table -HideTableHeaders"',
-                    shell=True, stderr=subprocess.DEVNULL
-                ).decode(errors='ignore')
-                lines = [line.strip()
-                         for line in output.splitlines() if line.strip()]
-                return "; ".join(lines) if lines else "Nenhum"
-            except Exception:
-                return "Não disponível"
-        elif platform.system() == "Linux":
-            try:
-                output = subprocess.check_output(
-                    "dpkg-query -W -f='${binary:Package}\\n'", shell=True, stderr=subprocess.DEVNULL).decode()
-                lines = [line.strip()
-                         for line in output.splitlines() if line.strip()]
-                return "; ".join(lines) if lines else "Nenhum"
-            except Exception:
-                return "Não disponível"
-        else:
-            return "Não disponível"
-    except Exception:
-        return "Desconhecido"
+        return socket.gethostbyname(socket.gethostname())
+    except socket.gaierror:
+        return '127.0.0.1'
+
+
+@probe('storage_health', default=[], uses_wmi=True)
+def get_storage_health(ctx):
+    """Saúde de cada disco: lista de dicionários no formato de smart.parse_smartctl().
+
+    Sem o smartmontools no Linux retorna o texto smart.NOT_INSTALLED em vez da lista.
+    """
+    if ctx.system == "Windows" and ctx.has_wmi:
+        return [{'device': getattr(d, 'DeviceID', None) or f"disk{index}",
+                 'model': (getattr(d, 'Model', None) or '').strip() or None,
+                 'serial': (getattr(d, 'SerialNumber', None) or '').strip() or None,
+                 'health': getattr(d, 'Status', 'Desconhecido')}
+                for index, d in enumerate(ctx.wmi.query('Win32_DiskDrive'))]
+    elif ctx.system == "Linux":
+        if not ctx.commands.which('smartctl'):
+            return smart.NOT_INSTALLED
+        names = ctx.sysfs.list('/sys/block')
+        devices = smart.block_devices(names)
+        if not devices:
+            return smart.no_smart_devices(names)
+        # Um smartctl por disco, todos ao mesmo tempo: o tempo total é o do disco mais lento
+        from concurrent.futures import ThreadPoolExecutor, wait
+        pool = ThreadPoolExecutor(max_workers=min(len(devices), SMART_MAX_WORKERS))
+        futures = {device: pool.submit(read_smart, ctx, device) for device in devices}
+        done, _ = wait(futures.values(), timeout=SMART_DEADLINE)
+        # Não espera os atrasados: o timeout de cada smartctl encerra os que já começaram
+        pool.shutdown(wait=False, cancel_futures=True)
+        return [future.result() if future in done
+                else {'device': device, 'health': "Erro", 'error': f"sem resposta em {SMART_DEADLINE}s"}
+                for device, future in futures.items()] + smart.no_smart_devices(names)
+    else:
+        return []
 
 
-def get_storage_health():
-    """Retorna informações básicas sobre saúde do armazenamento."""
+def read_smart(ctx, device):
+    """SMART de um disco; falhas e timeouts viram uma entrada com health 'Erro'."""
+    # 'sudo -n' falha na hora em vez de ficar esperando uma senha
+    command = ['sudo', '-n', 'smartctl', '-H', '-A', '-i', '-j', device]
     try:
-        if platform.system() == "Windows" and wmi:
-            c = wmi.WMI()
-            disks = c.Win32_DiskDrive()
-            health = []
-            for d in disks:
-                status = getattr(d, 'Status', 'Desconhecido')
-                health.append(f"{d.Model.strip()}: {status}")
-            return "; ".join(health) if health else "Desconhecido"
-        elif platform.system() == "Linux":
-            try:
-                output = subprocess.check_output(
-                    ['which', 'smartctl'], stderr=subprocess.DEVNULL).decode().strip()
-                if output:
-                    result = subprocess.check_output(
-                        ['sudo', 'smartctl', '-H', '/dev/sda'], stderr=subprocess.DEVNULL).decode()
-                    for line in result.splitlines():
-                        if "SMART overall-health self-assessment test result" in line:
-                            return line.split(":")[-1].strip()
-                    return "Sem informação SMART"
-                else:
-                    return "smartctl não instalado"
-            except Exception:
-                return "Desconhecido"
-        else:
-            return "Desconhecido"
-    except Exception:
-        return "Desconhecido"
+        return smart.parse_smartctl(ctx.commands.run(command, timeout=SMART_TIMEOUT, check=False), device)
+    except subprocess.TimeoutExpired:
+        return {'device': device, 'health': "Erro", 'error': f"timeout de {SMART_TIMEOUT}s"}
+    except (OSError, ValueError) as e:
+        return {'device': device, 'health': "Erro", 'error': str(e)}
 
 
-def get_gpu_info():
+@probe('gpu_info', uses_wmi=True)
+def get_gpu_info(ctx):
     """Retorna informações sobre GPU instalada."""
-    try:
-        if platform.system() == "Windows" and wmi:
-            c = wmi.WMI()
-            gpus = c.Win32_VideoController()
-            return "; ".join([g.Name for g in gpus]) if gpus else "Nenhuma GPU detectada"
-        elif platform.system() == "Linux":
-            try:
-                output = subprocess.check_output(
-                    "lspci | grep VGA", shell=True, stderr=subprocess.DEVNULL).decode()
-                return output.strip() if output else "Nenhuma GPU detectada"
-            except Exception:
-                return "Desconhecido"
-        else:
-            return "Desconhecido"
-    except Exception:
+    if ctx.system == "Windows" and ctx.has_wmi:
+        gpus = ctx.wmi.query('Win32_VideoController')
+        return "; ".join([g.Name for g in gpus]) if gpus else "Nenhuma GPU detectada"
+    elif ctx.system == "Linux":
+        output = "\n".join(line for line in ctx.commands.run(['lspci']).splitlines() if 'VGA' in line)
+        return output.strip() if output else "Nenhuma GPU detectada"
+    else:
         return "Desconhecido"
 
 
-def get_windows_update_status():
+@probe('windows_update_status', uses_wmi=True)
+def get_windows_update_status(ctx):
     """Retorna status do Windows Update (apenas Windows)."""
-    try:
-        if platform.system() == "Windows" and wmi:
-            c = wmi.WMI(namespace='root\\cimv2')
-            wu = c.Win32_QuickFixEngineering()
-            return f"{len(wu)} atualizações instaladas"
-        else:
-            return "Não aplicável"
-    except Exception:
-        return "Desconhecido"
+    if ctx.system == "Windows" and ctx.has_wmi:
+        wu = ctx.wmi.query('Win32_QuickFixEngineering')
+        return f"{len(wu)} atualizações instaladas"
+    else:
+        return "Não aplicável"
+
+
+@probe('installed_software', default="Não disponível")
+def get_installed_software(ctx):
+    """Obtém a lista de softwares instalados, com a versão de cada um ({'name', 'version'})."""
+    timeout = PROBE_TIMEOUTS['installed_software']
+    if ctx.system == "Windows":
+        output = ctx.commands.run(
+            ['powershell', '-NoProfile', '-Command',
+             'Get-ItemProperty HKLM:\\Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\* | '
+             'Where-Object DisplayName | ForEach-Object { "$($_.DisplayName)`t$($_.DisplayVersion)" }'],
+            timeout=timeout)
+    elif ctx.system == "Linux":
+        try:
+            # Pacotes do dpkg/RPM com cache pela data do banco (ver packages.py)
+            return [{'name': package['name'], 'version': package.get('version')}
+                    for package in ctx.packages.installed() if package.get('name')]
+        except OSError:
+            # Banco não legível (ex.: RPM antigo em Berkeley DB): pergunta ao gerenciador de pacotes
+            if ctx.commands.which('dpkg-query'):
+                output = ctx.commands.run(['dpkg-query', '-W', '-f=${binary:Package}\\t${Version}\\n'],
+                                          timeout=timeout)
+            else:
+                output = ctx.commands.run(['rpm', '-qa', '--qf', '%{NAME}\\t%{VERSION}-%{RELEASE}\\n'],
+                                          timeout=timeout)
+    else:
+        return "Não disponível"
+    packages = []
+    for line in output.splitlines():
+        name, _, version = line.partition('\t')
+        if name.strip():
+            packages.append({'name': name.strip(), 'version': version.strip() or None})
+    return packages
+
 
-def get_monitor_info():
+@probe('monitors', default="Nenhum monitor detectado", uses_wmi=True)
+def get_monitor_info(ctx):
     """Retorna uma lista de dicionários com informações sobre cada monitor conectado."""
     monitors = []
     try:
-        if platform.system() == "Windows" and wmi:
-            c = wmi.WMI(namespace='root\\wmi')
-            monitor_info = c.WmiMonitorID()
+        if ctx.system == "Windows" and ctx.has_wmi:
+            monitor_info = ctx.wmi.query('WmiMonitorID', namespace='root\\wmi')
             for monitor in monitor_info:
                 manufacturer = "".join(
                     chr(i) for i in monitor.ManufacturerName if i != 0).strip()
@@ -199,10 +326,9 @@ def get_monitor_info():
                 })
             return monitors if monitors else "Nenhum monitor detectado"
 
-        elif platform.system() == "Linux":
+        elif ctx.system == "Linux":
             try:
-                output = subprocess.check_output(
-                    "xrandr", shell=True, stderr=subprocess.DEVNULL).decode()
+                output = ctx.commands.run(['xrandr'])
                 connected_monitors = [
                     line for line in output.splitlines() if " connected " in line]
                 for line in connected_monitors:
@@ -222,13 +348,100 @@ def get_monitor_info():
                 return "xrandr não disponível"
         else:
             return "Não disponível neste SO"
-            
+
     # ALTERAÇÃO PRINCIPAL AQUI: Capturamos o erro 'e' e o exibimos.
     except Exception as e:
         return f"Erro ao obter informações do monitor: {e}"
 
-def get_inventory_data():
-    """Coleta todos os dados de hardware e software da máquina local."""
+
+def _run_group(names, ctx, outcomes, com=False):
+    """Executa as coletas 'names' em sequência, registrando o resultado de cada uma."""
+    if com:
+        # O WMI (COM) precisa ser inicializado na thread que o utiliza
+        import pythoncom
+        pythoncom.CoInitialize()
+    try:
+        for name in names:
+            outcome = {}
+            start = time.monotonic()
+            try:
+                outcome.update(status='ok', value=PROBES[name].function(ctx))
+            except subprocess.TimeoutExpired as e:
+                outcome.update(status='timeout', error=str(e))
+            except Exception as e:
+                outcome.update(status='error', error=f"{type(e).__name__}: {e}")
+            outcome['seconds'] = round(time.monotonic() - start, 3)
+            outcomes[name] = outcome
+    finally:
+        if com:
+            pythoncom.CoUninitialize()
+
+
+def _probe_groups(ctx, names):
+    """Divide as coletas em grupos de (nomes, usa COM), cada grupo na sua thread.
+
+    No Windows as coletas WMI dividem uma única conexão e por isso formam um só
+    grupo, que roda em sequência; as demais ficam cada uma no seu grupo.
+    """
+    serial = [name for name in names if PROBES[name].uses_wmi and ctx.has_wmi and ctx.serialize_wmi]
+    groups = [(serial, True)] if serial else []
+    return groups + [([name], False) for name in names if name not in serial]
+
+
+def _start_group(group, target, args, deadlines):
+    """Inicia a thread (daemon) de um grupo e registra em 'deadlines' o prazo de cada coleta dele."""
+    thread = threading.Thread(target=target, args=args, name=f"probe-{group[0]}", daemon=True)
+    thread.start()
+    # Em um grupo sequencial o prazo de cada coleta soma os das anteriores
+    deadline = time.monotonic()
+    for name in group:
+        deadline += PROBE_TIMEOUTS.get(name, PROBE_TIMEOUT_DEFAULT)
+        deadlines[name] = (thread, deadline)
+
+
+def _wait_probe(name, results, deadlines):
+    """Aguarda o resultado de 'name' em 'results' até o prazo da coleta (None se não chegou)."""
+    thread, deadline = deadlines[name]
+    while name not in results and thread.is_alive() and time.monotonic() < deadline:
+        thread.join(min(0.05, max(0, deadline - time.monotonic())))
+    return results.get(name)
+
+
+def run_probes(ctx, names=None):
+    """Executa as coletas ao mesmo tempo, cada uma limitada ao seu timeout.
+
+    No Windows as coletas WMI dividem uma única conexão e por isso rodam em
+    sequência numa mesma thread; as demais rodam cada uma na sua.
+    Retorna (valores, status): coletas com erro ou timeout ficam com o valor
+    padrão e o status registra 'ok', 'timeout' ou 'error' e a duração. As threads
+    são daemon, então uma coleta travada não impede o agente de terminar.
+    """
+    names = list(names or PROBES)
+    outcomes = {}
+    deadlines = {}
+    for group, com in _probe_groups(ctx, names):
+        _start_group(group, _run_group, (group, ctx, outcomes, com), deadlines)
+
+    values, status = {}, {}
+    for name in names:
+        outcome = dict(_wait_probe(name, outcomes, deadlines) or
+                       {'status': 'timeout', 'seconds': PROBE_TIMEOUTS.get(name, PROBE_TIMEOUT_DEFAULT)})
+        if outcome['status'] == 'ok':
+            values[name] = outcome.pop('value')
+        else:
+            values[name] = PROBES[name].default
+            print(f"AVISO: coleta '{name}' sem resultado ({outcome['status']}). {outcome.get('error', '')}")
+        status[name] = outcome
+    return values, status
+
+
+def get_inventory_data(ctx=None, use_cache=True):
+    """Coleta todos os dados de hardware e software da máquina local.
+
+    'ctx' são as sessões usadas pelas coletas (padrão: sessions.Sessions());
+    com 'use_cache', coletas de PROBE_CACHE_TTLS ainda válidas não são refeitas.
+    """
+    ctx = ctx or sessions.Sessions()
     data = {}
     uname = platform.uname()
 
@@ -247,94 +460,486 @@ def get_inventory_data():
     data['ultima_manutencao'] = ""
 
     # --- Coleta automática ---
+    # As coletas lentas (WMI, dmidecode, smartctl, lspci...) rodam em paralelo:
+    # o tempo total passa a ser o da coleta mais lenta, não a soma de todas.
+    # Hardware estático e softwares vêm do cache enquanto ele for válido.
+    probes, data['probe_status'] = run_cached_probes(ctx, use_cache)
     data['hostname'] = uname.node
-    data['serial_number'] = get_serial_number()
-    data['device_model'] = get_device_model()
-
-    if uname.system == "Windows" and wmi:
-        try:
-            c = wmi.WMI()
-            os_info = c.Win32_OperatingSystem()[0]
-            data['os'] = os_info.Caption.strip()
-            data['architecture'] = os_info.OSArchitecture.strip()
-            cpu_info = c.Win32_Processor()[0]
-            data['cpu_model'] = cpu_info.Name.strip()
-        except Exception:
-            data['os'] = f"Windows {uname.release}"
-            data['architecture'] = uname.machine
-            data['cpu_model'] = platform.processor()
-    else:
-        data['os'] = f"{uname.system} {uname.release}"
-        data['architecture'] = uname.machine
-        data['cpu_model'] = platform.processor()
+    data['serial_number'] = probes['serial_number']
+    data['device_model'] = probes['device_model']
+    data.update(probes['os_info'] or basic_os_info())
 
+    import psutil
     data['cpu_cores_physical'] = psutil.cpu_count(logical=False)
     data['cpu_cores_logical'] = psutil.cpu_count(logical=True)
     memoria = psutil.virtual_memory()
     data['ram_total_gb'] = round(memoria.total / (1024**3), 2)
-    data['ram_slots'] = get_ram_slots()
-
-    disks = []
-    for particao in psutil.disk_partitions():
-        if 'loop' in particao.opts or particao.fstype == '':
-            continue
-        try:
-            uso = psutil.disk_usage(particao.mountpoint)
-            disks.append({
-                'device': particao.device, 'mountpoint': particao.mountpoint,
-                'total_gb': round(uso.total / (1024**3), 2),
-                'used_gb': round(uso.used / (1024**3), 2), 'percent_used': uso.percent
-            })
-        except PermissionError:
-            continue
-    data['disks'] = disks
+    data['ram_slots'] = probes['ram_slots']
+    data['disks'] = probes['disks']
 
     data['mac_address'] = ':'.join(re.findall('..', '%012x' % uuid.getnode()))
-    try:
-        data['ip_address'] = socket.gethostbyname(socket.gethostname())
-    except socket.gaierror:
-        data['ip_address'] = '127.0.0.1'
+    data['ip_address'] = probes['ip_address']
 
     data['last_updated'] = datetime.datetime.now().isoformat()
-    data['storage_health'] = get_storage_health()
-    data['gpu_info'] = get_gpu_info()
-    data['windows_update_status'] = get_windows_update_status()
-    data['installed_software'] = get_installed_software()
-    data['monitors'] = get_monitor_info()  # <-- CHAMADA DA NOVA FUNÇÃO
+    storage = probes['storage_health']
+    data['storage_devices'] = storage if isinstance(storage, list) else []
+    if data['probe_status']['storage_health']['status'] not in ('ok', 'cached'):
+        data['storage_health'] = "Desconhecido"
+    else:
+        data['storage_health'] = smart.summary(storage) if isinstance(storage, list) else storage
+    data['gpu_info'] = probes['gpu_info']
+    data['windows_update_status'] = probes['windows_update_status']
+    installed = probes['installed_software']
+    if isinstance(installed, list):
+        data['installed_software'] = "; ".join(package['name'] for package in installed) or "Nenhum"
+        data['software_versions'] = {package['name']: package['version'] for package in installed
+                                     if package.get('version')}
+    else:
+        # Valor padrão da coleta ou texto de um cache gravado antes das versões
+        data['installed_software'] = installed
+        data['software_versions'] = {}
+    data['monitors'] = probes['monitors']
 
+    data['section_hashes'] = {section: section_hash(data, section) for section in SECTIONS}
     return data
 
 
-def send_data_to_api(data):
-    """Envia os dados coletados em formato JSON para a API."""
+def _file_stamps(name):
+    stamps = []
+    for path in PROBE_CACHE_FILES.get(name, ()):
+        try:
+            info = os.stat(path)
+            stamps.append([info.st_mtime_ns, info.st_size])
+        except OSError:
+            stamps.append(None)
+    return stamps
+
+
+def load_probe_cache():
+    """Lê os resultados em cache ainda válidos: nome -> {'value', 'at', 'files'}."""
     try:
-        # Converte qualquer dado não serializável (como datetime) para string
-        payload = json.dumps(data, default=str)
+        with open(PROBE_CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    import psutil
+    if abs(cache.get('boot_time', 0) - psutil.boot_time()) > BOOT_TIME_TOLERANCE:
+        return {}
+    now = time.time()
+    valid = {}
+    for name, entry in cache.get('probes', {}).items():
+        ttl = PROBE_CACHE_TTLS.get(name)
+        if ttl and now - entry['at'] < ttl and entry['files'] == _file_stamps(name):
+            valid[name] = entry
+    return valid
+
+
+def save_probe_cache(entries):
+    import psutil
+    try:
+        with open(PROBE_CACHE_FILE, 'w') as f:
+            json.dump({'boot_time': psutil.boot_time(), 'probes': entries}, f, default=str)
+    except OSError as e:
+        print(f"AVISO: Não foi possível salvar o cache das coletas: {e}")
+
+
+def run_cached_probes(ctx, use_cache=True):
+    """Como run_probes(), mas reaproveita os resultados em cache ainda válidos.
+
+    Coletas vindas do cache aparecem no status como 'cached', com a idade em segundos.
+    """
+    if not use_cache:
+        return run_probes(ctx)
+    cached = load_probe_cache()
+    pending = [name for name in PROBES if name not in cached]
+    files = {name: _file_stamps(name) for name in pending if name in PROBE_CACHE_TTLS}
+    started = time.time()
+    values, status = run_probes(ctx, pending)
+
+    now = time.time()
+    for name, entry in cached.items():
+        values[name] = entry['value']
+        status[name] = {'status': 'cached', 'age': round(now - entry['at'])}
+    for name in files:
+        if status[name]['status'] == 'ok':
+            cached[name] = {'value': values[name], 'at': started, 'files': files[name]}
+    if files:
+        save_probe_cache(cached)
+    return values, status
+
+
+def compact_inventory(data, previous_hashes):
+    """Retorna uma cópia dos dados sem as seções que não mudaram desde o último envio.
+
+    As seções omitidas seguem apenas como hash em 'section_hashes'.
+    """
+    compact = dict(data)
+    for section, columns in SECTIONS.items():
+        if previous_hashes.get(section) == data['section_hashes'].get(section):
+            for column in columns:
+                compact.pop(column, None)
+    return compact
+
+
+def load_section_hashes():
+    """Lê os hashes das seções do último envio gravado pelo servidor (resposta 200)."""
+    try:
+        with open(SECTION_HASHES_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_section_hashes(hashes):
+    try:
+        with open(SECTION_HASHES_FILE, 'w') as f:
+            json.dump(hashes, f)
+    except OSError as e:
+        print(f"AVISO: Não foi possível salvar os hashes das seções: {e}")
+
+
+def _zstandard():
+    """Módulo 'zstandard', ou None se não estiver instalado."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compress_payload(payload, encoding):
+    """Compacta o corpo (bytes) com a codificação informada."""
+    zstandard = _zstandard() if encoding == 'zstd' else None
+    if zstandard:
+        return zstandard.ZstdCompressor(level=3).compress(payload)
+    if encoding == 'gzip':
+        return gzip.compress(payload, compresslevel=6)
+    return payload
+
+
+_http = None
+
+
+def http_session():
+    """Sessão HTTP reutilizada entre envios (mantém a conexão com o servidor aberta)."""
+    global _http
+    if _http is None:
+        import requests
+        _http = requests.Session()
+    return _http
+
+
+def post_inventory(data):
+    global PAYLOAD_ENCODING
+    # Converte qualquer dado não serializável (como datetime) para string
+    payload = json.dumps(data, default=str).encode('utf-8')
+    if PAYLOAD_ENCODING == 'zstd' and not _zstandard():
+        PAYLOAD_ENCODING = 'gzip'
+    while True:
         headers = {'Content-Type': 'application/json'}
-        response = requests.post(
-            API_URL, data=payload, headers=headers, timeout=10)
+        if PAYLOAD_ENCODING != 'identity':
+            headers['Content-Encoding'] = PAYLOAD_ENCODING
+        response = http_session().post(
+            API_URL, data=compress_payload(payload, PAYLOAD_ENCODING), headers=headers, timeout=10)
+        if response.status_code != 415 or PAYLOAD_ENCODING == 'identity':
+            return response
+        # Negociação: usa uma codificação anunciada pelo servidor ou envia sem compressão
+        accepted = [e.strip() for e in response.headers.get('Accept-Encoding', '').split(',')]
+        fallback = 'gzip' if 'gzip' in accepted and PAYLOAD_ENCODING != 'gzip' else 'identity'
+        print(f"Servidor não aceita '{PAYLOAD_ENCODING}', reenviando com '{fallback}'...")
+        PAYLOAD_ENCODING = fallback
+
+
+def send_data_to_api(data, previous_hashes=None):
+    """Envia os dados coletados em formato JSON para a API.
+
+    Com 'previous_hashes', as seções inalteradas seguem apenas como hash; se o
+    servidor não as reconhecer ('missing_sections'), o inventário completo é reenviado.
+    """
+    import requests
+    try:
+        if previous_hashes:
+            response = post_inventory(compact_inventory(data, previous_hashes))
+            if response.status_code in (200, 202) and response.json().get('missing_sections'):
+                print("Servidor sem algumas seções salvas, reenviando o inventário completo...")
+                response = post_inventory(data)
+        else:
+            response = post_inventory(data)
 
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             print("SUCESSO: Dados de inventário enviados com sucesso.")
             print(f"Resposta do servidor: {response.json()}")
+            # 202 (servidor em write-behind) só confirma que o relatório entrou na fila:
+            # os hashes continuam os do último envio gravado, até um 200
+            if response.status_code == 200:
+                save_section_hashes(data['section_hashes'])
         else:
             print(
                 f"ERRO: Falha ao enviar dados. Status: {response.status_code}")
             print(f"Resposta: {response.text}")
+        return response
 
     except requests.exceptions.RequestException as e:
         print(
             f"ERRO DE CONEXÃO: Não foi possível conectar à API em {API_URL}.")
         print(f"Detalhes: {e}")
+        return None
+
+
+def open_spool():
+    conn = sqlite3.connect(SPOOL_FILE, timeout=10)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS spool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, hostname TEXT, created REAL, payload TEXT
+        )
+    ''')
+    return conn
+
+
+def spool_report(data):
+    """Guarda o relatório no spool, aplicando os limites de idade e de tamanho."""
+    payload = json.dumps(data, default=str)
+    with closing(open_spool()) as conn, conn:
+        if not SPOOL_KEEP_HISTORY:
+            conn.execute("DELETE FROM spool WHERE hostname=?", (data.get('hostname'),))
+        conn.execute("INSERT INTO spool (hostname, created, payload) VALUES (?, ?, ?)",
+                     (data.get('hostname'), time.time(), payload))
+        conn.execute("DELETE FROM spool WHERE created < ?", (time.time() - SPOOL_MAX_AGE,))
+        # Acima do tamanho máximo, descarta os mais antigos (o último relatório sempre fica)
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM spool").fetchone()[0]
+        for report_id, size in conn.execute("SELECT id, LENGTH(payload) FROM spool ORDER BY id").fetchall()[:-1]:
+            if total <= SPOOL_MAX_BYTES:
+                break
+            conn.execute("DELETE FROM spool WHERE id=?", (report_id,))
+            total -= size
+
+
+def flush_spool():
+    """Envia os relatórios do spool, do mais antigo ao mais recente.
+
+    Para no primeiro erro de conexão ou do servidor (5xx, 429), deixando o
+    restante para a próxima tentativa; relatórios recusados (outros 4xx) são
+    descartados. Retorna a última resposta do servidor (None sem conexão).
+    """
+    with closing(open_spool()) as conn:
+        reports = conn.execute("SELECT id, payload FROM spool ORDER BY id").fetchall()
+    response = None
+    for sent, (report_id, payload) in enumerate(reports):
+        response = send_data_to_api(json.loads(payload), load_section_hashes())
+        if response is None or response.status_code >= 500 or response.status_code == 429:
+            print(f"{len(reports) - sent} relatório(s) aguardando reenvio em {SPOOL_FILE}")
+            return response
+        with closing(open_spool()) as conn, conn:
+            conn.execute("DELETE FROM spool WHERE id=?", (report_id,))
+    return response
+
+
+def report(data):
+    """Envia o inventário passando pelo spool (junto com os pendentes de envios anteriores)."""
+    spool_report(data)
+    return flush_spool()
+
+
+def server_delay(response):
+    """Segundos até o próximo envio pedidos pelo servidor ('next_report_after' ou Retry-After)."""
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if response.status_code in (200, 202):
+        try:
+            value = response.json().get('next_report_after', value)
+        except ValueError:
+            pass
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def run_daemon(interval=DAEMON_INTERVAL, jitter=DAEMON_JITTER, use_cache=True):
+    """Mantém o agente residente, coletando e enviando a cada 'interval' segundos.
+
+    Cada espera varia aleatoriamente em ±jitter (fração do intervalo) e o
+    primeiro envio também é sorteado dentro dessa janela. Se o servidor pedir
+    uma espera maior (sob carga ou com Retry-After), ela alonga o ciclo; um
+    pedido menor que o intervalo configurado é ignorado.
+    Sem conexão, a próxima tentativa segue um backoff exponencial a partir de
+    SPOOL_RETRY_BASE, limitado ao intervalo.
+    """
+    failures = 0
+    delay = random.uniform(0, interval * jitter)
+    print(f"Modo daemon: envio a cada {interval:.0f} s (±{jitter:.0%}). Primeira coleta em {delay:.0f} s.")
+    while True:
+        time.sleep(delay)
+        delay = interval
+        try:
+            # Sessões novas a cada ciclo: a saída dos comandos só vale para uma coleta
+            inventory_data = get_inventory_data(sessions.Sessions(), use_cache)
+            response = report(inventory_data)
+            if response is None or response.status_code >= 500 or response.status_code == 429:
+                failures += 1
+                delay = min(SPOOL_RETRY_BASE * 2 ** (failures - 1), interval)
+            else:
+                failures = 0
+            delay = max(delay, server_delay(response) or 0)
+        except Exception as e:
+            print(f"ERRO no ciclo de coleta: {type(e).__name__}: {e}")
+        delay = min(max(delay, DAEMON_MIN_INTERVAL), DAEMON_MAX_INTERVAL)
+        delay *= random.uniform(1 - jitter, 1 + jitter)
+        print(f"Próxima coleta em {delay:.0f} s.")
+
+
+def _peak_rss_mb():
+    """Pico de memória residente do processo até agora, em MB."""
+    try:
+        import resource
+    except ImportError:
+        # Windows: o psutil informa o pico do working set
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == 'darwin' else 1024), 1)
+
+
+def import_times():
+    """Segundos para importar cada módulo de HEAVY_MODULES em um interpretador novo (None se não instalado)."""
+    times = {}
+    for module in HEAVY_MODULES:
+        code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+        try:
+            output = subprocess.check_output([sys.executable, '-c', code], stderr=subprocess.DEVNULL, timeout=60)
+            times[module] = round(float(output), 4)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError):
+            times[module] = None
+    return times
+
+
+def profile_probes(ctx):
+    """Executa as coletas uma de cada vez, medindo tempo, CPU, subprocessos e memória de cada uma.
+
+    Em sequência, o CPU dos processos filhos e o pico de memória podem ser
+    atribuídos à coleta que acabou de rodar. Os grupos e os timeouts são os de
+    run_probes(): as coletas WMI rodam juntas na mesma thread (a conexão em
+    ctx.wmi só vale no apartamento COM em que foi criada) e uma coleta travada
+    é abandonada no seu prazo, sem segurar as seguintes.
+    Retorna nome -> medidas.
+    """
+    profile = {}
+    for group, com in _probe_groups(ctx, list(PROBES)):
+        measured = {}
+        deadlines = {}
+        _start_group(group, _profile_group, (group, ctx, measured, com), deadlines)
+        for name in group:
+            measures = _wait_probe(name, measured, deadlines)
+            profile[name] = dict(measures or {
+                'status': 'timeout', 'wall_seconds': float(PROBE_TIMEOUTS.get(name, PROBE_TIMEOUT_DEFAULT)),
+                'cpu_seconds': 0.0, 'subprocesses': 0, 'peak_rss_mb': _peak_rss_mb()})
+    return profile
+
+
+def _profile_group(names, ctx, measured, com):
+    if com:
+        import pythoncom
+        pythoncom.CoInitialize()
+    try:
+        for name in names:
+            runs = ctx.commands.runs
+            cpu = time.process_time()
+            children = os.times()
+            outcomes = {}
+            _run_group([name], ctx, outcomes)
+            after = os.times()
+            children_cpu = ((after.children_user - children.children_user)
+                            + (after.children_system - children.children_system))
+            measured[name] = {
+                'status': outcomes[name]['status'],
+                'wall_seconds': outcomes[name]['seconds'],
+                'cpu_seconds': round(time.process_time() - cpu + children_cpu, 3),
+                'subprocesses': ctx.commands.runs - runs,
+                'peak_rss_mb': _peak_rss_mb(),
+            }
+    finally:
+        if com:
+            pythoncom.CoUninitialize()
+
+
+def print_profile(profile, imports):
+    print(f"{'Coleta':<24}{'status':<9}{'tempo (s)':>10}{'CPU (s)':>10}{'processos':>11}{'pico RSS (MB)':>15}")
+    for name, measures in sorted(profile.items(), key=lambda item: item[1]['wall_seconds'], reverse=True):
+        print(f"{name:<24}{measures['status']:<9}{measures['wall_seconds']:>10.3f}{measures['cpu_seconds']:>10.3f}"
+              f"{measures['subprocesses']:>11}{measures['peak_rss_mb']:>15.1f}")
+    print("\nImportação dos módulos pesados (interpretador novo):")
+    for module, seconds in imports.items():
+        print(f"  {module:<10} {'não instalado' if seconds is None else f'{seconds * 1000:.1f} ms'}")
+
+
+def benchmark(ctx, rounds, use_cache=True):
+    """Repete a coleta 'rounds' vezes com as mesmas sessões e mostra os tempos.
+
+    Com WMI de verdade cada rodada usa sessões novas, como uma execução real do
+    agente: a conexão WMI fica presa à thread de coletas da rodada que a abriu.
+    """
+    durations = []
+    fresh = ctx.serialize_wmi and ctx.has_wmi
+    for _ in range(rounds):
+        if fresh:
+            ctx = sessions.Sessions()
+        start = time.monotonic()
+        get_inventory_data(ctx, use_cache)
+        durations.append(time.monotonic() - start)
+    durations.sort()
+    print(f"{rounds} coletas: mediana {durations[len(durations) // 2] * 1000:.1f} ms, "
+          f"máxima {durations[-1] * 1000:.1f} ms")
+    print(f"Sessões: {json.dumps(ctx.stats())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coleta o inventário desta máquina e envia ao servidor.")
+    parser.add_argument('--record', metavar='ARQUIVO', help="grava em JSON tudo o que as coletas leram")
+    parser.add_argument('--replay', metavar='ARQUIVO', help="reproduz uma gravação em vez de ler o sistema (não envia)")
+    parser.add_argument('--benchmark', type=int, metavar='N', help="repete a coleta N vezes e mostra os tempos (não envia)")
+    parser.add_argument('--profile', action='store_true',
+                        help="mede tempo, CPU, subprocessos e memória de cada coleta (não envia)")
+    parser.add_argument('--no-cache', action='store_true', help="refaz todas as coletas, ignorando o cache local")
+    parser.add_argument('--daemon', action='store_true', help="fica residente, coletando e enviando periodicamente")
+    parser.add_argument('--interval', type=float, default=DAEMON_INTERVAL,
+                        help=f"segundos entre envios no modo daemon (padrão: {DAEMON_INTERVAL})")
+    parser.add_argument('--jitter', type=float, default=DAEMON_JITTER,
+                        help=f"variação aleatória do intervalo, fração de 0 a 1 (padrão: {DAEMON_JITTER})")
+    args = parser.parse_args()
+
+    if args.daemon:
+        try:
+            run_daemon(args.interval, min(max(args.jitter, 0), 1), not args.no_cache)
+        except KeyboardInterrupt:
+            print("Agente encerrado.")
+        return
+
+    ctx = sessions.ReplaySessions(args.replay) if args.replay else sessions.Sessions(record=bool(args.record))
+    # Gravações precisam de todas as coletas e reproduções não podem mexer no cache desta máquina
+    use_cache = not (args.no_cache or args.record or args.replay)
+    if args.profile:
+        print_profile(profile_probes(ctx), import_times())
+        return
+    if args.benchmark:
+        benchmark(ctx, args.benchmark, use_cache)
+        return
 
-
-if __name__ == "__main__":
     print("Coletando dados de inventário...")
-    inventory_data = get_inventory_data()
+    inventory_data = get_inventory_data(ctx, use_cache)
+    if args.record:
+        ctx.save(args.record)
+        print(f"Gravação salva em {args.record}")
 
     print("\nDados Coletados:")
     # Imprime os dados de forma legível para verificação
     print(json.dumps(inventory_data, indent=4, default=str))
 
+    if args.replay:
+        return
     print("\nEnviando dados para o servidor de inventário...")
-    send_data_to_api(inventory_data)
+    report(inventory_data)
+
+
+if __name__ == "__main__":
+    main()
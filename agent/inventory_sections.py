@@ -0,0 +1,30 @@
+"""Seções do documento de inventário e o hash do conteúdo de cada uma.
+
+Usado pelo agente (compactação do envio) e pelo servidor (server/ingest.py),
+que importa este mesmo arquivo: os hashes só coincidem se os dois lados usarem
+as mesmas colunas e o mesmo algoritmo. Não importa outros módulos do agente.
+"""
+import hashlib
+import json
+
+# Seções do inventário e as colunas de cada uma.
+# 'hostname' e 'last_updated' ficam de fora: são gravados em todo relatório.
+SECTIONS = {
+    'cadastro': ('id_patrimonio', 'fabricante', 'data_compra', 'fornecedor', 'custo', 'garantia_venc',
+                 'local_fisico', 'centro_custo', 'usuario_designado', 'departamento', 'status', 'ultima_manutencao'),
+    'hardware': ('serial_number', 'device_model', 'cpu_model', 'cpu_cores_physical', 'cpu_cores_logical',
+                 'ram_total_gb', 'ram_slots', 'gpu_info', 'storage_health'),
+    'os': ('os', 'architecture', 'windows_update_status'),
+    'network': ('mac_address', 'ip_address'),
+    'disks': ('disks',),
+    'monitors': ('monitors',),
+    'software': ('installed_software', 'software_versions'),
+    'storage': ('storage_devices',),
+}
+
+
+def section_hash(data, section):
+    """Hash estável do conteúdo de uma seção do documento."""
+    values = [data.get(column) for column in SECTIONS[section]]
+    payload = json.dumps(values, sort_keys=True, separators=(',', ':'), default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
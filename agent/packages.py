@@ -0,0 +1,186 @@
+"""Leitura dos bancos de pacotes do Linux (dpkg e RPM), com cache pela data do arquivo.
+
+O resultado fica em memória junto com a data de modificação e o tamanho do
+arquivo do banco: enquanto ele não mudar, os pacotes não são lidos de novo
+(útil no modo daemon). Na primeira leitura, o dpkg é consultado com
+'dpkg-query', que em C é tão rápido quanto ler o status em Python (ver
+bench_packages.py); a leitura direta do status fica para quando o dpkg-query
+não pode ser executado. Do banco do RPM em SQLite (Fedora 33+, RHEL 9+) são
+lidos os cabeçalhos binários de cada pacote.
+
+O banco antigo do RPM (Berkeley DB, /var/lib/rpm/Packages) não é lido aqui;
+nesse caso read_installed() lança FileNotFoundError e o collector usa o 'rpm'.
+"""
+import os
+import sqlite3
+import struct
+import subprocess
+import threading
+
+DPKG_STATUS = '/var/lib/dpkg/status'
+RPM_SQLITE = '/var/lib/rpm/rpmdb.sqlite'
+
+# O arquivo é lido em blocos deste tamanho, sempre cortados no fim de um parágrafo
+DPKG_READ_SIZE = 1024 * 1024
+# Mesmos campos da leitura direta: nome (com arquitetura quando ambíguo), versão e arquitetura
+DPKG_QUERY_FORMAT = '${binary:Package}\t${Version}\t${Architecture}\n'
+DPKG_QUERY_TIMEOUT = 60
+
+# Tags do cabeçalho RPM e os tipos de dado usados por elas
+RPM_TAGS = {1000: 'name', 1001: 'version', 1002: 'release', 1003: 'epoch', 1022: 'architecture'}
+RPM_INT32 = 4
+RPM_STRING_TYPES = (6, 8, 9)
+
+# Caminho -> ((mtime_ns, tamanho), pacotes)
+_parsed = {}
+_lock = threading.Lock()
+
+
+def _dpkg_package(fields, native):
+    """Monta o pacote a partir dos campos de um parágrafo do status (None se não instalado)."""
+    name, status, version, architecture, multi_arch = fields
+    if not name or status.endswith('not-installed'):
+        return None
+    # Mesmo nome de ${binary:Package} no dpkg-query: com a arquitetura quando há ambiguidade
+    if multi_arch == 'same' or architecture not in (native, 'all', ''):
+        name = f"{name}:{architecture}"
+    return {'name': name, 'version': version or None, 'architecture': architecture}
+
+
+def _dpkg_paragraphs(text, paragraphs):
+    """Acrescenta a 'paragraphs' os campos (Package, Status, Version, Architecture, Multi-Arch)
+    de cada parágrafo de 'text', que começa com '\n' e termina no fim de uma linha.
+
+    O dpkg grava 'Package' na primeira linha de cada parágrafo e os campos como
+    "Nome: valor". Cada campo é procurado com str.find só dentro do parágrafo, pelo
+    início de linha (linhas de continuação começam com espaço), sem passar pelas
+    descrições, dependências e conffiles, que são a maior parte do arquivo.
+    """
+    find = text.find
+    append = paragraphs.append
+    size = len(text)
+    position = find('\nPackage: ')
+    while position >= 0:
+        following = find('\nPackage: ', position + 10)
+        limit = following if following >= 0 else size
+        status = find('\nStatus: ', position, limit)
+        version = find('\nVersion: ', position, limit)
+        architecture = find('\nArchitecture: ', position, limit)
+        multi_arch = find('\nMulti-Arch: ', position, limit)
+        append((text[position + 10:find('\n', position + 10)],
+                text[status + 9:find('\n', status + 9)] if status >= 0 else '',
+                text[version + 10:find('\n', version + 10)] if version >= 0 else '',
+                text[architecture + 15:find('\n', architecture + 15)] if architecture >= 0 else '',
+                text[multi_arch + 13:find('\n', multi_arch + 13)] if multi_arch >= 0 else ''))
+        position = following
+
+
+def read_dpkg_status(path=DPKG_STATUS):
+    """Lista de pacotes do dpkg ({'name', 'version', 'architecture'}), em ordem de nome."""
+    paragraphs = []
+    pending = '\n'
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            block = f.read(DPKG_READ_SIZE)
+            if not block:
+                _dpkg_paragraphs(pending + '\n', paragraphs)
+                break
+            # O bloco é cortado no último fim de parágrafo; o resto vai para o próximo
+            text = pending + block
+            end = text.rfind('\n\n') + 1
+            if end <= 1:
+                pending = text
+                continue
+            _dpkg_paragraphs(text[:end], paragraphs)
+            pending = text[end - 1:]
+
+    # A arquitetura nativa é a do próprio dpkg
+    native = next((fields[3] for fields in paragraphs if fields[0] == 'dpkg'), None)
+    # Mesma ordem do dpkg-query: nome do pacote e depois arquitetura
+    paragraphs.sort(key=lambda fields: (fields[0], fields[3]))
+    return [package for package in (_dpkg_package(fields, native) for fields in paragraphs) if package]
+
+
+def read_dpkg_query(path=DPKG_STATUS):
+    """Lista de pacotes do dpkg pelo 'dpkg-query', no mesmo formato de read_dpkg_status().
+
+    Lança OSError se o dpkg-query não puder ser executado.
+    """
+    command = ['dpkg-query', f"--admindir={os.path.dirname(path)}", '-W', f"-f={DPKG_QUERY_FORMAT}"]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True, timeout=DPKG_QUERY_TIMEOUT).stdout
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        raise OSError(f"dpkg-query falhou: {e}")
+    packages = []
+    for line in output.decode('utf-8', errors='replace').splitlines():
+        name, _, rest = line.partition('\t')
+        version, _, architecture = rest.partition('\t')
+        if name:
+            packages.append({'name': name, 'version': version or None, 'architecture': architecture})
+    return packages
+
+
+def read_dpkg(path=DPKG_STATUS):
+    """Pacotes do dpkg: pelo dpkg-query e, se ele não puder ser executado, lendo o status."""
+    try:
+        return read_dpkg_query(path)
+    except OSError:
+        return read_dpkg_status(path)
+
+
+def parse_rpm_header(blob):
+    """Extrai nome, versão e arquitetura de um cabeçalho RPM (formato do rpmdb.sqlite)."""
+    count, _ = struct.unpack_from('>ii', blob, 0)
+    store = 8 + 16 * count
+    values = {}
+    for index in range(count):
+        tag, kind, offset, _ = struct.unpack_from('>iiii', blob, 8 + 16 * index)
+        key = RPM_TAGS.get(tag)
+        if key is None:
+            continue
+        start = store + offset
+        if kind in RPM_STRING_TYPES:
+            values[key] = blob[start:blob.index(b'\0', start)].decode('utf-8', errors='replace')
+        elif kind == RPM_INT32:
+            values[key] = struct.unpack_from('>i', blob, start)[0]
+    version = f"{values.get('version')}-{values.get('release')}"
+    if values.get('epoch') is not None:
+        version = f"{values['epoch']}:{version}"
+    return {'name': values.get('name'), 'version': version, 'architecture': values.get('architecture')}
+
+
+def read_rpm_sqlite(path=RPM_SQLITE):
+    """Lista de pacotes do banco do RPM em SQLite, em ordem de nome."""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            blobs = conn.execute("SELECT blob FROM Packages").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise OSError(f"Não foi possível ler {path}: {e}")
+    packages = [parse_rpm_header(blob) for blob, in blobs]
+    packages.sort(key=lambda package: package['name'] or '')
+    return packages
+
+
+def read_cached(path, reader):
+    """Lê o banco com 'reader', reaproveitando o último resultado se o arquivo não mudou."""
+    info = os.stat(path)
+    stamp = (info.st_mtime_ns, info.st_size)
+    with _lock:
+        cached = _parsed.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    packages = reader(path)
+    with _lock:
+        _parsed[path] = (stamp, packages)
+    return packages
+
+
+def read_installed():
+    """Pacotes instalados, do primeiro banco encontrado (dpkg, depois RPM em SQLite)."""
+    for path, reader in ((DPKG_STATUS, read_dpkg), (RPM_SQLITE, read_rpm_sqlite)):
+        if os.path.exists(path):
+            return read_cached(path, reader)
+    raise FileNotFoundError("Nenhum banco de pacotes legível (dpkg ou RPM em SQLite)")
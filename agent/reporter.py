@@ -1,31 +1,32 @@
+import argparse
+import itertools
 import sqlite3
-import json
+import os
+import sys
+
+# Permite importar a camada de banco compartilhada ('db/') ao rodar a partir da pasta 'agent'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import assets, export  # noqa: E402
+
+DB_FILE = 'inventory.db'
 
 
 def view_inventory():
     """Conecta ao banco de dados e exibe o inventário de forma organizada."""
     try:
-        conn = sqlite3.connect('inventory.db')
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM assets ORDER BY hostname")
-
-        assets = cursor.fetchall()
+        # Lidos em lotes: a memória usada não cresce com o tamanho da frota
+        found = False
+        for asset in itertools.chain.from_iterable(export.iter_batches(DB_FILE)):
+            if not found:
+                found = True
+                print("=" * 110)
+                print("||" + "INVENTÁRIO DE ATIVOS DE TI".center(106) + "||")
+                print("=" * 110)
 
-        if not assets:
-            print("Nenhum ativo encontrado no inventário.")
-            return
-
-        print("=" * 110)
-        print("||" + "INVENTÁRIO DE ATIVOS DE TI".center(106) + "||")
-        print("=" * 110)
-
-        for asset in assets:
             print(f"Hostname: {asset['hostname']}")
             # Exibe modelo do aparelho de forma segura
             print(
-                f"  - Modelo: {asset['device_model'] if 'device_model' in asset.keys() else 'Desconhecido'}")
+                f"  - Modelo: {asset.get('device_model') or 'Desconhecido'}")
             print(f"  - SO: {asset['os']} ({asset['architecture']})")
             print(
                 f"  - IP: {asset['ip_address']:<15} | MAC: {asset['mac_address']}")
@@ -38,8 +39,8 @@ def view_inventory():
             print(f"  - RAM Total: {asset['ram_total_gb']} GB")
             print(f"  - Última Atualização: {asset['last_updated']}")
 
-            disks_data = json.loads(asset['disks'])
-            if disks_data:
+            disks_data = asset['disks']
+            if disks_data and isinstance(disks_data, list):
                 print("  - Discos:")
                 for disk in disks_data:
                     print(
@@ -47,7 +48,8 @@ def view_inventory():
 
             print("-" * 110)
 
-        conn.close()
+        if not found:
+            print("Nenhum ativo encontrado no inventário.")
 
     except sqlite3.Error as e:
         print(f"Erro ao acessar o banco de dados: {e}")
@@ -55,5 +57,50 @@ def view_inventory():
         print("Erro: O arquivo de banco de dados 'inventory.db' não foi encontrado.")
 
 
+def export_inventory(args):
+    """Exporta o inventário em CSV/NDJSON para um arquivo ou para a saída padrão."""
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+    filters = {column: getattr(args, column) for column in assets.EQUALITY_FILTERS if getattr(args, column)}
+    try:
+        chunks = export.stream(DB_FILE, args.export, fields=fields, filters=filters,
+                               updated_since=args.updated_since, updated_until=args.updated_until,
+                               batch_size=args.batch_size)
+        output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        sys.exit(2)
+    except sqlite3.Error as e:
+        print(f"Erro ao acessar o banco de dados: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        print(f"Exportação salva em {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório e exportação do inventário de ativos.")
+    parser.add_argument('--export', choices=tuple(export.FORMATS),
+                        help="exporta o inventário completo neste formato em vez de exibir o relatório")
+    parser.add_argument('--fields', help="colunas exportadas, separadas por vírgula (padrão: todas)")
+    parser.add_argument('--output', help="arquivo de saída da exportação (padrão: saída padrão)")
+    parser.add_argument('--status', help="exporta só os ativos com este status")
+    parser.add_argument('--departamento', help="exporta só os ativos deste departamento")
+    parser.add_argument('--os', help="exporta só os ativos com este sistema operacional")
+    parser.add_argument('--updated-since', help="última atualização a partir desta data (ISO)")
+    parser.add_argument('--updated-until', help="última atualização antes desta data (ISO)")
+    parser.add_argument('--batch-size', type=int, default=export.BATCH_SIZE, help="ativos lidos por lote")
+    args = parser.parse_args()
+
+    if args.export:
+        export_inventory(args)
+    else:
+        view_inventory()
+
+
 if __name__ == "__main__":
-    view_inventory()
+    main()
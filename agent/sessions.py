@@ -0,0 +1,299 @@
+"""Sessões compartilhadas pelas coletas do agente: WMI, sysfs e comandos.
+
+Cada tipo de acesso ao sistema é aberto uma única vez por execução, na primeira
+coleta que precisar dele: a conexão WMI (a etapa mais cara de uma coleta no
+Windows) é reutilizada por todas as coletas em vez de cada uma criar a sua.
+
+Uma sessão pode gravar tudo o que leu (Sessions(record=True) + save()) e
+ReplaySessions reproduz essa gravação em qualquer sistema, o que permite testar
+e medir as coletas do Windows a partir de uma máquina Linux:
+
+    python collector.py --record gravacao.json          # na máquina real
+    python collector.py --replay gravacao.json --benchmark 20
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import types
+
+import packages
+
+# Tempo máximo padrão (segundos) de um comando externo
+COMMAND_TIMEOUT = 20
+
+
+def _plain(value):
+    """Converte valores do WMI em algo serializável em JSON para a gravação."""
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class WmiSession:
+    """Uma conexão WMI por namespace, aberta na primeira consulta.
+
+    Objetos COM pertencem à thread que os criou: todas as consultas de uma
+    sessão precisam rodar na mesma thread (o collector agrupa as coletas WMI).
+    """
+
+    def __init__(self, recording=None):
+        self.recording = recording
+        self.connections = {}
+        self.opened = 0
+        self.queries = 0
+
+    def query(self, class_name, namespace='root\\cimv2'):
+        connection = self.connections.get(namespace)
+        if connection is None:
+            import wmi
+            connection = self.connections[namespace] = wmi.WMI(namespace=namespace)
+            self.opened += 1
+        self.queries += 1
+        items = getattr(connection, class_name)()
+        if self.recording is not None:
+            self.recording[f"{namespace}:{class_name}"] = [
+                {name: _plain(getattr(item, name, None)) for name in item.properties} for item in items]
+        return items
+
+
+class SysfsSession:
+    """Leitura de arquivos de /sys (ou de outra raiz, para testes)."""
+
+    def __init__(self, recording=None, root=''):
+        self.recording = recording
+        self.root = root
+        self.reads = 0
+
+    def read(self, path):
+        self.reads += 1
+        with open(self.root + path, 'r') as f:
+            value = f.read().strip()
+        if self.recording is not None:
+            self.recording[path] = value
+        return value
+
+    def list(self, path):
+        """Nomes dentro de um diretório (gravados com '/' no fim do caminho)."""
+        self.reads += 1
+        names = sorted(os.listdir(self.root + path))
+        if self.recording is not None:
+            self.recording[path + '/'] = names
+        return names
+
+
+class CommandSession:
+    """Execução de comandos externos, sem shell e com timeout.
+
+    A saída de cada comando é guardada durante a sessão: duas coletas que
+    precisam do mesmo comando (ex.: dmidecode) o executam uma só vez.
+    """
+
+    def __init__(self, recording=None):
+        self.recording = recording
+        self.outputs = {}
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def run(self, command, timeout=COMMAND_TIMEOUT, check=True):
+        """Retorna a saída do comando; subprocess.TimeoutExpired se passar de 'timeout'.
+
+        Com check=False o código de saída é ignorado (o smartctl, por exemplo,
+        devolve um mapa de bits diferente de zero mesmo com a saída completa).
+        """
+        key = " ".join(command)
+        with self._lock:
+            if key in self.outputs:
+                return self.outputs[key]
+        self.runs += 1
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout,
+                                check=check)
+        output = result.stdout.decode(errors='ignore')
+        with self._lock:
+            self.outputs[key] = output
+            if self.recording is not None:
+                self.recording.setdefault('commands', {})[key] = output
+        return output
+
+    def which(self, name):
+        path = shutil.which(name)
+        if self.recording is not None:
+            self.recording.setdefault('which', {})[name] = path
+        return path
+
+
+class PackageSession:
+    """Pacotes instalados do dpkg/RPM, com cache pela data do banco (ver packages.py)."""
+
+    def __init__(self, recording=None):
+        self.recording = recording
+        self.reads = 0
+
+    def installed(self):
+        self.reads += 1
+        installed = packages.read_installed()
+        if self.recording is not None:
+            self.recording['packages'] = installed
+        return installed
+
+
+class Sessions:
+    """Sessões de uma execução do agente, criadas sob demanda."""
+
+    # No Windows as coletas WMI rodam em sequência numa única thread (ver WmiSession)
+    serialize_wmi = True
+
+    def __init__(self, record=False):
+        self.system = platform.system()
+        self.recording = {'system': self.system, 'wmi': {}, 'sysfs': {}} if record else None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, name, factory):
+        with self._lock:
+            if name not in self._sessions:
+                self._sessions[name] = factory()
+            return self._sessions[name]
+
+    @property
+    def has_wmi(self):
+        """Equivale ao antigo 'platform.system() == "Windows" and wmi'."""
+        if self.system != "Windows":
+            return False
+        try:
+            import wmi  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _recorded(self, key):
+        return None if self.recording is None else self.recording[key]
+
+    @property
+    def wmi(self):
+        return self._session('wmi', lambda: WmiSession(self._recorded('wmi')))
+
+    @property
+    def sysfs(self):
+        return self._session('sysfs', lambda: SysfsSession(self._recorded('sysfs')))
+
+    @property
+    def commands(self):
+        return self._session('commands', lambda: CommandSession(self.recording))
+
+    @property
+    def packages(self):
+        return self._session('packages', lambda: PackageSession(self.recording))
+
+    def stats(self):
+        """Quantas sessões foram abertas e quantas vezes cada uma foi usada."""
+        stats = {}
+        for name, session in self._sessions.items():
+            stats[name] = {key: value for key, value in vars(session).items() if isinstance(value, int)}
+        return stats
+
+    def save(self, path):
+        """Grava em JSON tudo o que foi lido nesta execução (requer record=True)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.recording, f, indent=2, ensure_ascii=False)
+
+
+class ReplayWmiSession(WmiSession):
+    def __init__(self, recorded):
+        super().__init__()
+        self.recorded = recorded
+
+    def query(self, class_name, namespace='root\\cimv2'):
+        if namespace not in self.connections:
+            self.connections[namespace] = True
+            self.opened += 1
+        self.queries += 1
+        key = f"{namespace}:{class_name}"
+        if key not in self.recorded:
+            raise LookupError(f"Consulta WMI não gravada: {key}")
+        return [types.SimpleNamespace(**item) for item in self.recorded[key]]
+
+
+class ReplaySysfsSession(SysfsSession):
+    def __init__(self, recorded):
+        super().__init__()
+        self.recorded = recorded
+
+    def read(self, path):
+        self.reads += 1
+        if path not in self.recorded:
+            raise FileNotFoundError(path)
+        return self.recorded[path]
+
+    def list(self, path):
+        self.reads += 1
+        if path + '/' not in self.recorded:
+            raise FileNotFoundError(path)
+        return self.recorded[path + '/']
+
+
+class ReplayCommandSession(CommandSession):
+    def __init__(self, recorded, which):
+        super().__init__()
+        self.recorded = recorded
+        self.recorded_which = which
+
+    def run(self, command, timeout=COMMAND_TIMEOUT, check=True):
+        self.runs += 1
+        key = " ".join(command)
+        if key not in self.recorded:
+            # Mesmo efeito de um programa que não está instalado
+            raise FileNotFoundError(command[0])
+        return self.recorded[key]
+
+    def which(self, name):
+        return self.recorded_which.get(name)
+
+
+class ReplayPackageSession(PackageSession):
+    def __init__(self, recorded):
+        super().__init__()
+        self.recorded = recorded
+
+    def installed(self):
+        self.reads += 1
+        if self.recorded is None:
+            raise FileNotFoundError("Pacotes não gravados")
+        return self.recorded
+
+
+class ReplaySessions(Sessions):
+    """Sessões falsas que reproduzem uma gravação feita com Sessions(record=True)."""
+
+    serialize_wmi = False
+
+    def __init__(self, path):
+        super().__init__()
+        with open(path, 'r', encoding='utf-8') as f:
+            self.replay = json.load(f)
+        self.system = self.replay.get('system', self.system)
+
+    @property
+    def has_wmi(self):
+        return bool(self.replay.get('wmi'))
+
+    @property
+    def wmi(self):
+        return self._session('wmi', lambda: ReplayWmiSession(self.replay.get('wmi', {})))
+
+    @property
+    def sysfs(self):
+        return self._session('sysfs', lambda: ReplaySysfsSession(self.replay.get('sysfs', {})))
+
+    @property
+    def commands(self):
+        return self._session('commands', lambda: ReplayCommandSession(
+            self.replay.get('commands', {}), self.replay.get('which', {})))
+
+    @property
+    def packages(self):
+        return self._session('packages', lambda: ReplayPackageSession(self.replay.get('packages')))
@@ -0,0 +1,99 @@
+"""Saúde dos discos a partir da saída JSON do smartctl ('smartctl -j').
+
+parse_smartctl() transforma a saída de um disco (SATA/ATA ou NVMe) em um
+dicionário com os atributos que importam para prever falhas: resultado do
+autoteste, temperatura, setores realocados e pendentes, desgaste (SSD), erros
+de mídia e horas ligado. Atributos que o disco não informa ficam como None.
+Exemplos reais de saída ficam em agent/fixtures/smartctl/ (ver verify_smart.py).
+"""
+import json
+
+# Discos físicos em /sys/block (ficam de fora loop, ram, zram, dm-, md, sr...)
+DEVICE_PREFIXES = ('sd', 'hd', 'nvme')
+# Discos que o smartctl não consegue ler: virtio/Xen de máquinas virtuais e eMMC.
+# Entram na lista com NO_SMART_HEALTH, sem rodar o smartctl (que só devolveria erro).
+NO_SMART_PREFIXES = ('vd', 'xvd', 'mmcblk')
+# Partições de hardware do eMMC (boot0, boot1, rpmb) aparecem em /sys/block como discos
+EMMC_HW_PARTITIONS = ('boot0', 'boot1', 'rpmb')
+NO_SMART_HEALTH = "Sem suporte a SMART"
+
+# Resumo de 'storage_health' quando o smartmontools não está instalado
+NOT_INSTALLED = "smartctl não instalado"
+
+# Atributos SMART (ATA) pelo id
+ATTR_REALLOCATED = 5
+ATTR_POWER_ON_HOURS = 9
+ATTR_TEMPERATURE = (194, 190)
+ATTR_PENDING = 197
+# Atributos de desgaste de SSD cujo valor normalizado é a vida restante (%)
+ATTR_WEAR = (177, 231, 233, 202)
+
+
+def block_devices(names):
+    """Caminhos /dev dos discos físicos a partir dos nomes listados em /sys/block."""
+    return [f"/dev/{name}" for name in sorted(names) if name.startswith(DEVICE_PREFIXES)]
+
+
+def no_smart_devices(names):
+    """Entradas dos discos sem SMART (VMs, eMMC) listados em /sys/block."""
+    return [{'device': f"/dev/{name}", 'health': NO_SMART_HEALTH} for name in sorted(names)
+            if name.startswith(NO_SMART_PREFIXES) and not name.endswith(EMMC_HW_PARTITIONS)]
+
+
+def _raw(attributes, attribute_id):
+    attribute = attributes.get(attribute_id)
+    return attribute['raw']['value'] if attribute else None
+
+
+def parse_smartctl(output, device):
+    """Converte a saída de 'smartctl -H -A -i -j' em um dicionário por disco.
+
+    Lança ValueError se a saída não trouxer dados SMART (ex.: disco que não
+    pôde ser aberto), com a mensagem do smartctl.
+    """
+    if not output.strip():
+        # 'sudo -n' sem permissão para o smartctl termina sem escrever nada
+        raise ValueError("smartctl não retornou dados (sem permissão de sudo?)")
+    report = json.loads(output)
+    if 'smart_status' not in report and 'ata_smart_attributes' not in report \
+            and 'nvme_smart_health_information_log' not in report:
+        messages = report.get('smartctl', {}).get('messages') or [{'string': "sem dados SMART"}]
+        raise ValueError(messages[0]['string'])
+
+    passed = report.get('smart_status', {}).get('passed')
+    attributes = {row['id']: row for row in report.get('ata_smart_attributes', {}).get('table', [])}
+    nvme = report.get('nvme_smart_health_information_log', {})
+
+    temperature = report.get('temperature', {}).get('current', nvme.get('temperature'))
+    if temperature is None:
+        raw = next((_raw(attributes, attribute_id) for attribute_id in ATTR_TEMPERATURE
+                    if attribute_id in attributes), None)
+        # O valor bruto guarda mínimo/máximo nos bytes altos; a temperatura atual é o byte baixo
+        temperature = raw & 0xFF if raw is not None else None
+
+    wear = nvme.get('percentage_used')
+    if wear is None:
+        wear = next((100 - attributes[attribute_id]['value'] for attribute_id in ATTR_WEAR
+                     if attribute_id in attributes), None)
+
+    return {
+        'device': device,
+        'model': report.get('model_name') or report.get('model_family'),
+        'serial': report.get('serial_number'),
+        'protocol': report.get('device', {}).get('protocol'),
+        'health': "PASSED" if passed else "FAILED" if passed is False else "Desconhecido",
+        'temperature_c': temperature,
+        'reallocated_sectors': _raw(attributes, ATTR_REALLOCATED),
+        'pending_sectors': _raw(attributes, ATTR_PENDING),
+        'wear_percent_used': wear,
+        'media_errors': nvme.get('media_errors'),
+        'power_on_hours': report.get('power_on_time', {}).get(
+            'hours', nvme.get('power_on_hours', _raw(attributes, ATTR_POWER_ON_HOURS))),
+    }
+
+
+def summary(devices):
+    """Texto curto para a coluna 'storage_health': "modelo: resultado" de cada disco."""
+    if not devices:
+        return "Nenhum disco com SMART"
+    return "; ".join(f"{device.get('model') or device['device']}: {device.get('health')}" for device in devices)
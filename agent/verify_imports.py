@@ -0,0 +1,84 @@
+"""Verifica o custo de importação do coletor, do relatório e da GUI.
+
+Cada módulo é importado em um interpretador novo com 'python -X importtime',
+a partir de uma pasta temporária vazia. A verificação falha se:
+  - o tempo de importação do módulo (mediana de algumas execuções) passar do orçamento;
+  - algum módulo pesado for carregado já na importação (ex.: requests no collector);
+  - a importação criar arquivos (banco, spool...) ou a janela Tk.
+Uso: python ./agent/verify_imports.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+# (módulo, pasta onde ele está, orçamento em ms, módulos que não podem ser carregados na importação)
+CHECKS = [
+    ('collector', 'agent', 80, ('requests', 'urllib3', 'psutil', 'wmi', 'pythoncom', 'zstandard')),
+    ('reporter', 'agent', 80, ('requests', 'psutil')),
+    ('gui', '', 300, ('requests', 'psutil')),
+]
+
+# Roda depois da importação: a janela Tk foi criada? Quantos arquivos apareceram na pasta?
+AFTER_IMPORT = ("import os, sys; tk = sys.modules.get('tkinter'); "
+                "print(int(bool(tk and tk._default_root)), len(os.listdir('.')))")
+
+
+def import_once(module, folder, workdir):
+    """Importa o módulo uma vez; retorna (ms cumulativos, módulos carregados, janela criada, arquivos criados)."""
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, folder))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}; {AFTER_IMPORT}"],
+                            cwd=workdir, env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"falha ao importar {module}: {result.stderr.strip().splitlines()[-1:]}")
+    cumulative = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        loaded.add(name.strip())
+        if name.strip() == module and total.strip().isdigit():
+            cumulative = int(total) / 1000
+    window, files = (int(value) for value in result.stdout.split()[-2:])
+    return cumulative, loaded, bool(window), files
+
+
+def check(module, folder, budget_ms, forbidden):
+    with tempfile.TemporaryDirectory() as workdir:
+        import_once(module, folder, workdir)  # aquece o cache de bytecode
+        runs = [import_once(module, folder, workdir) for _ in range(RUNS)]
+    elapsed = statistics.median(run[0] for run in runs)
+    heavy = sorted(name for name in forbidden if name in runs[0][1])
+    window = any(run[2] for run in runs)
+    files = max(run[3] for run in runs)
+
+    problems = []
+    if elapsed > budget_ms:
+        problems.append(f"acima do orçamento de {budget_ms} ms")
+    if heavy:
+        problems.append(f"importa {', '.join(heavy)}")
+    if window:
+        problems.append("cria a janela Tk")
+    if files:
+        problems.append(f"cria {files} arquivo(s)")
+    print(f"{'OK  ' if not problems else 'ERRO'} {module}: {elapsed:.1f} ms"
+          + (f" ({'; '.join(problems)})" if problems else ""))
+    return bool(problems)
+
+
+try:
+    failures = sum(check(*entry) for entry in CHECKS)
+    if failures:
+        print(f"ERRO: {failures} ponto(s) de entrada com importação lenta ou com efeitos colaterais.")
+        sys.exit(1)
+    print("SUCESSO: pontos de entrada dentro do orçamento de importação.")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"ERRO ao verificar as importações: {e}")
+    sys.exit(1)
@@ -0,0 +1,77 @@
+"""Verifica a leitura do SMART (smart.py) e a avaliação de risco dos discos no servidor.
+
+Cada arquivo de agent/fixtures/smartctl/ é uma saída real de 'smartctl -H -A -i -j';
+a verificação confere os campos extraídos e o nível de risco calculado por
+db/disk_health.py. Para um disco novo, grave a saída com
+'sudo smartctl -H -A -i -j /dev/sdX > fixtures/smartctl/nome.json' e acrescente em EXPECTED.
+Uso: python ./agent/verify_smart.py
+"""
+import os
+import sys
+
+AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(AGENT_DIR, 'fixtures', 'smartctl')
+sys.path.insert(0, os.path.dirname(AGENT_DIR))
+from db import disk_health  # noqa: E402
+import smart  # noqa: E402
+
+# fixture: (campos esperados, risco esperado)
+EXPECTED = {
+    'ata_ssd_ok.json': ({'model': "Samsung SSD 870 EVO 500GB", 'protocol': "ATA", 'health': "PASSED",
+                         'temperature_c': 34, 'reallocated_sectors': 0, 'pending_sectors': None,
+                         'wear_percent_used': 3, 'media_errors': None, 'power_on_hours': 8123},
+                        disk_health.RISK_OK),
+    'ata_hdd_failing.json': ({'model': "ST1000DM003-1CH162", 'serial': "Z1D5ABCD", 'health': "FAILED",
+                              'temperature_c': 41, 'reallocated_sectors': 3912, 'pending_sectors': 24,
+                              'wear_percent_used': None, 'power_on_hours': 52811},
+                             disk_health.RISK_FAILING),
+    'nvme_ok.json': ({'model': "SAMSUNG MZVL2512HCJQ-00B00", 'protocol': "NVMe", 'health': "PASSED",
+                      'temperature_c': 38, 'reallocated_sectors': None, 'wear_percent_used': 93,
+                      'media_errors': 0, 'power_on_hours': 6120},
+                     disk_health.RISK_WARNING),
+}
+# Saídas sem dados SMART: parse_smartctl deve lançar ValueError
+UNREADABLE = ('open_failed.json',)
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def check(name, expected, expected_risk):
+    device = smart.parse_smartctl(read_fixture(name), f"/dev/{name}")
+    wrong = {field: device.get(field) for field, value in expected.items() if device.get(field) != value}
+    risk, reasons = disk_health.assess(device)
+    ok = not wrong and risk == expected_risk
+    print(f"{'OK  ' if ok else 'ERRO'} {name}: risco {risk} ({reasons or 'sem alertas'})"
+          + (f" campos diferentes: {wrong}" if wrong else ""))
+    return not ok
+
+
+def check_unreadable(name):
+    try:
+        smart.parse_smartctl(read_fixture(name), f"/dev/{name}")
+    except ValueError as e:
+        print(f"OK   {name}: {e}")
+        return False
+    print(f"ERRO {name}: saída sem dados SMART não foi rejeitada")
+    return True
+
+
+try:
+    failures = sum(check(name, *expected) for name, expected in EXPECTED.items())
+    failures += sum(check_unreadable(name) for name in UNREADABLE)
+    untested = set(os.listdir(FIXTURES_DIR)) - set(EXPECTED) - set(UNREADABLE)
+    if untested:
+        print(f"ERRO fixtures sem verificação: {sorted(untested)}")
+        failures += 1
+    if failures:
+        print(f"ERRO: {failures} verificação(ões) do SMART falharam.")
+        sys.exit(1)
+    print("SUCESSO: saídas do smartctl interpretadas corretamente.")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"ERRO ao verificar o SMART: {e}")
+    sys.exit(1)
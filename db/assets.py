@@ -0,0 +1,154 @@
+"""Consultas paginadas e projetadas sobre a tabela 'assets'.
+
+A paginação é por chave (keyset) em 'hostname': cada página começa depois do
+último hostname da página anterior, então o custo não cresce com o "offset"
+e a ordem é estável mesmo com inserções concorrentes.
+"""
+import json
+
+# Colunas da tabela 'assets' (também as que podem ser pedidas na projeção)
+ASSET_COLUMNS = (
+    'hostname', 'id_patrimonio', 'serial_number', 'device_model', 'fabricante', 'data_compra', 'fornecedor', 'custo',
+    'garantia_venc', 'local_fisico', 'centro_custo', 'usuario_designado', 'departamento', 'status', 'ultima_manutencao',
+    'os', 'architecture', 'cpu_model', 'cpu_cores_physical', 'cpu_cores_logical', 'ram_total_gb', 'ram_slots',
+    'mac_address', 'ip_address', 'last_updated', 'disks', 'storage_health', 'gpu_info', 'windows_update_status',
+    'installed_software', 'monitors'
+)
+
+# Colunas guardadas como texto JSON e devolvidas já decodificadas
+JSON_FIELDS = ('disks', 'monitors')
+
+# Filtros de igualdade aceitos (todos com índice próprio)
+EQUALITY_FILTERS = ('status', 'departamento', 'os')
+
+MAX_PAGE_SIZE = 1000
+
+
+def create_indexes(cursor):
+    """Índices usados pelos filtros da listagem; todos terminam em 'hostname' para a paginação."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_status ON assets (status, hostname)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_departamento ON assets (departamento, hostname)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_os ON assets (os, hostname)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_last_updated ON assets (last_updated)")
+
+
+def select_fields(fields=None):
+    """Valida a projeção pedida e retorna a lista de colunas (hostname sempre incluído)."""
+    fields = list(fields) if fields else list(ASSET_COLUMNS)
+    unknown = [field for field in fields if field not in ASSET_COLUMNS]
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+    if 'hostname' not in fields:
+        fields.insert(0, 'hostname')
+    return fields
+
+
+def list_assets(conn, fields=None, after=None, limit=100, filters=None, updated_since=None, updated_until=None):
+    """Retorna (itens, próximo cursor) de uma página de ativos ordenada por hostname.
+
+    'fields' restringe as colunas (hostname sempre vem junto), 'filters' é um
+    dicionário coluna -> valor limitado a EQUALITY_FILTERS e 'after' é o
+    cursor devolvido pela página anterior. Lança ValueError para parâmetros inválidos.
+    """
+    fields = select_fields(fields)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where = []
+    params = []
+    for column, value in (filters or {}).items():
+        if column not in EQUALITY_FILTERS:
+            raise ValueError(f"Filtro não suportado: {column}")
+        where.append(f"{column} = ?")
+        params.append(value)
+    if updated_since:
+        where.append("last_updated >= ?")
+        params.append(updated_since)
+    if updated_until:
+        where.append("last_updated < ?")
+        params.append(updated_until)
+    if after:
+        where.append("hostname > ?")
+        params.append(after)
+
+    query = f"SELECT {', '.join(fields)} FROM assets"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    # Busca um item a mais só para saber se existe próxima página
+    query += " ORDER BY hostname LIMIT ?"
+    params.append(limit + 1)
+
+    rows = conn.execute(query, params).fetchall()
+    items = []
+    for row in rows[:limit]:
+        item = dict(zip(fields, row))
+        for field in JSON_FIELDS:
+            if item.get(field):
+                try:
+                    item[field] = json.loads(item[field])
+                except ValueError:
+                    pass
+        items.append(item)
+    next_after = items[-1]['hostname'] if len(rows) > limit else None
+    return items, next_after
+
+
+# Ordem da lista da GUI: hostname sem diferenciar maiúsculas, com o hostname
+# exato como desempate (coberta por idx_assets_list)
+LIST_ORDER = ("hostname COLLATE NOCASE", "hostname")
+
+
+def _list_where(where, params, extra=None, values=()):
+    conditions = [f"({where})"] if where else []
+    params = list(params)
+    if extra:
+        conditions.append(extra)
+        params.extend(values)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def list_window(conn, columns, where="", params=(), after=None, before=None, offset=0, limit=50):
+    """Janela de até 'limit' linhas da lista da GUI, na ordem de LIST_ORDER.
+
+    Com 'after' a janela começa logo depois desse hostname e com 'before'
+    termina logo antes dele (paginação por chave, coberta por idx_assets_list);
+    sem nenhum dos dois começa na posição 'offset' (salto da barra de rolagem).
+    'where' é um filtro SQL opcional sobre 'assets', com seus 'params'.
+    """
+    order = ", ".join(LIST_ORDER)
+    # A primeira condição limita a faixa do índice; a segunda resolve o desempate
+    if after is not None:
+        clause, params = _list_where(
+            where, params, "hostname COLLATE NOCASE >= ? AND (hostname COLLATE NOCASE > ? OR hostname > ?)",
+            (after, after, after))
+    elif before is not None:
+        clause, params = _list_where(
+            where, params, "hostname COLLATE NOCASE <= ? AND (hostname COLLATE NOCASE < ? OR hostname < ?)",
+            (before, before, before))
+        order = ", ".join(f"{term} DESC" for term in LIST_ORDER)
+    else:
+        clause, params = _list_where(where, params)
+    query = f"SELECT {', '.join(columns)} FROM assets{clause} ORDER BY {order} LIMIT ?"
+    params.append(limit)
+    if after is None and before is None:
+        query += " OFFSET ?"
+        params.append(max(0, offset))
+    rows = conn.execute(query, params).fetchall()
+    return rows[::-1] if before is not None else rows
+
+
+def rows_for_hostnames(conn, columns, hostnames):
+    """Linhas com as colunas pedidas para os hostnames informados, na mesma ordem deles."""
+    hostnames = list(hostnames)
+    found = {}
+    for start in range(0, len(hostnames), MAX_PAGE_SIZE):
+        chunk = hostnames[start:start + MAX_PAGE_SIZE]
+        marks = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM assets WHERE hostname IN ({marks})", chunk):
+            found[row['hostname']] = row
+    return [found[hostname] for hostname in hostnames if hostname in found]
+
+
+def count_list(conn, where="", params=()):
+    """Quantidade de linhas da lista da GUI com o filtro 'where'."""
+    clause, params = _list_where(where, params)
+    return conn.execute(f"SELECT COUNT(*) FROM assets{clause}", params).fetchone()[0]
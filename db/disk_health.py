@@ -0,0 +1,125 @@
+"""Saúde dos discos de cada host (SMART), para achar os discos da frota prestes a falhar.
+
+Cada relatório traz em 'storage_devices' uma entrada por disco (ver
+agent/smart.py); a tabela guarda o estado mais recente de cada disco. O nível
+de risco é calculado na gravação e indexado, para que a consulta de frota leia
+só os discos em risco em vez de avaliar todos.
+"""
+
+RISK_OK, RISK_WARNING, RISK_FAILING = 0, 1, 2
+
+# Resultados do autoteste que indicam falha (smartctl no Linux, Win32_DiskDrive.Status no Windows)
+FAILED_HEALTH = ('FAILED', 'Pred Fail')
+
+# Limites para marcar um disco como em alerta
+WEAR_WARNING_PERCENT = 90
+TEMPERATURE_WARNING_C = 60
+
+FIELDS = ('model', 'serial', 'protocol', 'health', 'temperature_c', 'reallocated_sectors',
+          'pending_sectors', 'wear_percent_used', 'media_errors', 'power_on_hours')
+NUMERIC_FIELDS = FIELDS[4:]
+
+
+def create_tables(cursor):
+    """Cria a tabela dos discos e o índice da consulta de discos em risco."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS disk_health (
+            hostname TEXT NOT NULL,
+            device TEXT NOT NULL,
+            model TEXT,
+            serial TEXT,
+            protocol TEXT,
+            health TEXT,
+            temperature_c REAL,
+            reallocated_sectors INTEGER,
+            pending_sectors INTEGER,
+            wear_percent_used INTEGER,
+            media_errors INTEGER,
+            power_on_hours INTEGER,
+            risk INTEGER NOT NULL,
+            reasons TEXT,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (hostname, device)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_disk_health_risk ON disk_health (risk DESC, hostname, device)")
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def assess(device):
+    """Nível de risco de um disco e os motivos, a partir dos atributos SMART."""
+    reasons = []
+    risk = RISK_OK
+    if device.get('health') in FAILED_HEALTH:
+        reasons.append("autoteste SMART reprovado")
+        risk = RISK_FAILING
+    wear = _number(device.get('wear_percent_used'))
+    if wear is not None and wear >= 100:
+        reasons.append(f"vida útil esgotada ({wear:.0f}%)")
+        risk = RISK_FAILING
+    elif wear is not None and wear >= WEAR_WARNING_PERCENT:
+        reasons.append(f"desgaste {wear:.0f}%")
+    for field, label in (('reallocated_sectors', "setores realocados"),
+                         ('pending_sectors', "setores pendentes"),
+                         ('media_errors', "erros de mídia")):
+        count = _number(device.get(field))
+        if count:
+            reasons.append(f"{count:.0f} {label}")
+    temperature = _number(device.get('temperature_c'))
+    if temperature is not None and temperature >= TEMPERATURE_WARNING_C:
+        reasons.append(f"temperatura {temperature:.0f} °C")
+    if reasons and risk == RISK_OK:
+        risk = RISK_WARNING
+    return risk, "; ".join(reasons)
+
+
+def rows_from_devices(hostname, devices, updated_at):
+    """Linhas de 'disk_health' a partir do 'storage_devices' de um relatório (ignora entradas inválidas)."""
+    if not isinstance(devices, list):
+        return []
+    rows = []
+    for device in devices:
+        if not isinstance(device, dict) or not device.get('device'):
+            continue
+        values = [str(device[field])[:200] if device.get(field) is not None else None for field in FIELDS[:4]]
+        values += [_number(device.get(field)) for field in NUMERIC_FIELDS]
+        risk, reasons = assess(device)
+        rows.append((hostname, str(device['device'])[:100], *values, risk, reasons, updated_at))
+    return rows
+
+
+def record(conn, hostname, rows):
+    """Substitui os discos do host pelos do relatório, na transação de 'conn'."""
+    conn.execute("DELETE FROM disk_health WHERE hostname = ?", (hostname,))
+    columns = ('hostname', 'device') + FIELDS + ('risk', 'reasons', 'updated_at')
+    conn.executemany(f"INSERT INTO disk_health ({', '.join(columns)}) "
+                     f"VALUES ({', '.join('?' * len(columns))})", rows)
+
+
+def at_risk(conn, min_risk=RISK_WARNING, limit=100):
+    """Discos da frota com risco >= min_risk, dos que estão falhando para os em alerta."""
+    rows = conn.execute(f'''
+        SELECT hostname, device, {', '.join(FIELDS)}, risk, reasons, updated_at
+        FROM disk_health
+        WHERE risk >= ?
+        ORDER BY risk DESC, hostname, device
+        LIMIT ?
+    ''', (min_risk, limit))
+    keys = ('hostname', 'device') + FIELDS + ('risk', 'reasons', 'updated_at')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def host_disks(conn, hostname):
+    """Discos de um host com o estado mais recente."""
+    rows = conn.execute(f'''
+        SELECT device, {', '.join(FIELDS)}, risk, reasons, updated_at
+        FROM disk_health WHERE hostname = ? ORDER BY device
+    ''', (hostname,))
+    keys = ('device',) + FIELDS + ('risk', 'reasons', 'updated_at')
+    return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,196 @@
+"""Série temporal de uso de disco por host/ponto de montagem.
+
+Cada gravação da seção 'disks' gera um ponto bruto em 'disk_usage_raw' e
+atualiza, na mesma transação, os agregados por hora e por dia em
+'disk_usage_rollup' (amostras, mínimo, máximo e soma para a média). Como a
+seção só é gravada quando muda, a série é uma função em degraus: entre dois
+pontos o uso ficou igual ao do ponto anterior.
+
+Os pontos brutos e os agregados são expirados conforme as retenções abaixo;
+consultas de frota (ex.: discos enchendo mais rápido) usam apenas os agregados.
+"""
+import os
+import time
+
+RAW_RETENTION_DAYS = int(os.environ.get('INVENTORY_DISK_RAW_RETENTION_DAYS', 14))
+HOURLY_RETENTION_DAYS = int(os.environ.get('INVENTORY_DISK_HOURLY_RETENTION_DAYS', 90))
+DAILY_RETENTION_DAYS = int(os.environ.get('INVENTORY_DISK_DAILY_RETENTION_DAYS', 730))
+# Intervalo mínimo entre duas limpezas de retenção
+PRUNE_INTERVAL_SECONDS = 3600
+
+RESOLUTIONS = {'hour': 3600, 'day': 86400}
+
+_last_prune = 0
+
+
+def create_tables(cursor):
+    """Cria as tabelas de pontos brutos e agregados."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS disk_usage_raw (
+            hostname TEXT NOT NULL,
+            mountpoint TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            total_gb REAL,
+            used_gb REAL,
+            percent_used REAL,
+            PRIMARY KEY (hostname, mountpoint, ts)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_disk_usage_raw_ts ON disk_usage_raw (ts)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS disk_usage_rollup (
+            resolution TEXT NOT NULL,
+            hostname TEXT NOT NULL,
+            mountpoint TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            samples INTEGER NOT NULL,
+            min_percent REAL,
+            max_percent REAL,
+            sum_percent REAL,
+            min_used_gb REAL,
+            max_used_gb REAL,
+            sum_used_gb REAL,
+            total_gb REAL,
+            PRIMARY KEY (resolution, hostname, mountpoint, bucket)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_disk_usage_rollup_bucket ON disk_usage_rollup (resolution, bucket)")
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def record(conn, hostname, disks, ts=None):
+    """Grava os pontos de uso dos discos de um host e atualiza os agregados.
+
+    'ts' é o momento da coleta (epoch). Um ponto que já existe (mesmo disco no
+    mesmo segundo, ex.: relatório reenviado) não é gravado de novo nem conta
+    outra vez nos agregados; pontos sem uso numérico ficam fora dos agregados.
+    """
+    if not isinstance(disks, list):
+        return 0
+    ts = int(ts if ts is not None else time.time())
+    points = []
+    for disk in disks:
+        if not isinstance(disk, dict) or not disk.get('mountpoint'):
+            continue
+        point = (hostname, str(disk['mountpoint']), ts, _number(disk.get('total_gb')),
+                 _number(disk.get('used_gb')), _number(disk.get('percent_used')))
+        inserted = conn.execute('''
+            INSERT OR IGNORE INTO disk_usage_raw (hostname, mountpoint, ts, total_gb, used_gb, percent_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', point).rowcount
+        if inserted:
+            points.append(point)
+    rollup = [point for point in points if point[4] is not None and point[5] is not None]
+
+    for resolution, seconds in RESOLUTIONS.items():
+        bucket = ts - ts % seconds
+        conn.executemany('''
+            INSERT INTO disk_usage_rollup (resolution, hostname, mountpoint, bucket, samples,
+                min_percent, max_percent, sum_percent, min_used_gb, max_used_gb, sum_used_gb, total_gb)
+            VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (resolution, hostname, mountpoint, bucket) DO UPDATE SET
+                samples = samples + 1,
+                min_percent = MIN(min_percent, excluded.min_percent),
+                max_percent = MAX(max_percent, excluded.max_percent),
+                sum_percent = sum_percent + excluded.sum_percent,
+                min_used_gb = MIN(min_used_gb, excluded.min_used_gb),
+                max_used_gb = MAX(max_used_gb, excluded.max_used_gb),
+                sum_used_gb = sum_used_gb + excluded.sum_used_gb,
+                total_gb = COALESCE(excluded.total_gb, total_gb)
+        ''', [(resolution, host, mountpoint, bucket, percent, percent, percent, used, used, used, total)
+              for host, mountpoint, _, total, used, percent in rollup])
+    return len(points)
+
+
+def prune(conn, now=None):
+    """Remove pontos brutos e agregados fora da retenção. Retorna as linhas removidas."""
+    now = int(now if now is not None else time.time())
+    removed = conn.execute("DELETE FROM disk_usage_raw WHERE ts < ?",
+                           (now - RAW_RETENTION_DAYS * 86400,)).rowcount
+    for resolution, days in (('hour', HOURLY_RETENTION_DAYS), ('day', DAILY_RETENTION_DAYS)):
+        removed += conn.execute("DELETE FROM disk_usage_rollup WHERE resolution = ? AND bucket < ?",
+                                (resolution, now - days * 86400)).rowcount
+    return removed
+
+
+def maybe_prune(conn):
+    """Executa prune() no máximo uma vez por PRUNE_INTERVAL_SECONDS neste processo."""
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return 0
+    _last_prune = now
+    return prune(conn, now)
+
+
+def series(conn, hostname, mountpoint=None, resolution='hour', since=None, until=None, limit=5000):
+    """Pontos da série de um host. 'resolution' é 'raw', 'hour' ou 'day'; since/until em epoch."""
+    params = [hostname]
+    where = ["hostname = ?"]
+    if mountpoint:
+        where.append("mountpoint = ?")
+        params.append(mountpoint)
+    if resolution == 'raw':
+        time_column = 'ts'
+        query = "SELECT mountpoint, ts, total_gb, used_gb, percent_used FROM disk_usage_raw"
+    elif resolution in RESOLUTIONS:
+        time_column = 'bucket'
+        where.insert(0, "resolution = ?")
+        params.insert(0, resolution)
+        query = '''
+            SELECT mountpoint, bucket, samples, min_percent, max_percent, sum_percent / samples,
+                   min_used_gb, max_used_gb, sum_used_gb / samples, total_gb
+            FROM disk_usage_rollup
+        '''
+    else:
+        raise ValueError(f"Resolução inválida: {resolution}")
+    if since is not None:
+        where.append(f"{time_column} >= ?")
+        params.append(int(since))
+    if until is not None:
+        where.append(f"{time_column} < ?")
+        params.append(int(until))
+    params.append(limit)
+    rows = conn.execute(f"{query} WHERE {' AND '.join(where)} ORDER BY mountpoint, {time_column} LIMIT ?", params)
+
+    if resolution == 'raw':
+        keys = ('mountpoint', 'ts', 'total_gb', 'used_gb', 'percent_used')
+    else:
+        keys = ('mountpoint', 'bucket', 'samples', 'min_percent', 'max_percent', 'avg_percent',
+                'min_used_gb', 'max_used_gb', 'avg_used_gb', 'total_gb')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def fastest_filling(conn, days=7, limit=20, now=None):
+    """Discos da frota com maior crescimento de uso (pontos percentuais por dia).
+
+    Compara o primeiro e o último agregado diário de cada disco na janela.
+    """
+    now = int(now if now is not None else time.time())
+    start = now - now % 86400 - days * 86400
+    rows = conn.execute('''
+        WITH daily AS (
+            SELECT hostname, mountpoint, bucket, sum_percent / samples AS avg_percent, total_gb,
+                   ROW_NUMBER() OVER (PARTITION BY hostname, mountpoint ORDER BY bucket) AS first_rank,
+                   ROW_NUMBER() OVER (PARTITION BY hostname, mountpoint ORDER BY bucket DESC) AS last_rank
+            FROM disk_usage_rollup
+            WHERE resolution = 'day' AND bucket >= ?
+        )
+        SELECT f.hostname, f.mountpoint, f.avg_percent, l.avg_percent, f.bucket, l.bucket, l.total_gb,
+               (l.avg_percent - f.avg_percent) / ((l.bucket - f.bucket) / 86400.0) AS growth
+        FROM daily f
+        JOIN daily l ON l.hostname = f.hostname AND l.mountpoint = f.mountpoint AND l.last_rank = 1
+        WHERE f.first_rank = 1 AND l.bucket > f.bucket
+        ORDER BY growth DESC
+        LIMIT ?
+    ''', (start, limit))
+    keys = ('hostname', 'mountpoint', 'first_percent', 'last_percent', 'first_bucket', 'last_bucket',
+            'total_gb', 'percent_per_day')
+    return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,70 @@
+"""Exportação do inventário completo em CSV ou NDJSON, sem carregar tudo na memória.
+
+Os ativos são lidos em lotes pela paginação por hostname de assets.list_assets()
+e cada lote já sai formatado em texto; a conexão volta ao pool entre um lote e
+outro. O uso de memória depende só do tamanho do lote, não do tamanho da frota.
+
+Uso:
+    for chunk in export.stream(DB_FILE, 'csv', fields=['hostname', 'status'], filters={'status': 'Em uso'}):
+        output.write(chunk)
+"""
+import csv
+import io
+import json
+
+from db import assets, storage
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+BATCH_SIZE = 500
+
+
+def iter_batches(db_file, fields=None, filters=None, updated_since=None, updated_until=None, batch_size=BATCH_SIZE):
+    """Gera listas de ativos (dicionários) em ordem de hostname, um lote por vez."""
+    after = None
+    while True:
+        with storage.connection(db_file) as conn:
+            items, after = assets.list_assets(conn, fields=fields, after=after, limit=batch_size, filters=filters,
+                                              updated_since=updated_since, updated_until=updated_until)
+        if items:
+            yield items
+        if after is None:
+            return
+
+
+def _csv_value(value):
+    # Discos e monitores voltam ao texto JSON original dentro da célula
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+
+
+def csv_chunks(batches, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(fields)
+    for items in batches:
+        writer.writerows([_csv_value(item.get(field)) for field in fields] for item in items)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches):
+    for items in batches:
+        yield "".join(json.dumps(item, ensure_ascii=False, default=str) + "\n" for item in items)
+
+
+def stream(db_file, fmt, fields=None, filters=None, updated_since=None, updated_until=None, batch_size=BATCH_SIZE):
+    """Gera o texto da exportação em pedaços (um por lote).
+
+    Formato, campos e filtros são validados antes de devolver o gerador, então
+    um ValueError aparece na chamada e não no meio da exportação.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato não suportado: {fmt} (use {' ou '.join(FORMATS)})")
+    fields = assets.select_fields(fields)
+    unknown = [column for column in (filters or {}) if column not in assets.EQUALITY_FILTERS]
+    if unknown:
+        raise ValueError(f"Filtro não suportado: {', '.join(unknown)}")
+    batches = iter_batches(db_file, fields, filters, updated_since, updated_until, batch_size)
+    return csv_chunks(batches, fields) if fmt == 'csv' else ndjson_chunks(batches)
@@ -0,0 +1,142 @@
+"""Histórico append-only do inventário, gravado como deltas por campo.
+
+Cada alteração vira uma linha em 'asset_changes' (host, momento, campo, valor
+novo); softwares são registrados por pacote ('software:add' / 'software:remove').
+Como só o que mudou é gravado, o histórico cresce com as mudanças reais e não
+com a frequência dos relatórios.
+
+A cada CHECKPOINT_EVERY alterações de um host é gravado um snapshot completo em
+'asset_snapshots', então reconstruir o estado em um instante T lê no máximo um
+snapshot e CHECKPOINT_EVERY deltas.
+"""
+import json
+
+from db import software
+
+CHECKPOINT_EVERY = 50
+
+SOFTWARE_ADD = 'software:add'
+SOFTWARE_REMOVE = 'software:remove'
+
+# Colunas que não entram no estado histórico: mudam a cada relatório (o uso dos
+# discos já tem a série temporal de disk_series) ou já são registradas por pacote
+# através do catálogo de softwares
+IGNORED_COLUMNS = ('hostname', 'last_updated', 'disks', 'installed_software')
+
+
+def create_tables(cursor):
+    """Cria as tabelas de deltas e snapshots do histórico."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asset_changes (
+            id INTEGER PRIMARY KEY,
+            hostname TEXT NOT NULL,
+            changed_at TEXT NOT NULL,
+            field TEXT NOT NULL,
+            value
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asset_changes_host ON asset_changes (hostname, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asset_changes_field ON asset_changes (hostname, field, id)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asset_snapshots (
+            id INTEGER PRIMARY KEY,
+            hostname TEXT NOT NULL,
+            taken_at TEXT NOT NULL,
+            last_change_id INTEGER NOT NULL,
+            state TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asset_snapshots_host ON asset_snapshots (hostname, taken_at)")
+
+
+def record_changes(conn, hostname, changed_at, changes):
+    """Grava os deltas [(campo, valor novo), ...] de um host."""
+    conn.executemany(
+        "INSERT INTO asset_changes (hostname, changed_at, field, value) VALUES (?, ?, ?, ?)",
+        [(hostname, changed_at, field, value) for field, value in changes])
+
+
+def record_software_changes(conn, hostname, changed_at, added, removed):
+    """Grava a instalação/remoção de pacotes de um host."""
+    record_changes(conn, hostname, changed_at,
+                   [(SOFTWARE_ADD, name) for name in sorted(added)] +
+                   [(SOFTWARE_REMOVE, name) for name in sorted(removed)])
+
+
+def current_state(conn, hostname):
+    """Estado atual do host montado a partir de 'assets' e do catálogo de softwares."""
+    cursor = conn.execute("SELECT * FROM assets WHERE hostname=?", (hostname,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    columns = [description[0] for description in cursor.description]
+    state = {column: value for column, value in zip(columns, row) if column not in IGNORED_COLUMNS}
+    state['software'] = [name for name, _ in software.software_on_host(conn, hostname)]
+    return state
+
+
+def checkpoint(conn, hostname, taken_at, force=False):
+    """Grava um snapshot completo se o host acumulou CHECKPOINT_EVERY deltas (ou se 'force')."""
+    last = conn.execute(
+        "SELECT last_change_id FROM asset_snapshots WHERE hostname=? ORDER BY id DESC LIMIT 1",
+        (hostname,)).fetchone()
+    last_change_id = last[0] if last else 0
+    pending = conn.execute(
+        "SELECT id FROM asset_changes WHERE hostname=? AND id > ? ORDER BY id LIMIT ?",
+        (hostname, last_change_id, CHECKPOINT_EVERY)).fetchall()
+    if last and not force and len(pending) < CHECKPOINT_EVERY:
+        return False
+    state = current_state(conn, hostname)
+    if state is None:
+        return False
+    newest = conn.execute("SELECT MAX(id) FROM asset_changes WHERE hostname=?", (hostname,)).fetchone()[0] or 0
+    conn.execute(
+        "INSERT INTO asset_snapshots (hostname, taken_at, last_change_id, state) VALUES (?, ?, ?, ?)",
+        (hostname, taken_at, newest, json.dumps(state, default=str)))
+    return True
+
+
+def timeline(conn, hostname, field=None, since=None, until=None, limit=500):
+    """Lista as alterações do host em ordem cronológica, opcionalmente de um único campo."""
+    where = ["hostname = ?"]
+    params = [hostname]
+    if field:
+        where.append("field = ?")
+        params.append(field)
+    if since:
+        where.append("changed_at >= ?")
+        params.append(since)
+    if until:
+        where.append("changed_at < ?")
+        params.append(until)
+    params.append(limit)
+    rows = conn.execute(
+        f"SELECT id, changed_at, field, value FROM asset_changes WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+        params)
+    return [{"id": row[0], "changed_at": row[1], "field": row[2], "value": row[3]} for row in rows]
+
+
+def state_at(conn, hostname, at):
+    """Reconstrói o estado do host no instante 'at' (texto ISO); None se ainda não existia."""
+    snapshot = conn.execute('''
+        SELECT last_change_id, state FROM asset_snapshots
+        WHERE hostname = ? AND taken_at <= ?
+        ORDER BY taken_at DESC, id DESC LIMIT 1
+    ''', (hostname, at)).fetchone()
+    if snapshot is None:
+        return None
+    state = json.loads(snapshot[1])
+    installed = set(state.get('software', []))
+    for field, value in conn.execute('''
+        SELECT field, value FROM asset_changes
+        WHERE hostname = ? AND id > ? AND changed_at <= ?
+        ORDER BY id
+    ''', (hostname, snapshot[0], at)):
+        if field == SOFTWARE_ADD:
+            installed.add(value)
+        elif field == SOFTWARE_REMOVE:
+            installed.discard(value)
+        else:
+            state[field] = value
+    state['software'] = sorted(installed)
+    return state
@@ -0,0 +1,189 @@
+"""Tempos das coletas do agente (probe_status), para achar as coletas lentas da frota.
+
+Cada relatório traz em 'probe_status' o status e a duração de cada coleta. A
+linha de cada host/coleta guarda a medida mais recente e as últimas
+SAMPLES_PER_PROBE medidas ('recent_seconds', lista JSON da mais antiga para a
+mais nova, e 'recent_status', uma letra de STATUS_CODES por medida); o resumo
+delas (p50, p95, máximo, timeouts e erros) é recalculado a cada gravação e é
+por ele que as consultas de frota ordenam. Coletas servidas pelo cache do
+agente ('cached') não entram nas medidas.
+"""
+import json
+import math
+import os
+
+STATUSES = ('ok', 'timeout', 'error')
+STATUS_CODES = {'ok': 'o', 'timeout': 't', 'error': 'e'}
+# Medidas guardadas por host/coleta para o cálculo dos percentis
+SAMPLES_PER_PROBE = int(os.environ.get('INVENTORY_PROBE_TIMING_SAMPLES', 20))
+# Percentis aceitos na ordenação das consultas -> coluna de 'probe_timings'
+RANKINGS = {'p50': 'p50_seconds', 'p95': 'p95_seconds'}
+
+# Limite de parâmetros por consulta 'IN (...)'
+_CHUNK = 500
+
+
+def create_tables(cursor):
+    """Cria a tabela das medidas e os índices das consultas de frota."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS probe_timings (
+            hostname TEXT NOT NULL,
+            probe TEXT NOT NULL,
+            status TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            reported_at TEXT NOT NULL,
+            recent_seconds TEXT NOT NULL,
+            recent_status TEXT NOT NULL,
+            samples INTEGER NOT NULL,
+            p50_seconds REAL NOT NULL,
+            p95_seconds REAL NOT NULL,
+            max_seconds REAL NOT NULL,
+            timeouts INTEGER NOT NULL,
+            errors INTEGER NOT NULL,
+            PRIMARY KEY (hostname, probe)
+        ) WITHOUT ROWID
+    ''')
+    for ranking, column in RANKINGS.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_probe_timings_probe_{ranking} ON probe_timings (probe, {column})")
+    # Só o p95 (ordenação padrão) tem índice para a frota inteira: cada índice pesa em toda gravação
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_probe_timings_p95 ON probe_timings (p95_seconds)")
+
+
+def upgrade_recent(cursor):
+    """Converte a tabela antiga (só a última medida de cada host/coleta) para o formato com as medidas recentes.
+
+    A medida antiga vira a primeira das medidas recentes do host/coleta.
+    """
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(probe_timings)")]
+    if columns and 'recent_seconds' not in columns:
+        cursor.execute("ALTER TABLE probe_timings RENAME TO probe_timings_old")
+        cursor.execute("DROP INDEX IF EXISTS idx_probe_timings_probe_seconds")
+        cursor.execute("DROP INDEX IF EXISTS idx_probe_timings_seconds")
+        create_tables(cursor)
+        record(cursor.connection, cursor.execute(
+            "SELECT hostname, probe, status, seconds, reported_at FROM probe_timings_old").fetchall())
+        cursor.execute("DROP TABLE probe_timings_old")
+    else:
+        create_tables(cursor)
+
+
+def rows_from_status(hostname, probe_status, reported_at):
+    """Linhas de medidas a partir do 'probe_status' de um relatório (ignora entradas inválidas)."""
+    if not isinstance(probe_status, dict):
+        return []
+    rows = []
+    for probe, outcome in probe_status.items():
+        if not isinstance(outcome, dict) or outcome.get('status') not in STATUSES:
+            continue
+        try:
+            seconds = float(outcome.get('seconds'))
+        except (TypeError, ValueError):
+            continue
+        rows.append((hostname, str(probe)[:100], outcome['status'], seconds, reported_at))
+    return rows
+
+
+def percentile(ordered, percent):
+    """Percentil pelo método do posto mais próximo de uma lista já ordenada."""
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def record(conn, rows):
+    """Grava as medidas na transação de 'conn', atualizando as medidas recentes e o resumo.
+
+    Uma medida do mesmo momento da mais recente (relatório reenviado) a substitui;
+    uma medida mais antiga que a mais recente (relatório atrasado) é ignorada.
+    """
+    if not rows:
+        return
+    recent = {}
+    hostnames = list(dict.fromkeys(row[0] for row in rows))
+    for start in range(0, len(hostnames), _CHUNK):
+        chunk = hostnames[start:start + _CHUNK]
+        for hostname, probe, reported_at, seconds, status in conn.execute(f'''
+                SELECT hostname, probe, reported_at, recent_seconds, recent_status FROM probe_timings
+                WHERE hostname IN ({", ".join("?" for _ in chunk)})''', chunk):
+            recent[(hostname, probe)] = [reported_at, json.loads(seconds), status]
+    existing = set(recent)
+
+    changed = {}
+    for hostname, probe, status, seconds, reported_at in rows:
+        key = (hostname, probe)
+        measures = recent.get(key)
+        if measures is None:
+            measures = recent[key] = [reported_at, [], '']
+        elif reported_at < measures[0]:
+            continue
+        elif reported_at == measures[0]:
+            measures[1].pop()
+            measures[2] = measures[2][:-1]
+        measures[0] = reported_at
+        measures[1] = (measures[1] + [seconds])[-SAMPLES_PER_PROBE:]
+        measures[2] = (measures[2] + STATUS_CODES[status])[-SAMPLES_PER_PROBE:]
+        changed[key] = (status, seconds)
+
+    updates, inserts = [], []
+    for (hostname, probe), (status, seconds) in changed.items():
+        reported_at, values, codes = recent[(hostname, probe)]
+        ordered = sorted(values)
+        summary_row = (status, seconds, reported_at, json.dumps(values), codes, len(ordered),
+                       percentile(ordered, 50), percentile(ordered, 95), ordered[-1],
+                       codes.count(STATUS_CODES['timeout']), codes.count(STATUS_CODES['error']), hostname, probe)
+        (updates if (hostname, probe) in existing else inserts).append(summary_row)
+    # UPDATE só mexe nos índices dos percentis que mudaram; REPLACE reescreveria todos
+    conn.executemany('''
+        UPDATE probe_timings SET status = ?, seconds = ?, reported_at = ?, recent_seconds = ?, recent_status = ?,
+            samples = ?, p50_seconds = ?, p95_seconds = ?, max_seconds = ?, timeouts = ?, errors = ?
+        WHERE hostname = ? AND probe = ?
+    ''', updates)
+    conn.executemany('''
+        INSERT INTO probe_timings (status, seconds, reported_at, recent_seconds, recent_status, samples,
+            p50_seconds, p95_seconds, max_seconds, timeouts, errors, hostname, probe)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', inserts)
+
+
+def slowest(conn, probe=None, model=None, limit=20, ranking='p95'):
+    """Hosts/coletas mais lentos da frota pelo percentil 'ranking' ('p50' ou 'p95') das medidas recentes.
+
+    Opcionalmente de uma coleta e/ou de um modelo de máquina.
+    """
+    if ranking not in RANKINGS:
+        raise ValueError(f"Percentil inválido: {ranking}")
+    where = []
+    params = []
+    if probe:
+        where.append("t.probe = ?")
+        params.append(probe)
+    if model:
+        where.append("a.device_model = ?")
+        params.append(model)
+    params.append(limit)
+    rows = conn.execute(f'''
+        SELECT t.hostname, a.device_model, t.probe, t.samples, t.p50_seconds, t.p95_seconds, t.max_seconds,
+               t.timeouts, t.errors, t.status, t.seconds, t.reported_at
+        FROM probe_timings t
+        LEFT JOIN assets a ON a.hostname = t.hostname
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY t.{RANKINGS[ranking]} DESC
+        LIMIT ?
+    ''', params)
+    keys = ('hostname', 'device_model', 'probe', 'samples', 'p50_seconds', 'p95_seconds', 'max_seconds',
+            'timeouts', 'errors', 'status', 'seconds', 'reported_at')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def summary(conn, model=None):
+    """Por coleta: hosts medidos, médias do p50 e do p95 dos hosts, máximo, timeouts e erros
+    nas medidas recentes (do pior p95 médio para o melhor)."""
+    join = "JOIN assets a ON a.hostname = t.hostname AND a.device_model = ?" if model else ""
+    rows = conn.execute(f'''
+        SELECT t.probe, COUNT(*), SUM(t.samples), AVG(t.p50_seconds), AVG(t.p95_seconds), MAX(t.max_seconds),
+               SUM(t.timeouts), SUM(t.errors)
+        FROM probe_timings t
+        {join}
+        GROUP BY t.probe
+        ORDER BY AVG(t.p95_seconds) DESC
+    ''', (model,) if model else ())
+    keys = ('probe', 'hosts', 'samples', 'avg_p50_seconds', 'avg_p95_seconds', 'max_seconds', 'timeouts', 'errors')
+    return [dict(zip(keys, row)) for row in rows]
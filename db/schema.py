@@ -0,0 +1,196 @@
+"""Esquema do banco do inventário, versionado por PRAGMA user_version.
+
+Servidor e GUI chamam migrate() ao iniciar; só as migrações com número maior
+que o user_version do arquivo são aplicadas, cada uma em sua própria
+transação junto com a atualização da versão. Para mudar o esquema, acrescente
+uma função ao fim de MIGRATIONS (nunca altere uma que já foi publicada).
+
+As migrações são idempotentes (IF NOT EXISTS / checagem de colunas) porque os
+bancos criados antes deste módulo estão na versão 0 mas já têm parte das tabelas.
+"""
+from db import assets, disk_health, disk_series, history, probe_timings, search, software
+
+ASSETS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        hostname TEXT PRIMARY KEY,
+        id_patrimonio TEXT,
+        serial_number TEXT,
+        device_model TEXT,
+        fabricante TEXT,
+        data_compra TEXT,
+        fornecedor TEXT,
+        custo TEXT,
+        garantia_venc TEXT,
+        local_fisico TEXT,
+        centro_custo TEXT,
+        usuario_designado TEXT,
+        departamento TEXT,
+        status TEXT,
+        ultima_manutencao TEXT,
+        maintenance_history_note TEXT,
+        os TEXT,
+        architecture TEXT,
+        cpu_model TEXT,
+        cpu_cores_physical INTEGER,
+        cpu_cores_logical INTEGER,
+        ram_total_gb REAL,
+        ram_slots TEXT,
+        mac_address TEXT,
+        ip_address TEXT,
+        last_updated TEXT,
+        disks TEXT,
+        storage_health TEXT,
+        gpu_info TEXT,
+        windows_update_status TEXT,
+        installed_software TEXT,
+        monitors TEXT
+    )
+'''
+
+# Colunas (e tipos declarados) esperadas em 'assets' depois da migração 1
+ASSETS_COLUMN_TYPES = dict(line.strip().rstrip(',').split()[:2] for line in ASSETS_DDL.strip().splitlines()[1:-1])
+
+# Colunas exibidas na lista principal da GUI, cobertas pelo índice idx_assets_list
+LIST_COLUMNS = ('hostname', 'device_model', 'status', 'os', 'ip_address', 'usuario_designado', 'last_updated')
+
+
+def _unify_assets(cursor):
+    """Versão 1: uma única definição de 'assets' e da tabela de manutenções.
+
+    O servidor criava 'custo' como REAL e sem 'maintenance_history_note'; a GUI,
+    'custo' como TEXT e com a coluna. Bancos fora do formato são reconstruídos
+    (custo passa a TEXT, pois é digitado livremente na GUI) preservando os dados.
+    """
+    cursor.execute(ASSETS_DDL.format(name='assets'))
+    existing = {row[1]: row[2].upper() for row in cursor.execute("PRAGMA table_info(assets)")}
+    if existing != ASSETS_COLUMN_TYPES:
+        cursor.execute("DROP TABLE IF EXISTS assets_new")
+        cursor.execute(ASSETS_DDL.format(name='assets_new'))
+        shared = ", ".join(column for column in ASSETS_COLUMN_TYPES if column in existing)
+        cursor.execute(f"INSERT INTO assets_new ({shared}) SELECT {shared} FROM assets")
+        cursor.execute("DROP TABLE assets")
+        cursor.execute("ALTER TABLE assets_new RENAME TO assets")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, asset_hostname TEXT, maintenance_date TEXT,
+            description TEXT, technician TEXT, FOREIGN KEY (asset_hostname) REFERENCES assets (hostname)
+        )
+    ''')
+
+
+def _feature_tables(cursor):
+    """Versão 2: tabelas auxiliares (hashes, catálogo, suporte, histórico, discos)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asset_section_hashes (
+            hostname TEXT NOT NULL,
+            section TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            PRIMARY KEY (hostname, section)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS support_status_cache (
+            serial TEXT PRIMARY KEY,
+            suporte INTEGER,
+            checked_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    software.create_tables(cursor)
+    assets.create_indexes(cursor)
+    history.create_tables(cursor)
+    disk_series.create_tables(cursor)
+
+
+def _hot_query_indexes(cursor):
+    """Versão 3: índices das consultas mais frequentes da GUI e da API.
+
+    - lista/pesquisa por hostname (LIKE, sem diferenciar maiúsculas), coberta
+      pelas colunas exibidas na lista, para não ler o inventário completo;
+    - ativos por status ordenados/filtrados pela última atualização;
+    - histórico de manutenções de um host ordenado por data.
+    """
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_assets_list ON assets "
+                   f"(hostname COLLATE NOCASE, {', '.join(LIST_COLUMNS[1:])})")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_status_updated ON assets (status, last_updated, hostname)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_logs_host_date "
+                   "ON maintenance_logs (asset_hostname, maintenance_date)")
+
+
+def _search_index(cursor):
+    """Versão 4: índice de busca textual (FTS5), já populado com os hosts existentes."""
+    search.create_tables(cursor)
+    # O catálogo precisa estar completo antes: o índice inclui os softwares de cada host
+    software.backfill_from_assets(cursor.connection)
+    search.rebuild(cursor.connection)
+
+
+def _probe_timings(cursor):
+    """Versão 5: tempos das coletas do agente por host."""
+    probe_timings.create_tables(cursor)
+
+
+def _disk_health(cursor):
+    """Versão 6: saúde (SMART) de cada disco dos hosts."""
+    disk_health.create_tables(cursor)
+
+
+def _list_keyset_index(cursor):
+    """Versão 7: 'hostname' (BINARY) como desempate em idx_assets_list.
+
+    A lista virtual da GUI pagina por (hostname COLLATE NOCASE, hostname); sem o
+    desempate no índice, hostnames que só diferem em maiúsculas teriam a mesma
+    chave e a ordem entre eles exigiria uma ordenação extra.
+    """
+    cursor.execute("DROP INDEX IF EXISTS idx_assets_list")
+    cursor.execute(f"CREATE INDEX idx_assets_list ON assets "
+                   f"(hostname COLLATE NOCASE, hostname, {', '.join(LIST_COLUMNS[1:])})")
+
+
+def _probe_timing_history(cursor):
+    """Versão 8: últimas medidas de cada coleta por host e o resumo com p50/p95.
+
+    Antes só a medida mais recente era guardada; ela vira a primeira das recentes.
+    """
+    probe_timings.upgrade_recent(cursor)
+
+
+MIGRATIONS = [
+    _unify_assets,
+    _feature_tables,
+    _hot_query_indexes,
+    _search_index,
+    _probe_timings,
+    _disk_health,
+    _list_keyset_index,
+    _probe_timing_history,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Aplica as migrações pendentes. Retorna a lista das versões aplicadas."""
+    applied = []
+    for number, migration in enumerate(MIGRATIONS, 1):
+        if number <= version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Relê a versão com o lock de escrita: outro processo pode ter migrado antes
+            if number > version(conn):
+                migration(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {number}")
+                applied.append(number)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    if applied:
+        print(f"Esquema do banco atualizado para a versão {SCHEMA_VERSION} (migrações {applied}).")
+    return applied
@@ -0,0 +1,131 @@
+"""Busca textual (FTS5) sobre ativos, softwares instalados e manutenções.
+
+Cada host tem uma linha na tabela virtual 'asset_search' (rowid = hosts.id do
+catálogo de softwares) com hostname, usuário, IP/MAC, modelo, serial, nomes dos
+softwares e o texto das manutenções. A linha é regravada pela ingestão quando
+uma seção indexada muda e pela GUI ao salvar status/manutenção.
+
+Cada termo digitado vira um prefixo ("lat" encontra "Latitude") e todos os
+termos precisam aparecer; o resultado vem ordenado por relevância (bm25, com
+peso maior para hostname, usuário, IP e serial). O bm25 é calculado sobre todos
+os resultados, então buscas muito amplas (ex.: "google", presente em quase
+toda a frota) são ordenadas só pela coluna que casou, na ordem de SEARCH_COLUMNS.
+"""
+from db import software
+
+# Colunas indexadas, na ordem da tabela virtual
+SEARCH_COLUMNS = ('hostname', 'usuario', 'network', 'model', 'serial_number', 'software', 'maintenance')
+# Pesos do bm25 na mesma ordem de SEARCH_COLUMNS
+RANK = 'bm25(10.0, 5.0, 5.0, 2.0, 5.0, 1.0, 1.0)'
+
+# Seções do documento de inventário que alimentam o índice
+INDEXED_SECTIONS = ('cadastro', 'hardware', 'network', 'software')
+
+MAX_RESULTS = 1000
+# Acima de tantos resultados a busca deixa de usar o bm25 (mantém a busca abaixo de ~100 ms)
+RANK_CANDIDATES = 5000
+
+
+def create_tables(cursor):
+    """Cria a tabela FTS5 e configura a ordenação padrão por relevância."""
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS asset_search USING fts5(
+            {", ".join(SEARCH_COLUMNS)},
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '1 2 3'
+        )
+    ''')
+    cursor.execute("INSERT INTO asset_search (asset_search, rank) VALUES ('rank', ?)", (RANK,))
+
+
+def _document(conn, hostname):
+    row = conn.execute('''
+        SELECT usuario_designado, departamento, ip_address, mac_address, fabricante, device_model,
+               serial_number, id_patrimonio
+        FROM assets WHERE hostname=?
+    ''', (hostname,)).fetchone()
+    if row is None:
+        return None
+    usuario, departamento, ip_address, mac_address, fabricante, model, serial, patrimonio = row
+    logs = conn.execute(
+        "SELECT description, technician FROM maintenance_logs WHERE asset_hostname=? ORDER BY maintenance_date",
+        (hostname,)).fetchall()
+    return (
+        hostname,
+        " ".join(filter(None, (usuario, departamento))),
+        " ".join(filter(None, (ip_address, mac_address))),
+        " ".join(filter(None, (fabricante, model))),
+        " ".join(filter(None, (serial, patrimonio))),
+        "\n".join(name for name, _ in software.software_on_host(conn, hostname)),
+        "\n".join(" ".join(filter(None, log)) for log in logs),
+    )
+
+
+def index_hosts(conn, hostnames):
+    """Regrava no índice as linhas dos hosts informados (roda na transação de 'conn')."""
+    marks = ", ".join("?" for _ in SEARCH_COLUMNS)
+    for hostname in hostnames:
+        rowid = software.host_id(conn, hostname)
+        conn.execute("DELETE FROM asset_search WHERE rowid=?", (rowid,))
+        document = _document(conn, hostname)
+        if document is not None:
+            conn.execute(f"INSERT INTO asset_search (rowid, {', '.join(SEARCH_COLUMNS)}) VALUES (?, {marks})",
+                         (rowid, *document))
+
+
+def rebuild(conn, batch_size=500):
+    """Reindexa todos os hosts de 'assets'. Retorna a quantidade indexada."""
+    conn.execute("DELETE FROM asset_search")
+    hostnames = [row[0] for row in conn.execute("SELECT hostname FROM assets")]
+    for start in range(0, len(hostnames), batch_size):
+        index_hosts(conn, hostnames[start:start + batch_size])
+    return len(hostnames)
+
+
+def match_expression(text):
+    """Converte o texto digitado em uma consulta FTS5: termos como prefixo, todos obrigatórios.
+
+    Cada termo vai entre aspas, então caracteres especiais da sintaxe FTS5 não
+    causam erro; "BR-NB-01" vira a frase "br nb 01*". Retorna None se não houver termos.
+    """
+    terms = [term for term in text.split() if any(char.isalnum() for char in term)]
+    if not terms:
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def search(conn, text, columns=('hostname',), limit=50, snippets=True):
+    """Hosts que casam com 'text', do mais para o menos relevante.
+
+    Retorna dicionários com as colunas de 'assets' pedidas em 'columns' e, com
+    'snippets', o 'trecho' do texto indexado que casou (termo entre colchetes).
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    keys = tuple(columns) + (('trecho',) if snippets else ())
+    selected = ", ".join(f"a.{column}" for column in columns)
+    if snippets:
+        selected += ", snippet(asset_search, -1, '[', ']', '...', 8)"
+    query = f'''
+        SELECT asset_search.rowid, {selected}
+        FROM asset_search
+        JOIN assets a ON a.hostname = asset_search.hostname
+        WHERE asset_search MATCH ?
+    '''
+
+    matches = conn.execute("SELECT COUNT(*) FROM (SELECT 1 FROM asset_search WHERE asset_search MATCH ? LIMIT ?)",
+                           (expression, RANK_CANDIDATES + 1)).fetchone()[0]
+    if matches <= RANK_CANDIDATES:
+        rows = conn.execute(query + " ORDER BY rank LIMIT ?", (expression, limit)).fetchall()
+    else:
+        # Busca ampla: uma consulta por coluna, sem bm25, cada uma parando no limite
+        found = {}
+        for column in SEARCH_COLUMNS:
+            for row in conn.execute(query + " LIMIT ?", (f"{{{column}}} : ({expression})", limit + len(found))):
+                found.setdefault(row[0], row)
+            if len(found) >= limit:
+                break
+        rows = list(found.values())[:limit]
+    return [dict(zip(keys, row[1:])) for row in rows]
@@ -0,0 +1,182 @@
+"""Catálogo normalizado de softwares instalados.
+
+Em vez de depender apenas do texto "; "-separado de 'assets.installed_software',
+cada nome de software é internado uma única vez na tabela 'software' e a relação
+host x software fica em 'host_software', com índices nos dois sentidos. Assim
+"quais hosts têm o pacote X" e "quais softwares estão no host Y" são buscas
+indexadas em vez de varreduras com LIKE sobre megabytes de texto.
+"""
+import string
+
+# Limite de parâmetros por consulta 'IN (...)'
+_CHUNK = 500
+
+HOSTS_WITH_SOFTWARE_SQL = '''
+    SELECT h.hostname FROM software s
+    JOIN host_software hs ON hs.software_id = s.id
+    JOIN hosts h ON h.id = hs.host_id
+    WHERE s.name {operator} ?
+'''
+
+
+def create_tables(cursor):
+    """Cria as tabelas e índices do catálogo de softwares."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS hosts (
+            id INTEGER PRIMARY KEY,
+            hostname TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS software (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS host_software (
+            host_id INTEGER NOT NULL REFERENCES hosts (id),
+            software_id INTEGER NOT NULL REFERENCES software (id),
+            version TEXT,
+            PRIMARY KEY (host_id, software_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_host_software_software ON host_software (software_id, host_id)")
+
+
+def parse_installed_software(text, versions=None):
+    """Converte o texto 'installed_software' do agente em um dicionário nome -> versão.
+
+    'versions' é o 'software_versions' do relatório (nome -> versão); agentes
+    antigos não o enviam e os softwares ficam sem versão.
+    """
+    if not text or text in ("Nenhum", "Não disponível", "Desconhecido"):
+        return {}
+    if not isinstance(versions, dict):
+        versions = {}
+    packages = {}
+    for name in text.split(';'):
+        name = name.strip()
+        if name:
+            version = versions.get(name)
+            packages[name] = str(version)[:100] if version is not None else None
+    return packages
+
+
+# Mesma regra do COLLATE NOCASE do SQLite: só letras ASCII são igualadas
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _nocase(name):
+    return name.lower() if name.isascii() else name.translate(_ASCII_LOWER)
+
+
+def host_id(conn, hostname):
+    """Retorna o id interno do host, cadastrando-o se necessário."""
+    conn.execute("INSERT OR IGNORE INTO hosts (hostname) VALUES (?)", (hostname,))
+    return conn.execute("SELECT id FROM hosts WHERE hostname=?", (hostname,)).fetchone()[0]
+
+
+def intern_names(conn, names):
+    """Garante que os nomes existam em 'software' e retorna {nome: id}."""
+    names = list(names)
+    ids = _lookup_ids(conn, names)
+    # Só os nomes ainda desconhecidos são inseridos (o caso comum é já existirem todos)
+    unknown = [name for name in names if _nocase(name) not in ids]
+    if unknown:
+        conn.executemany("INSERT OR IGNORE INTO software (name) VALUES (?)", [(name,) for name in unknown])
+        ids.update(_lookup_ids(conn, unknown))
+    return {name: ids[_nocase(name)] for name in names}
+
+
+def _lookup_ids(conn, names):
+    ids = {}
+    for start in range(0, len(names), _CHUNK):
+        chunk = names[start:start + _CHUNK]
+        marks = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"SELECT id, name FROM software WHERE name IN ({marks})", chunk):
+            ids[_nocase(row[1])] = row[0]
+    return ids
+
+
+def sync_host_software(conn, hostname, packages):
+    """Atualiza os softwares do host aplicando apenas a diferença em relação ao salvo.
+
+    'packages' é um dicionário nome -> versão (ou None). Roda na transação de 'conn'.
+    Retorna (nomes adicionados, nomes removidos).
+    """
+    hid = host_id(conn, hostname)
+    current = {row[0]: row[1] for row in conn.execute(
+        "SELECT software_id, version FROM host_software WHERE host_id=?", (hid,))}
+
+    wanted = {}
+    for name, software_id in intern_names(conn, packages).items():
+        wanted[software_id] = packages[name]
+
+    added = [(hid, software_id, version) for software_id, version in wanted.items() if software_id not in current]
+    removed = [(hid, software_id) for software_id in current if software_id not in wanted]
+    changed = [(version, hid, software_id) for software_id, version in wanted.items()
+               if software_id in current and current[software_id] != version]
+
+    conn.executemany("DELETE FROM host_software WHERE host_id=? AND software_id=?", removed)
+    conn.executemany("INSERT INTO host_software (host_id, software_id, version) VALUES (?, ?, ?)", added)
+    conn.executemany("UPDATE host_software SET version=? WHERE host_id=? AND software_id=?", changed)
+    names = _names_by_id(conn, [row[1] for row in added] + [row[1] for row in removed])
+    return [names[row[1]] for row in added], [names[row[1]] for row in removed]
+
+
+def _names_by_id(conn, ids):
+    names = {}
+    for start in range(0, len(ids), _CHUNK):
+        chunk = ids[start:start + _CHUNK]
+        marks = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"SELECT id, name FROM software WHERE id IN ({marks})", chunk):
+            names[row[0]] = row[1]
+    return names
+
+
+def backfill_from_assets(conn, batch_size=500):
+    """Popula o catálogo a partir de 'assets.installed_software' para hosts ainda não catalogados."""
+    cursor = conn.execute('''
+        SELECT hostname, installed_software FROM assets
+        WHERE hostname NOT IN (SELECT hostname FROM hosts)
+    ''')
+    total = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for hostname, installed in rows:
+            sync_host_software(conn, hostname, parse_installed_software(installed))
+        total += len(rows)
+    return total
+
+
+def hosts_with_software_sql(name, prefix=False):
+    """Subconsulta (sql, parâmetros) que retorna os hostnames com o software informado.
+
+    Busca pelo nome exato ou pelo prefixo, sem diferenciar maiúsculas; nos dois
+    casos o índice único de 'software.name' é usado.
+    """
+    if prefix:
+        escaped = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return HOSTS_WITH_SOFTWARE_SQL.format(operator="LIKE") + " ESCAPE '\\'", (escaped + '%',)
+    return HOSTS_WITH_SOFTWARE_SQL.format(operator="="), (name,)
+
+
+def hosts_with_software(conn, name, prefix=False):
+    """Hostnames que têm o software informado, em ordem alfabética."""
+    sql, params = hosts_with_software_sql(name, prefix)
+    return [row[0] for row in conn.execute(sql + " ORDER BY h.hostname", params)]
+
+
+def software_on_host(conn, hostname):
+    """Lista de (nome, versão) dos softwares do host, em ordem alfabética."""
+    return [(row[0], row[1]) for row in conn.execute('''
+        SELECT s.name, hs.version FROM hosts h
+        JOIN host_software hs ON hs.host_id = h.id
+        JOIN software s ON s.id = hs.software_id
+        WHERE h.hostname = ?
+        ORDER BY s.name
+    ''', (hostname,))]
@@ -0,0 +1,141 @@
+"""Camada de acesso compartilhada ao banco SQLite do inventário.
+
+Mantém, por processo, um pool de conexões de longa duração para cada arquivo
+de banco, já configuradas com WAL e os demais PRAGMAs de desempenho. Assim o
+servidor da API, a GUI e os relatórios deixam de abrir e fechar uma conexão a
+cada operação e leitores não bloqueiam mais os escritores ("database is locked").
+
+Uso:
+    from db import storage
+
+    with storage.connection(DB_FILE) as conn:
+        with conn:  # transação: commit no sucesso, rollback em caso de erro
+            conn.execute("UPDATE assets SET status=? WHERE hostname=?", (...))
+"""
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+
+DB_FILE = 'inventory.db'
+
+# Tempo máximo (ms) que uma conexão espera por um lock antes de falhar
+BUSY_TIMEOUT_MS = 5000
+# Quantidade máxima de conexões abertas por arquivo de banco
+POOL_SIZE = 8
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),          # leitores não bloqueiam o escritor
+    ('synchronous', 'NORMAL'),        # seguro com WAL e bem mais barato que FULL
+    ('busy_timeout', BUSY_TIMEOUT_MS),
+    ('mmap_size', 256 * 1024 * 1024),  # 256 MB de leitura mapeada em memória
+    ('cache_size', -64 * 1024),       # valor negativo = KB, ou seja 64 MB de cache
+    ('temp_store', 'MEMORY'),
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def configure_connection(conn):
+    """Aplica os PRAGMAs de desempenho em uma conexão recém-aberta."""
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def open_connection(db_file=DB_FILE):
+    """Abre uma conexão avulsa já configurada (fora do pool)."""
+    conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return configure_connection(conn)
+
+
+class ConnectionPool:
+    """Pool de conexões reutilizáveis para um único arquivo de banco."""
+
+    def __init__(self, db_file, size=POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def acquire(self, timeout=BUSY_TIMEOUT_MS / 1000):
+        """Retorna uma conexão livre, abrindo uma nova se o pool ainda não estiver cheio."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return open_connection(self.db_file)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Nenhuma conexão livre no pool de '{self.db_file}' após {timeout}s")
+
+    def release(self, conn):
+        """Devolve a conexão ao pool, desfazendo qualquer transação esquecida aberta."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Conexão inutilizável: descarta e libera a vaga no pool
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        """Fecha as conexões ociosas do pool."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+def get_pool(db_file=DB_FILE):
+    """Retorna o pool do processo atual para o arquivo de banco informado."""
+    global _pools_pid
+    key = os.path.abspath(db_file)
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Processo filho (fork): as conexões herdadas não podem ser reutilizadas
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_file)
+        return pool
+
+
+@contextlib.contextmanager
+def connection(db_file=DB_FILE):
+    """Empresta uma conexão do pool durante o bloco 'with'."""
+    pool = get_pool(db_file)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def close_all():
+    """Fecha todas as conexões ociosas de todos os pools (útil no desligamento)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
@@ -1,17 +1,13 @@
-import sqlite3
 import sys
 
+import storage
+
 DB_FILE = 'inventory.db'
 
 try:
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    # Verifica se a tabela 'assets' tem pelo menos uma linha
-    cursor.execute("SELECT COUNT(*) FROM assets")
-    count = cursor.fetchone()[0]
-
-    conn.close()
+    with storage.connection(DB_FILE) as conn:
+        # Verifica se a tabela 'assets' tem pelo menos uma linha
+        count = conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
 
     if count > 0:
         print(f"SUCESSO: {count} registro(s) encontrado(s) no banco de dados.")
@@ -0,0 +1,160 @@
+"""Verifica as migrações do esquema e os planos das consultas mais frequentes.
+
+Roda em um banco temporário: aplica as migrações em um banco vazio e em um
+banco no formato antigo do servidor, confere com EXPLAIN QUERY PLAN que as
+consultas quentes usam os índices esperados (sem varrer 'assets' nem ordenar
+em B-tree temporária) e que a busca textual encontra um host de exemplo.
+Uso: python ./db/verify_schema.py
+"""
+import os
+import sys
+import tempfile
+
+# Permite importar a camada de banco compartilhada ('db/') ao rodar a partir de qualquer pasta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import assets, schema, search, storage  # noqa: E402
+
+LIST_QUERY = f"SELECT {', '.join(schema.LIST_COLUMNS)} FROM assets WHERE hostname LIKE ? ORDER BY hostname COLLATE NOCASE"
+
+# (descrição, consulta, parâmetros, trecho esperado no plano)
+PLAN_CHECKS = [
+    ("GUI: pesquisa de hostname por trecho", LIST_QUERY, ('%nb-00%',),
+     "SCAN assets USING COVERING INDEX idx_assets_list"),
+    ("GUI: pesquisa de hostname por prefixo", LIST_QUERY, ('br-nb%',),
+     "SEARCH assets USING COVERING INDEX idx_assets_list (hostname>? AND hostname<?)"),
+    ("GUI: lista virtual, linhas seguintes ao rolar para baixo",
+     f"SELECT {', '.join(schema.LIST_COLUMNS)} FROM assets WHERE hostname COLLATE NOCASE >= ? "
+     "AND (hostname COLLATE NOCASE > ? OR hostname > ?) ORDER BY hostname COLLATE NOCASE, hostname LIMIT ?",
+     ('br-nb-000100',) * 3 + (20,),
+     "SEARCH assets USING COVERING INDEX idx_assets_list (hostname>?)"),
+    ("GUI: lista virtual, linhas anteriores ao rolar para cima",
+     f"SELECT {', '.join(schema.LIST_COLUMNS)} FROM assets WHERE hostname COLLATE NOCASE <= ? "
+     "AND (hostname COLLATE NOCASE < ? OR hostname < ?) ORDER BY hostname COLLATE NOCASE DESC, hostname DESC LIMIT ?",
+     ('br-nb-000100',) * 3 + (20,),
+     "SEARCH assets USING COVERING INDEX idx_assets_list (hostname<?)"),
+    ("Ativos de um status sem atualização recente",
+     "SELECT hostname, last_updated FROM assets WHERE status=? AND last_updated < ? ORDER BY last_updated",
+     ('Em uso', '2024-01-01'),
+     "SEARCH assets USING COVERING INDEX idx_assets_status_updated (status=? AND last_updated<?)"),
+    ("API: página de /api/assets filtrada por status",
+     "SELECT hostname, status FROM assets WHERE status = ? AND hostname > ? ORDER BY hostname LIMIT ?",
+     ('Em uso', '', 100),
+     "idx_assets_status (status=? AND hostname>?)"),
+    ("GUI: histórico de manutenções de um host",
+     "SELECT * FROM maintenance_logs WHERE asset_hostname=? ORDER BY maintenance_date DESC", ('BR-NB-000001',),
+     "SEARCH maintenance_logs USING INDEX idx_maintenance_logs_host_date (asset_hostname=?)"),
+    ("API: coletas mais lentas da frota (p95)",
+     "SELECT hostname, probe, p95_seconds FROM probe_timings ORDER BY p95_seconds DESC LIMIT ?", (20,),
+     "SCAN probe_timings USING COVERING INDEX idx_probe_timings_p95"),
+    ("API: hosts mais lentos em uma coleta (p50)",
+     "SELECT hostname, p50_seconds FROM probe_timings WHERE probe = ? ORDER BY p50_seconds DESC LIMIT ?",
+     ('installed_software', 20),
+     "SEARCH probe_timings USING COVERING INDEX idx_probe_timings_probe_p50 (probe=?)"),
+    ("Gravação: medidas recentes das coletas dos hosts recebidos",
+     "SELECT hostname, probe, reported_at, recent_seconds, recent_status FROM probe_timings WHERE hostname IN (?, ?)",
+     ('BR-NB-000001', 'BR-NB-000002'),
+     "SEARCH probe_timings USING PRIMARY KEY (hostname=?)"),
+    ("API: discos da frota prestes a falhar",
+     "SELECT * FROM disk_health WHERE risk >= ? ORDER BY risk DESC, hostname, device LIMIT ?", (1, 100),
+     "SEARCH disk_health USING INDEX idx_disk_health_risk (risk>?)"),
+]
+
+# Formato de 'assets' criado pelo servidor antes das migrações
+LEGACY_SERVER_ASSETS = '''
+    CREATE TABLE assets (
+        hostname TEXT PRIMARY KEY, id_patrimonio TEXT, serial_number TEXT, device_model TEXT, fabricante TEXT,
+        data_compra TEXT, fornecedor TEXT, custo REAL, garantia_venc TEXT, local_fisico TEXT, centro_custo TEXT,
+        usuario_designado TEXT, departamento TEXT, status TEXT, ultima_manutencao TEXT, os TEXT, architecture TEXT,
+        cpu_model TEXT, cpu_cores_physical INTEGER, cpu_cores_logical INTEGER, ram_total_gb REAL, ram_slots TEXT,
+        mac_address TEXT, ip_address TEXT, last_updated TEXT, disks TEXT, storage_health TEXT, gpu_info TEXT,
+        windows_update_status TEXT, installed_software TEXT, monitors TEXT
+    )
+'''
+
+
+def check_plans(conn):
+    failures = 0
+    for description, query, params, expected in PLAN_CHECKS:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+        ok = any(expected in step for step in plan) and not any("TEMP B-TREE" in step for step in plan)
+        print(f"{'OK  ' if ok else 'ERRO'} {description}: {' | '.join(plan)}")
+        failures += not ok
+    return failures
+
+
+def check_legacy_upgrade(conn):
+    conn.execute(LEGACY_SERVER_ASSETS)
+    conn.execute("INSERT INTO assets (hostname, custo, status) VALUES ('LEGADO-01', 1500.5, 'Em uso')")
+    conn.commit()
+    schema.migrate(conn)
+    columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(assets)")}
+    row = conn.execute("SELECT custo, status FROM assets WHERE hostname='LEGADO-01'").fetchone()
+    ok = (columns.get('custo') == 'TEXT' and 'maintenance_history_note' in columns
+          and row is not None and row[1] == 'Em uso' and schema.version(conn) == schema.SCHEMA_VERSION)
+    print(f"{'OK  ' if ok else 'ERRO'} Migração do banco antigo do servidor (custo={row[0] if row else None!r})")
+    return not ok
+
+
+def check_search(conn):
+    with conn:
+        conn.execute("INSERT INTO assets (hostname, usuario_designado, ip_address, device_model) "
+                     "VALUES ('BR-NB-000042', 'joao.silva', '10.20.30.40', 'Latitude 5420')")
+        conn.execute("INSERT INTO maintenance_logs (asset_hostname, maintenance_date, description, technician) "
+                     "VALUES ('BR-NB-000042', '2024-05-01 10:00', 'Troca da bateria', 'Carlos')")
+        search.index_hosts(conn, ['BR-NB-000042'])
+    failures = 0
+    for text in ('br-nb-0000', 'joao', '10.20.30', 'latit 5420', 'bateria', 'BATERIA carlos'):
+        found = [row['hostname'] for row in search.search(conn, text)]
+        ok = found == ['BR-NB-000042']
+        print(f"{'OK  ' if ok else 'ERRO'} Busca textual por {text!r}: {found}")
+        failures += not ok
+    return failures
+
+
+def check_list_paging(conn):
+    """A lista virtual passa por todos os hostnames, inclusive os que só diferem em maiúsculas."""
+    hostnames = ['LISTA-01', 'lista-01', 'Lista-01', 'lista-00', 'LISTA-02']
+    with conn:
+        conn.executemany("INSERT INTO assets (hostname) VALUES (?)", [(hostname,) for hostname in hostnames])
+    where, params = "hostname LIKE ?", ('lista-%',)
+    forward = [row['hostname'] for row in assets.list_window(conn, ('hostname',), where, params, limit=1)]
+    while len(forward) <= len(hostnames):
+        page = assets.list_window(conn, ('hostname',), where, params, after=forward[-1], limit=1)
+        if not page:
+            break
+        forward.append(page[0]['hostname'])
+    backward = [forward[-1]]
+    while len(backward) <= len(hostnames):
+        page = assets.list_window(conn, ('hostname',), where, params, before=backward[0], limit=1)
+        if not page:
+            break
+        backward.insert(0, page[0]['hostname'])
+    ok = sorted(forward) == sorted(hostnames) and backward == forward
+    print(f"{'OK  ' if ok else 'ERRO'} Lista virtual página a página: {forward}")
+    return not ok
+
+
+try:
+    with tempfile.TemporaryDirectory() as folder:
+        conn = storage.open_connection(os.path.join(folder, 'novo.db'))
+        schema.migrate(conn)
+        failures = check_plans(conn)
+        failures += check_search(conn)
+        failures += check_list_paging(conn)
+        failures += schema.migrate(conn) != []  # segunda execução não deve aplicar nada
+        conn.close()
+
+        conn = storage.open_connection(os.path.join(folder, 'legado.db'))
+        failures += check_legacy_upgrade(conn)
+        failures += check_plans(conn)
+        conn.close()
+
+    if failures:
+        print(f"ERRO: {failures} verificação(ões) do esquema falharam.")
+        sys.exit(1)
+    print(f"SUCESSO: esquema na versão {schema.SCHEMA_VERSION} e consultas usando os índices esperados.")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"ERRO ao verificar o esquema: {e}")
+    sys.exit(1)
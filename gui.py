@@ -1,45 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Text, Scrollbar
 import subprocess
-import sqlite3
 import json
 import os
 import datetime
 
+from db import assets, history, schema, search, software, storage
+
 DB_FILE = 'inventory.db'
 detalhes_windows = {}
 
+# Lista principal virtual: linhas roladas pela roda do mouse e alturas padrão (px) antes de medir
+ROLAGEM_RODA = 3
+ALTURA_CABECALHO = 25
+ALTURA_LINHA = 20
+
 
 def create_db_tables():
-    """Garante que as tabelas 'assets' e 'maintenance_logs' existam."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    # Adicionando a coluna 'monitors' se ela não existir, para compatibilidade
-    try:
-        cursor.execute("ALTER TABLE assets ADD COLUMN monitors TEXT")
-    except sqlite3.OperationalError:
-        pass  # Coluna já existe
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assets (
-            hostname TEXT PRIMARY KEY, id_patrimonio TEXT, serial_number TEXT, device_model TEXT, fabricante TEXT,
-            data_compra TEXT, fornecedor TEXT, custo TEXT, garantia_venc TEXT, local_fisico TEXT, centro_custo TEXT, 
-            usuario_designado TEXT, departamento TEXT, status TEXT, ultima_manutencao TEXT, maintenance_history_note TEXT,
-            os TEXT, architecture TEXT, cpu_model TEXT, cpu_cores_physical INTEGER, cpu_cores_logical INTEGER, 
-            ram_total_gb REAL, ram_slots TEXT, mac_address TEXT, ip_address TEXT, last_updated TEXT, disks TEXT,
-            storage_health TEXT, gpu_info TEXT, windows_update_status TEXT, installed_software TEXT,
-            monitors TEXT -- ADICIONE ESTA LINHA
-        )
-    ''')
-    # ... o resto da função continua igual ...
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS maintenance_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, asset_hostname TEXT, maintenance_date TEXT,
-            description TEXT, technician TEXT, FOREIGN KEY (asset_hostname) REFERENCES assets (hostname)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    """Garante que o esquema do banco (tabelas 'assets', 'maintenance_logs' etc.) esteja atualizado."""
+    with storage.connection(DB_FILE) as conn:
+        schema.migrate(conn)
 
 
 def atualizar_inventario():
@@ -54,32 +34,28 @@ def atualizar_inventario():
                        cwd=os.path.dirname(script_path))
         messagebox.showinfo(
             "Atualização", "Inventário atualizado com sucesso!")
-        carregar_inventario()
+        lista.recarregar()
     except Exception as e:
         messagebox.showerror("Erro", f"Erro ao atualizar inventário:\n{e}")
 
 
-def carregar_inventario(filtro_hostname=""):
-    for item in tree.get_children():
-        tree.delete(item)
+def carregar_inventario(filtro_texto="", filtro_software=""):
     try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        query = "SELECT hostname, device_model, status, os, ip_address, usuario_designado, last_updated FROM assets"
-        params = ()
-        if filtro_hostname:
-            query += " WHERE hostname LIKE ?"
-            params = (f"%{filtro_hostname}%",)
-        query += " ORDER BY hostname"
-        cursor.execute(query, params)
-        for asset in cursor.fetchall():
-            tree.insert('', 'end', values=(
-                asset['hostname'], asset['device_model'], asset['status'], asset['os'],
-                asset['ip_address'], asset['usuario_designado'], asset['last_updated']
-            ))
-        conn.close()
-        tag_rows()
+        if filtro_software:
+            # Busca indexada no catálogo de softwares (prefixo do nome)
+            subquery, params = software.hosts_with_software_sql(filtro_software, prefix=True)
+            origem = ConsultaLista(f"hostname IN ({subquery})", params)
+        elif filtro_texto:
+            with storage.connection(DB_FILE) as conn:
+                # Busca textual ranqueada (usuário, IP, modelo, serial, softwares, manutenções...)
+                encontrados = [row['hostname'] for row in search.search(
+                    conn, filtro_texto, limit=search.MAX_RESULTS, snippets=False)]
+            # Sem resultado na busca textual: trecho do hostname, como antes
+            origem = ResultadoBusca(encontrados) if encontrados else ConsultaLista(
+                "hostname LIKE ?", (f"%{filtro_texto}%",))
+        else:
+            origem = ConsultaLista()
+        lista.carregar(origem)
     except Exception as e:
         messagebox.showerror("Erro", f"Erro ao carregar inventário:\n{e}")
 
@@ -88,6 +64,14 @@ def pesquisar_maquina(event=None):
     carregar_inventario(search_var.get().strip())
 
 
+def pesquisar_software(event=None):
+    termo = search_var.get().strip()
+    if not termo:
+        messagebox.showwarning("Aviso", "Digite o nome (ou início do nome) do software.")
+        return
+    carregar_inventario(filtro_software=termo)
+
+
 def mostrar_detalhes(event=None):
     selected = tree.focus()
     if not selected:
@@ -128,13 +112,12 @@ def atualizar_detalhes_win(detalhes_win, hostname):
     for widget in detalhes_win.winfo_children():
         widget.destroy()
 
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM assets WHERE hostname=?", (hostname,))
-    asset = cursor.fetchone()
+    with storage.connection(DB_FILE) as conn:
+        asset = conn.execute("SELECT * FROM assets WHERE hostname=?", (hostname,)).fetchone()
+        logs = conn.execute(
+            "SELECT * FROM maintenance_logs WHERE asset_hostname=? ORDER BY maintenance_date DESC", (hostname,)).fetchall()
+        pacotes = software.software_on_host(conn, hostname)
     if not asset:
-        conn.close()
         messagebox.showerror("Erro", "Ativo não encontrado.")
         detalhes_win.destroy()
         return
@@ -190,9 +173,7 @@ def atualizar_detalhes_win(detalhes_win, hostname):
     log_tree.column("Data", width=120, anchor='center')
     log_tree.column("Técnico", width=150)
     log_tree.column("Descrição", width=400)
-    cursor.execute(
-        "SELECT * FROM maintenance_logs WHERE asset_hostname=? ORDER BY maintenance_date DESC", (hostname,))
-    for log in cursor.fetchall():
+    for log in logs:
         log_tree.insert('', 'end', values=(
             log['maintenance_date'], log['technician'], log['description']))
 
@@ -346,14 +327,16 @@ def atualizar_detalhes_win(detalhes_win, hostname):
     sw_text.configure(yscrollcommand=sw_scroll.set)
     sw_text.pack(side="left", fill="both", expand=True)
     sw_scroll.pack(side="right", fill="y")
-    softwares = asset_dict.get('installed_software', '')
-    sw_list = sorted([s.strip() for s in softwares.split(';') if s.strip(
-    )]) if softwares and softwares != "Desconhecido" else ["Nenhum software encontrado."]
+    if pacotes:
+        # Catálogo normalizado: já vem ordenado do banco
+        sw_list = [f"{nome} ({versao})" if versao else nome for nome, versao in pacotes]
+    else:
+        softwares = asset_dict.get('installed_software', '')
+        sw_list = sorted([s.strip() for s in softwares.split(';') if s.strip(
+        )]) if softwares and softwares != "Desconhecido" else ["Nenhum software encontrado."]
     sw_text.insert("1.0", "\n".join(sw_list))
     sw_text.config(state="disabled")
 
-    conn.close()
-
 
 def salvar_status_e_manutencao(hostname, new_status, new_desc, new_tech, window_ref):
     if not new_status:
@@ -365,22 +348,32 @@ def salvar_status_e_manutencao(hostname, new_status, new_desc, new_tech, window_
             "Aviso", "O nome do técnico é obrigatório ao adicionar um relatório.", parent=window_ref)
         return
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE assets SET status=? WHERE hostname=?", (new_status, hostname))
-        if new_desc and new_tech:
-            today = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
-            cursor.execute("INSERT INTO maintenance_logs (asset_hostname, maintenance_date, description, technician) VALUES (?, ?, ?, ?)",
-                           (hostname, today, new_desc, new_tech))
-            cursor.execute(
-                "UPDATE assets SET ultima_manutencao=? WHERE hostname=?", (today.split(' ')[0], hostname))
-        conn.commit()
-        conn.close()
+        with storage.connection(DB_FILE) as conn:
+            with conn:
+                cursor = conn.cursor()
+                agora = datetime.datetime.now().isoformat(timespec='seconds')
+                atual = cursor.execute(
+                    "SELECT status, ultima_manutencao FROM assets WHERE hostname=?", (hostname,)).fetchone()
+                cursor.execute(
+                    "UPDATE assets SET status=? WHERE hostname=?", (new_status, hostname))
+                alteracoes = []
+                if atual and atual[0] != new_status:
+                    alteracoes.append(('status', new_status))
+                if new_desc and new_tech:
+                    today = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+                    cursor.execute("INSERT INTO maintenance_logs (asset_hostname, maintenance_date, description, technician) VALUES (?, ?, ?, ?)",
+                                   (hostname, today, new_desc, new_tech))
+                    cursor.execute(
+                        "UPDATE assets SET ultima_manutencao=? WHERE hostname=?", (today.split(' ')[0], hostname))
+                    if atual and atual[1] != today.split(' ')[0]:
+                        alteracoes.append(('ultima_manutencao', today.split(' ')[0]))
+                # Alterações manuais também entram no histórico do ativo
+                history.record_changes(conn, hostname, agora, alteracoes)
+                search.index_hosts(conn, [hostname])
         messagebox.showinfo(
             "Sucesso", "Dados salvos com sucesso!", parent=window_ref)
         atualizar_detalhes_win(window_ref, hostname)
-        pesquisar_maquina()
+        lista.recarregar()
     except Exception as e:
         messagebox.showerror("Erro de Banco de Dados",
                              f"Não foi possível salvar os dados:\n{e}", parent=window_ref)
@@ -394,46 +387,241 @@ def add_field(parent, titulo, valor, row):
               justify='left').grid(row=row, column=1, sticky='w', padx=5, pady=3)
 
 
+class ConsultaLista:
+    """Linhas da lista principal lidas de 'assets' sob demanda, paginadas por hostname."""
+
+    def __init__(self, where="", params=()):
+        self.where = where
+        self.params = params
+
+    def count(self, conn):
+        return assets.count_list(conn, self.where, self.params)
+
+    def at(self, conn, offset, limit):
+        return assets.list_window(conn, schema.LIST_COLUMNS, self.where, self.params, offset=offset, limit=limit)
+
+    def after(self, conn, hostname, limit):
+        return assets.list_window(conn, schema.LIST_COLUMNS, self.where, self.params, after=hostname, limit=limit)
+
+    def before(self, conn, hostname, limit):
+        return assets.list_window(conn, schema.LIST_COLUMNS, self.where, self.params, before=hostname, limit=limit)
+
+
+class ResultadoBusca:
+    """Resultado ranqueado da busca textual (no máximo search.MAX_RESULTS hostnames).
+
+    Só a ordem dos hostnames fica em memória; as linhas da janela visível são
+    lidas de 'assets' a cada rolagem, então uma recarga mostra os dados atuais.
+    """
+
+    def __init__(self, hostnames):
+        self.hostnames = hostnames
+        self.posicao = {hostname: index for index, hostname in enumerate(hostnames)}
+
+    def _rows(self, conn, start, end):
+        return assets.rows_for_hostnames(conn, schema.LIST_COLUMNS, self.hostnames[max(0, start):end])
+
+    def count(self, conn):
+        return len(self.hostnames)
+
+    def at(self, conn, offset, limit):
+        return self._rows(conn, offset, offset + limit)
+
+    def after(self, conn, hostname, limit):
+        start = self.posicao[hostname] + 1
+        return self._rows(conn, start, start + limit)
+
+    def before(self, conn, hostname, limit):
+        end = self.posicao[hostname]
+        return self._rows(conn, end - limit, end)
+
+
+class ListaVirtual:
+    """Treeview que só contém as linhas visíveis de uma lista possivelmente enorme.
+
+    A Treeview tem um item por linha visível, reaproveitados a cada rolagem; as
+    linhas vêm da origem (ConsultaLista ou ResultadoBusca) sob demanda. Rolagens
+    curtas (roda do mouse, setas, páginas) buscam só as linhas novas, a partir
+    do hostname da borda da janela; saltos da barra de rolagem buscam pela posição.
+    A memória e o tempo de redesenho dependem da altura da janela, não da frota.
+    """
+
+    def __init__(self, tree, scrollbar):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.origem = None
+        self.total = 0
+        self.first = 0
+        self.rows = []
+        self.visible = 1
+        self.selected = None
+        scrollbar.configure(command=self.yview)
+        tree.bind('<Configure>', self._redimensionar)
+        tree.bind('<<TreeviewSelect>>', self._selecionar)
+        tree.bind('<MouseWheel>', lambda event: self.rolar(-ROLAGEM_RODA if event.delta > 0 else ROLAGEM_RODA))
+        tree.bind('<Button-4>', lambda event: self.rolar(-ROLAGEM_RODA))
+        tree.bind('<Button-5>', lambda event: self.rolar(ROLAGEM_RODA))
+        tree.bind('<Up>', lambda event: self._mover_foco(-1))
+        tree.bind('<Down>', lambda event: self._mover_foco(1))
+        tree.bind('<Prior>', lambda event: self._mover_foco(-self.visible))
+        tree.bind('<Next>', lambda event: self._mover_foco(self.visible))
+        tree.bind('<Home>', lambda event: self._ir_para(0))
+        tree.bind('<End>', lambda event: self._ir_para(self.total))
+
+    def carregar(self, origem):
+        """Troca a origem das linhas e volta ao topo da lista."""
+        self.origem = origem
+        with storage.connection(DB_FILE) as conn:
+            self.total = origem.count(conn)
+            self.rows = origem.at(conn, 0, self.visible)
+        self.first = 0
+        self._desenhar()
+
+    def recarregar(self):
+        """Relê a janela atual (depois de salvar ou coletar), mantendo a posição."""
+        if self.origem is None:
+            return
+        with storage.connection(DB_FILE) as conn:
+            self.total = self.origem.count(conn)
+            self.first = max(0, min(self.first, self.total - self.visible))
+            self.rows = self.origem.at(conn, self.first, self.visible)
+        self._desenhar()
+
+    def rolar(self, delta):
+        """Desloca a janela 'delta' linhas (negativo sobe)."""
+        first = max(0, min(self.first + delta, self.total - self.visible))
+        delta = first - self.first
+        if self.origem is None or delta == 0:
+            return "break"
+        with storage.connection(DB_FILE) as conn:
+            if self.rows and 0 < delta < len(self.rows):
+                faltam = delta + self.visible - len(self.rows)
+                novas = self.origem.after(conn, self.rows[-1]['hostname'], faltam) if faltam > 0 else []
+                rows = (list(self.rows) + list(novas))[delta:delta + self.visible]
+            elif self.rows and 0 < -delta < len(self.rows):
+                novas = self.origem.before(conn, self.rows[0]['hostname'], -delta)
+                rows = (list(novas) + list(self.rows))[:self.visible]
+            else:
+                rows = self.origem.at(conn, first, self.visible)
+        self.first = first
+        self.rows = rows
+        self._desenhar()
+        return "break"
+
+    def yview(self, *args):
+        """Comando da barra de rolagem ('moveto' fração ou 'scroll' n units/pages)."""
+        if args[0] == 'moveto':
+            self._ir_para(round(float(args[1]) * self.total))
+        elif args[0] == 'scroll':
+            passo = self.visible if args[2] == 'pages' else 1
+            self.rolar(int(args[1]) * passo)
+
+    def _ir_para(self, position):
+        self.rolar(position - self.first)
+        return "break"
+
+    def _desenhar(self):
+        items = self.tree.get_children()
+        for item in items[len(self.rows):]:
+            self.tree.delete(item)
+        items = items[:len(self.rows)]
+        for _ in range(len(self.rows) - len(items)):
+            items += (self.tree.insert('', 'end'),)
+        selecionado = None
+        for index, (item, row) in enumerate(zip(items, self.rows)):
+            # A cor alterna pela posição na lista inteira, para não "piscar" ao rolar
+            tag = 'evenrow' if (self.first + index) % 2 == 0 else 'oddrow'
+            self.tree.item(item, tags=(tag,), values=tuple(row[column] for column in schema.LIST_COLUMNS))
+            if row['hostname'] == self.selected:
+                selecionado = item
+        # A seleção acompanha o host, não a posição do item reaproveitado
+        self.tree.selection_set((selecionado,) if selecionado else ())
+        if self.total:
+            self.scrollbar.set(self.first / self.total, min(1.0, (self.first + len(self.rows)) / self.total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _selecionar(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = self.tree.set(selection[0], 'Hostname')
+
+    def _mover_foco(self, delta):
+        items = self.tree.get_children()
+        if not items:
+            return "break"
+        focus = self.tree.focus()
+        target = (items.index(focus) if focus in items else 0) + delta
+        if not 0 <= target < len(items):
+            self.rolar(target - (len(items) - 1 if target > 0 else 0))
+            items = self.tree.get_children()
+            target = max(0, min(target, len(items) - 1))
+        if items:
+            self.tree.focus(items[target])
+            self.tree.selection_set(items[target])
+        return "break"
+
+    def _redimensionar(self, event=None):
+        # Altura da linha medida no primeiro item (o tema define a altura real)
+        items = self.tree.get_children()
+        box = self.tree.bbox(items[0]) if items else ''
+        top, height = (box[1], box[3]) if box else (ALTURA_CABECALHO, ALTURA_LINHA)
+        visible = max(1, (self.tree.winfo_height() - top) // max(1, height))
+        if visible != self.visible:
+            self.visible = visible
+            self.recarregar()
+            if not box and self.tree.get_children():
+                # Agora há um item para medir a altura real da linha
+                self._redimensionar()
+
+
+def iniciar_dados():
+    create_db_tables()
+    carregar_inventario()
+
+
 # --- CONFIGURAÇÃO DA JANELA PRINCIPAL ---
-root = tk.Tk()
-root.title("Inventário de TI")
-root.geometry("1200x700")
-style = ttk.Style()
-style.theme_use('clam')
-style.configure("Treeview.Heading", font=('Segoe UI', 10, 'bold'))
-frame = ttk.Frame(root, padding="10")
-frame.pack(fill='both', expand=True)
-top_frame = ttk.Frame(frame)
-top_frame.pack(fill='x', pady=(0, 10))
-search_var = tk.StringVar()
-search_entry = ttk.Entry(top_frame, textvariable=search_var, width=40)
-search_entry.pack(side='left', padx=(0, 5))
-search_entry.bind('<Return>', pesquisar_maquina)
-ttk.Button(top_frame, text="Pesquisar",
-           command=pesquisar_maquina).pack(side='left')
-ttk.Button(top_frame, text="Coletar/Atualizar Dados",
-           command=atualizar_inventario).pack(side='left', padx=5)
-ttk.Button(top_frame, text="Sair", command=root.destroy).pack(side='right')
-columns = ("Hostname", "Modelo", "Status", "SO",
-           "IP", "Usuário", "Última Atualização")
-tree = ttk.Treeview(frame, columns=columns, show='headings')
-tree_scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-tree.configure(yscrollcommand=tree_scroll.set)
-tree.pack(side='left', fill='both', expand=True)
-tree_scroll.pack(side='right', fill='y')
-for col in columns:
-    tree.heading(col, text=col)
-    tree.column(col, width=150, anchor='w')
-tree.bind("<Double-1>", mostrar_detalhes)
-
-
-def tag_rows():
-    for i, item in enumerate(tree.get_children()):
-        tree.item(item, tags=('evenrow' if i % 2 == 0 else 'oddrow'))
-
-
-tree.tag_configure('evenrow', background='#f0f0f0')
-tree.tag_configure('oddrow', background='#ffffff')
-create_db_tables()
-carregar_inventario()
-root.mainloop()
+def main():
+    """Monta a janela principal (importar o módulo não cria janela nem toca no banco)."""
+    global root, tree, search_var, lista
+    root = tk.Tk()
+    root.title("Inventário de TI")
+    root.geometry("1200x700")
+    style = ttk.Style()
+    style.theme_use('clam')
+    style.configure("Treeview.Heading", font=('Segoe UI', 10, 'bold'))
+    frame = ttk.Frame(root, padding="10")
+    frame.pack(fill='both', expand=True)
+    top_frame = ttk.Frame(frame)
+    top_frame.pack(fill='x', pady=(0, 10))
+    search_var = tk.StringVar()
+    search_entry = ttk.Entry(top_frame, textvariable=search_var, width=40)
+    search_entry.pack(side='left', padx=(0, 5))
+    search_entry.bind('<Return>', pesquisar_maquina)
+    ttk.Button(top_frame, text="Pesquisar",
+               command=pesquisar_maquina).pack(side='left')
+    ttk.Button(top_frame, text="Pesquisar Software",
+               command=pesquisar_software).pack(side='left', padx=(5, 0))
+    ttk.Button(top_frame, text="Coletar/Atualizar Dados",
+               command=atualizar_inventario).pack(side='left', padx=5)
+    ttk.Button(top_frame, text="Sair", command=root.destroy).pack(side='right')
+    columns = ("Hostname", "Modelo", "Status", "SO",
+               "IP", "Usuário", "Última Atualização")
+    tree = ttk.Treeview(frame, columns=columns, show='headings')
+    tree_scroll = ttk.Scrollbar(frame, orient="vertical")
+    tree.pack(side='left', fill='both', expand=True)
+    tree_scroll.pack(side='right', fill='y')
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=150, anchor='w')
+    tree.bind("<Double-1>", mostrar_detalhes)
+    tree.tag_configure('evenrow', background='#f0f0f0')
+    tree.tag_configure('oddrow', background='#ffffff')
+    lista = ListaVirtual(tree, tree_scroll)
+    # Esquema e inventário são carregados depois que a janela já apareceu
+    root.after(0, iniciar_dados)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,133 +1,456 @@
 # Nome do arquivo: server.py
-import sqlite3
 import json
-from flask import Flask, request, jsonify
+import os
+import sys
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from werkzeug.exceptions import HTTPException
 import traceback
 
+# Permite importar a camada de banco compartilhada ('db/') ao rodar a partir da pasta 'server'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import assets, disk_health, disk_series, export, history, probe_timings, schema, search, software, storage  # noqa: E402
+import ingest  # noqa: E402
+import metrics  # noqa: E402
+import support  # noqa: E402
+from compression import DecompressionMiddleware  # noqa: E402
+from ingest_queue import WriteBehindQueue  # noqa: E402
+
 app = Flask(__name__)
 DB_FILE = 'inventory.db'
 
+# Modo write-behind: o POST /api/inventory apenas enfileira e responde 202 Accepted.
+# O 202 não garante a gravação (a fila fica em memória e um documento pode falhar no
+# commit); só o 200 confirma que o inventário está no banco.
+# Ative com INVENTORY_WRITE_BEHIND=1; os demais valores ajustam o group commit.
+WRITE_BEHIND = os.environ.get('INVENTORY_WRITE_BEHIND') == '1'
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get('INVENTORY_WRITE_BEHIND_MAX_BATCH', 500))
+WRITE_BEHIND_MAX_DELAY_MS = int(os.environ.get('INVENTORY_WRITE_BEHIND_MAX_DELAY_MS', 200))
+WRITE_BEHIND_MAX_QUEUE = int(os.environ.get('INVENTORY_WRITE_BEHIND_MAX_QUEUE', 10000))
+
+# Corpos gzip/zstd (Content-Encoding) são descompactados antes de chegar às rotas;
+# este é o tamanho máximo aceito depois de descompactar.
+MAX_DECOMPRESSED_BYTES = int(os.environ.get('INVENTORY_MAX_DECOMPRESSED_BYTES', 32 * 1024 * 1024))
 
-def init_db():
-    """Cria ou atualiza a tabela no banco de dados."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
 
-    # Adicionando a coluna 'monitors' se ela não existir, para evitar erros ao reiniciar o servidor
+def record_rejected_body(environ, status, reason):
+    """Métricas dos corpos recusados pelo middleware de descompressão, que não chegam ao Flask."""
     try:
-        cursor.execute("ALTER TABLE assets ADD COLUMN monitors TEXT")
-    except sqlite3.OperationalError:
-        # A coluna provavelmente já existe, o que é esperado após a primeira execução
-        pass
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assets (
-            hostname TEXT PRIMARY KEY,
-            id_patrimonio TEXT,
-            serial_number TEXT,
-            device_model TEXT,
-            fabricante TEXT,
-            data_compra TEXT,
-            fornecedor TEXT,
-            custo REAL,
-            garantia_venc TEXT,
-            local_fisico TEXT,
-            centro_custo TEXT,
-            usuario_designado TEXT,
-            departamento TEXT,
-            status TEXT,
-            ultima_manutencao TEXT,
-            os TEXT,
-            architecture TEXT,
-            cpu_model TEXT,
-            cpu_cores_physical INTEGER,
-            cpu_cores_logical INTEGER,
-            ram_total_gb REAL,
-            ram_slots TEXT,
-            mac_address TEXT,
-            ip_address TEXT,
-            last_updated TEXT,
-            disks TEXT,
-            storage_health TEXT,
-            gpu_info TEXT,
-            windows_update_status TEXT,
-            installed_software TEXT,
-            monitors TEXT -- Coluna para os monitores
-        )
-    ''')
-    conn.commit()
-    conn.close()
+        route = app.url_map.bind_to_environ(environ).match(return_rule=True)[0].rule
+    except HTTPException:
+        route = 'desconhecida'
+    metrics.REQUESTS.inc(route, environ.get('REQUEST_METHOD', ''), status)
+    metrics.ERRORS.inc(reason)
+
+
+app.wsgi_app = DecompressionMiddleware(app.wsgi_app, MAX_DECOMPRESSED_BYTES, on_error=record_rejected_body)
+
+# Intervalo (segundos) entre envios usado como base do pedido de espera aos agentes
+# ('next_report_after'). O pedido só é enviado sob pressão, enquanto a fila write-behind
+# estiver com mais da metade da capacidade ocupada, e vale o dobro deste valor; o agente
+# só o usa para espaçar os envios, nunca para encurtar o próprio intervalo.
+REPORT_INTERVAL = int(os.environ.get('INVENTORY_REPORT_INTERVAL', 4 * 3600))
+
+# Backend da consulta de suporte/garantia no formato 'modulo:Classe' (vazio = stub local)
+SUPPORT_BACKEND = os.environ.get('INVENTORY_SUPPORT_BACKEND', '')
+MAX_SUPPORT_BATCH = 1000
+support_resolver = support.SupportResolver(DB_FILE, support.load_backend(SUPPORT_BACKEND))
+
+
+def init_db():
+    """Cria ou atualiza o esquema do banco de dados."""
+    with storage.connection(DB_FILE) as conn:
+        schema.migrate(conn)
+
+        # Cataloga os softwares dos hosts gravados antes da existência do catálogo
+        with conn:
+            software.backfill_from_assets(conn)
+
+
+def save_documents(documents):
+    """Grava os documentos de inventário em uma única transação (um único commit)."""
+    with storage.connection(DB_FILE) as conn:
+        changes_before = conn.total_changes
+        try:
+            with metrics.SQLITE_EXECUTE_SECONDS.time():
+                results = ingest.write_documents(conn, documents)
+            with metrics.SQLITE_COMMIT_SECONDS.time():
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        metrics.DOCUMENTS_WRITTEN.inc(amount=len(documents))
+        metrics.ROWS_WRITTEN.inc(amount=conn.total_changes - changes_before)
+        with conn:
+            disk_series.maybe_prune(conn)
+        return results
+
+
+ingest_queue = WriteBehindQueue(
+    save_documents, max_batch=WRITE_BEHIND_MAX_BATCH,
+    max_delay_ms=WRITE_BEHIND_MAX_DELAY_MS, max_queue=WRITE_BEHIND_MAX_QUEUE)
+section_cache = ingest.SectionHashCache()
+metrics.REGISTRY.register(metrics.Gauge(
+    'inventory_write_behind_queue_depth', 'Documentos aguardando gravação na fila write-behind.',
+    lambda: ingest_queue.depth))
+metrics.REGISTRY.register(metrics.Gauge(
+    'inventory_support_cache_entries', 'Seriais no cache em memória da consulta de suporte.',
+    lambda: len(support_resolver.cache)))
+
+
+def report_hint():
+    """Campos extras da resposta: {'next_report_after': segundos} sob pressão, senão vazio."""
+    if WRITE_BEHIND and ingest_queue.depth > WRITE_BEHIND_MAX_QUEUE // 2:
+        return {"next_report_after": REPORT_INTERVAL * 2}
+    return {}
+
+
+def current_route():
+    return request.url_rule.rule if request.url_rule else 'desconhecida'
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    route = current_route()
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.get('request_start', time.perf_counter()), route)
+    metrics.REQUESTS.inc(route, request.method, response.status_code)
+    if request.content_length:
+        metrics.PAYLOAD_BYTES.observe(request.content_length, route)
+    return response
+
+
+@app.teardown_request
+def record_unhandled_error(error):
+    if error is not None:
+        metrics.ERRORS.inc(type(error).__name__)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métricas do servidor no formato texto do Prometheus."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+def print_error_report(e, raw_data):
+    """Exibe no console o relatório detalhado de um erro interno."""
+    metrics.ERRORS.inc(type(e).__name__)
+    print(f"\n!!! ERRO INTERNO DETALHADO !!!")
+    print(f"Tipo de Erro: {type(e).__name__}")
+    print(f"Mensagem: {e}")
+    print("--- Traceback Completo ---")
+    traceback.print_exc()
+    print("--- Dados Brutos Recebidos ---")
+    print(raw_data)
+    print("!!! FIM DO RELATÓRIO DE ERRO !!!\n")
 
 
 @app.route('/api/inventory', methods=['POST'])
 def receive_inventory():
     """Endpoint para receber e salvar dados de inventário."""
-    data = request.json
+    with metrics.JSON_PARSE_SECONDS.time(current_route()):
+        data = request.json
 
-    if not data or 'hostname' not in data:
-        return jsonify({"status": "error", "message": "Dados inválidos ou hostname ausente"}), 400
+    error = ingest.validate_document(data)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
 
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-
-        disks_json = json.dumps(data.get('disks', []))
-        monitors_json = json.dumps(data.get('monitors', 'Não coletado'))
-
-        cursor.execute('''
-            INSERT OR REPLACE INTO assets (
-                hostname, id_patrimonio, serial_number, device_model, fabricante, data_compra, fornecedor, custo, garantia_venc,
-                local_fisico, centro_custo, usuario_designado, departamento, status, ultima_manutencao,
-                os, architecture, cpu_model, cpu_cores_physical, cpu_cores_logical, ram_total_gb, ram_slots,
-                mac_address, ip_address, last_updated, disks, storage_health, gpu_info, windows_update_status, installed_software,
-                monitors
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('hostname'), data.get('id_patrimonio'), data.get(
-                'serial_number'), data.get('device_model'), data.get('fabricante'),
-            data.get('data_compra'), data.get('fornecedor'), data.get(
-                'custo'), data.get('garantia_venc'),
-            data.get('local_fisico'), data.get('centro_custo'), data.get('usuario_designado'), data.get(
-                'departamento'), data.get('status'), data.get('ultima_manutencao'),
-            data.get('os'), data.get('architecture'), data.get('cpu_model'), data.get(
-                'cpu_cores_physical'), data.get('cpu_cores_logical'),
-            data.get('ram_total_gb'), data.get('ram_slots'), data.get(
-                'mac_address'), data.get('ip_address'), data.get('last_updated'),
-            disks_json, data.get('storage_health'), data.get('gpu_info'), data.get(
-                'windows_update_status'), data.get('installed_software'),
-            monitors_json
-        ))
-
-        conn.commit()
-        conn.close()
+        if WRITE_BEHIND:
+            if not ingest_queue.submit(data):
+                response = jsonify({"status": "error", "message": "Fila de gravação cheia, tente novamente"})
+                return response, 503, {'Retry-After': '5'}
+            # Seções omitidas são conferidas com os hashes em memória, sem ler o banco
+            missing = section_cache.accept(data)
+            return jsonify({"status": "accepted", "message": f"Dados do host {data.get('hostname')} enfileirados.",
+                            "queue_depth": ingest_queue.depth, "missing_sections": missing,
+                            **report_hint()}), 202
+
+        result = save_documents([data])[0]
 
         print(f"Dados recebidos e salvos do host: {data.get('hostname')}")
-        return jsonify({"status": "success", "message": f"Dados do host {data.get('hostname')} salvos."}), 200
+        return jsonify({"status": "success", "message": f"Dados do host {data.get('hostname')} salvos.",
+                        "changed_sections": result['changed_sections'],
+                        "missing_sections": result['missing_sections'],
+                        **report_hint()}), 200
 
     except Exception as e:
-        print(f"\n!!! ERRO INTERNO DETALHADO !!!")
-        print(f"Tipo de Erro: {type(e).__name__}")
-        print(f"Mensagem: {e}")
-        print("--- Traceback Completo ---")
-        traceback.print_exc()
-        print("--- Dados Brutos Recebidos ---")
-        print(request.data.decode('utf-8', errors='ignore'))
-        print("!!! FIM DO RELATÓRIO DE ERRO !!!\n")
+        print_error_report(e, request.data.decode('utf-8', errors='ignore'))
+        return jsonify({"status": "error", "message": "Erro interno do servidor"}), 500
 
+
+def read_batch_documents():
+    """Lê os documentos do lote: um array JSON ou um fluxo NDJSON (um documento por linha).
+
+    Retorna uma lista de tuplas (documento, erro); linhas NDJSON inválidas
+    geram um erro individual em vez de invalidar o lote inteiro.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        documents = []
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                documents.append((json.loads(line), None))
+            except ValueError:
+                documents.append((None, "Linha NDJSON inválida"))
+        return documents
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return None
+    return [(document, None) for document in data]
+
+
+@app.route('/api/inventory/batch', methods=['POST'])
+def receive_inventory_batch():
+    """Recebe vários documentos de inventário e os grava em uma única transação."""
+    with metrics.JSON_PARSE_SECONDS.time(current_route()):
+        documents = read_batch_documents()
+    if documents is None:
+        return jsonify({"status": "error", "message": "Envie um array JSON ou um fluxo NDJSON de inventários"}), 400
+
+    results = []
+    valid = []
+    for index, (document, error) in enumerate(documents):
+        if error is None:
+            error = ingest.validate_document(document)
+        if error:
+            results.append({"index": index, "status": "error", "message": error})
+            continue
+        valid.append(document)
+        results.append({"index": index, "hostname": document['hostname'], "status": "success"})
+    saved_results = [result for result in results if result['status'] == 'success']
+
+    if not valid:
+        return jsonify({"status": "error", "message": "Nenhum inventário válido no lote", "results": results}), 400
+
+    try:
+        for result, written in zip(saved_results, save_documents(valid)):
+            result['changed_sections'] = written['changed_sections']
+            result['missing_sections'] = written['missing_sections']
+    except Exception as e:
+        print_error_report(e, f"Lote com {len(documents)} documento(s)")
         return jsonify({"status": "error", "message": "Erro interno do servidor"}), 500
 
+    errors = len(results) - len(valid)
+    print(f"Lote recebido: {len(valid)} host(s) salvos, {errors} com erro.")
+    return jsonify({
+        "status": "success" if not errors else "partial",
+        "saved": len(valid),
+        "errors": errors,
+        **report_hint(),
+        "results": results
+    }), 200
+
+
+@app.route('/api/inventory/queue', methods=['GET'])
+def inventory_queue_status():
+    """Informa a profundidade e os contadores da fila de gravação write-behind."""
+    return jsonify({"enabled": WRITE_BEHIND, "depth": ingest_queue.depth, **ingest_queue.stats})
+
+
+@app.route('/api/assets', methods=['GET'])
+def list_assets():
+    """Lista ativos com paginação por hostname, projeção de campos, filtros e ETag.
+
+    Parâmetros: fields, after, limit, status, departamento, os, updated_since, updated_until.
+    """
+    args = request.args
+    fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+    filters = {column: args[column] for column in assets.EQUALITY_FILTERS if column in args}
+    try:
+        limit = int(args.get('limit', 100))
+        with storage.connection(DB_FILE) as conn:
+            items, next_after = assets.list_assets(
+                conn, fields=fields, after=args.get('after'), limit=limit, filters=filters,
+                updated_since=args.get('updated_since'), updated_until=args.get('updated_until'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    response = jsonify({"count": len(items), "next_after": next_after, "items": items})
+    # Páginas inalteradas respondem 304 para quem enviar If-None-Match com o ETag anterior
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@app.route('/api/assets/export', methods=['GET'])
+def export_assets():
+    """Exporta o inventário completo em CSV ou NDJSON, transmitido em pedaços.
+
+    Parâmetros: format (csv ou ndjson), fields, status, departamento, os, updated_since, updated_until.
+    """
+    args = request.args
+    fmt = args.get('format', 'csv')
+    fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+    filters = {column: args[column] for column in assets.EQUALITY_FILTERS if column in args}
+    try:
+        chunks = export.stream(DB_FILE, fmt, fields=fields, filters=filters,
+                               updated_since=args.get('updated_since'), updated_until=args.get('updated_until'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return Response(stream_with_context(chunks), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=inventario.{fmt}'})
+
+
+@app.route('/api/software/hosts', methods=['GET'])
+def software_hosts():
+    """Lista os hosts que têm o software informado (?name=X, com ?prefix=1 para busca por prefixo)."""
+    name = request.args.get('name', '').strip()
+    if not name:
+        return jsonify({"status": "error", "message": "Nome do software não informado"}), 400
+    prefix = request.args.get('prefix') in ('1', 'true')
+    with storage.connection(DB_FILE) as conn:
+        hostnames = software.hosts_with_software(conn, name, prefix=prefix)
+    return jsonify({"software": name, "prefix": prefix, "count": len(hostnames), "hosts": hostnames})
+
+
+@app.route('/api/search', methods=['GET'])
+def search_assets():
+    """Busca textual ranqueada por hostname, usuário, IP, modelo, serial, software e manutenções (?q=, ?limit=)."""
+    text = request.args.get('q', '').strip()
+    if search.match_expression(text) is None:
+        return jsonify({"status": "error", "message": "Termo de busca não informado"}), 400
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Parâmetro 'limit' inválido"}), 400
+    columns = ('hostname', 'device_model', 'usuario_designado', 'ip_address', 'status')
+    with storage.connection(DB_FILE) as conn:
+        results = search.search(conn, text, columns=columns, limit=limit)
+    return jsonify({"query": text, "count": len(results), "results": results})
+
+
+@app.route('/api/hosts/<hostname>/software', methods=['GET'])
+def host_software(hostname):
+    """Lista os softwares instalados em um host."""
+    with storage.connection(DB_FILE) as conn:
+        packages = software.software_on_host(conn, hostname)
+    return jsonify({"hostname": hostname, "count": len(packages),
+                    "software": [{"name": name, "version": version} for name, version in packages]})
+
+
+@app.route('/api/hosts/<hostname>/history', methods=['GET'])
+def host_history(hostname):
+    """Linha do tempo de alterações do host (?field=, ?since=, ?until=, ?limit=)."""
+    args = request.args
+    try:
+        limit = max(1, min(int(args.get('limit', 500)), 5000))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Parâmetro 'limit' inválido"}), 400
+    with storage.connection(DB_FILE) as conn:
+        changes = history.timeline(conn, hostname, field=args.get('field'), since=args.get('since'),
+                                   until=args.get('until'), limit=limit)
+    return jsonify({"hostname": hostname, "count": len(changes), "changes": changes})
+
+
+@app.route('/api/hosts/<hostname>/state', methods=['GET'])
+def host_state(hostname):
+    """Estado reconstruído do host em um instante (?at=AAAA-MM-DDTHH:MM:SS)."""
+    at = request.args.get('at')
+    if not at:
+        return jsonify({"status": "error", "message": "Informe o instante em 'at'"}), 400
+    with storage.connection(DB_FILE) as conn:
+        state = history.state_at(conn, hostname, at)
+    if state is None:
+        return jsonify({"status": "error", "message": "Sem histórico do host nesse instante"}), 404
+    return jsonify({"hostname": hostname, "at": at, "state": state})
+
+
+@app.route('/api/hosts/<hostname>/disks/series', methods=['GET'])
+def host_disk_series(hostname):
+    """Série de uso de disco do host (?mountpoint=, ?resolution=raw|hour|day, ?since=, ?until= em epoch)."""
+    args = request.args
+    try:
+        with storage.connection(DB_FILE) as conn:
+            points = disk_series.series(
+                conn, hostname, mountpoint=args.get('mountpoint'), resolution=args.get('resolution', 'hour'),
+                since=args.get('since', type=int), until=args.get('until', type=int))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"hostname": hostname, "count": len(points), "points": points})
+
+
+@app.route('/api/disks/fastest_filling', methods=['GET'])
+def disks_fastest_filling():
+    """Discos da frota que mais cresceram nos últimos dias (?days=7, ?limit=20), a partir dos agregados diários."""
+    days = request.args.get('days', 7, type=int)
+    limit = request.args.get('limit', 20, type=int)
+    with storage.connection(DB_FILE) as conn:
+        disks = disk_series.fastest_filling(conn, days=max(1, days), limit=max(1, min(limit, 1000)))
+    return jsonify({"days": days, "count": len(disks), "disks": disks})
+
+
+@app.route('/api/disks/at_risk', methods=['GET'])
+def disks_at_risk():
+    """Discos da frota prestes a falhar segundo o SMART (?min_risk=1 alerta, 2 falhando; ?limit=100)."""
+    min_risk = request.args.get('min_risk', disk_health.RISK_WARNING, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    with storage.connection(DB_FILE) as conn:
+        disks = disk_health.at_risk(conn, min_risk=max(disk_health.RISK_WARNING, min_risk),
+                                    limit=max(1, min(limit, 1000)))
+    return jsonify({"min_risk": min_risk, "count": len(disks), "disks": disks})
+
+
+@app.route('/api/hosts/<hostname>/disks/health', methods=['GET'])
+def host_disk_health(hostname):
+    """Saúde (SMART) de cada disco do host, com o nível de risco e os motivos."""
+    with storage.connection(DB_FILE) as conn:
+        disks = disk_health.host_disks(conn, hostname)
+    return jsonify({"hostname": hostname, "count": len(disks), "disks": disks})
+
+
+@app.route('/api/probes/slowest', methods=['GET'])
+def probes_slowest():
+    """Coletas mais lentas da frota pelo percentil das últimas medidas de cada host
+    (?by=p95|p50, ?probe=, ?model=, ?limit=20)."""
+    limit = request.args.get('limit', 20, type=int)
+    ranking = request.args.get('by', 'p95')
+    if ranking not in probe_timings.RANKINGS:
+        return jsonify({"status": "error", "message": "Parâmetro 'by' deve ser 'p50' ou 'p95'"}), 400
+    with storage.connection(DB_FILE) as conn:
+        timings = probe_timings.slowest(conn, probe=request.args.get('probe'), model=request.args.get('model'),
+                                        limit=max(1, min(limit, 1000)), ranking=ranking)
+    return jsonify({"by": ranking, "count": len(timings), "timings": timings})
+
+
+@app.route('/api/probes/summary', methods=['GET'])
+def probes_summary():
+    """p50 e p95 médios, máximo, timeouts e erros de cada coleta na frota (?model= restringe a um modelo)."""
+    model = request.args.get('model')
+    with storage.connection(DB_FILE) as conn:
+        probes = probe_timings.summary(conn, model=model)
+    return jsonify({"model": model, "probes": probes})
+
 
 @app.route('/api/support_status', methods=['GET'])
 def support_status():
-    """Consulta se o serial informado tem suporte (mock)."""
+    """Consulta se o serial informado tem suporte (com cache)."""
     serial = request.args.get('serial')
     if not serial:
         return jsonify({"status": "error", "message": "Serial não informado"}), 400
 
-    if serial[-1].isdigit() and int(serial[-1]) % 2 == 0:
-        return jsonify({"serial": serial, "suporte": True, "mensagem": "Este ativo ainda possui suporte."})
-    else:
-        return jsonify({"serial": serial, "suporte": False, "mensagem": "Este ativo não possui mais suporte."})
+    return jsonify(support_resolver.resolve(serial))
+
+
+@app.route('/api/support_status/batch', methods=['POST'])
+def support_status_batch():
+    """Consulta o suporte de vários seriais de uma vez: {"serials": [...]}."""
+    data = request.get_json(silent=True) or {}
+    serials = data.get('serials')
+    if not isinstance(serials, list) or not serials or not all(isinstance(s, str) and s for s in serials):
+        return jsonify({"status": "error", "message": "Informe 'serials' como uma lista de textos"}), 400
+    if len(serials) > MAX_SUPPORT_BATCH:
+        return jsonify({"status": "error", "message": f"Máximo de {MAX_SUPPORT_BATCH} seriais por lote"}), 400
+
+    results = support_resolver.resolve_many(serials)
+    return jsonify({"count": len(results), "results": [results[serial] for serial in dict.fromkeys(serials)]})
 
 
 if __name__ == '__main__':
@@ -0,0 +1,298 @@
+"""Gerador de frota sintética e benchmark da ingestão de inventários.
+
+Gera documentos com o mesmo formato de get_inventory_data() (agent/collector.py),
+com listas de software (e versões), discos e monitores variadas, 'probe_status' e
+'section_hashes', e mede a ingestão. A 1ª rodada é a primeira ingestão da frota;
+as seguintes são reenvios com pequenas mudanças, compactados como o agente faz
+(seções inalteradas seguem só como hash; --no-compact envia tudo):
+
+  # Via HTTP, contra um servidor já rodando
+  python bench_ingest.py http --hosts 10000 --concurrency 32 --rate 500
+  python bench_ingest.py http --hosts 10000 --batch-size 200 --gzip
+
+  # Direto no caminho de gravação (sem HTTP), em um banco temporário
+  python bench_ingest.py db --hosts 100000 --batch-size 500 --rounds 2
+
+Cada rodada exibe a vazão e as latências p50/p95/p99 (por requisição no modo
+HTTP e por transação no modo db); primeira ingestão e reenvios saem separados.
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Permite importar as seções compartilhadas com o agente ('agent/inventory_sections.py')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent.inventory_sections import SECTIONS, section_hash  # noqa: E402
+
+MODELS = [("Dell Inc.", "Latitude 5420"), ("Dell Inc.", "OptiPlex 7090"), ("LENOVO", "ThinkPad T14 Gen 2"),
+          ("LENOVO", "ThinkCentre M70q"), ("HP", "EliteBook 840 G8"), ("HP", "ProDesk 400 G7")]
+CPUS = ["Intel(R) Core(TM) i5-1145G7 @ 2.60GHz", "Intel(R) Core(TM) i7-10700 CPU @ 2.90GHz",
+        "AMD Ryzen 5 PRO 5650U with Radeon Graphics", "x86_64"]
+SYSTEMS = [("Microsoft Windows 11 Pro", "64 bits"), ("Microsoft Windows 10 Pro", "64 bits"),
+           ("Linux 6.5.0-35-generic", "x86_64"), ("Linux 5.15.0-107-generic", "x86_64")]
+GPUS = ["Intel(R) Iris(R) Xe Graphics", "NVIDIA GeForce GTX 1650", "AMD Radeon(TM) Graphics",
+        "00:02.0 VGA compatible controller: Intel Corporation UHD Graphics 630"]
+MONITORS = [("DEL", "DELL P2419H"), ("LEN", "LEN T24i-20"), ("SAM", "S24F350"), ("AOC", "24B2XH")]
+DEPARTAMENTOS = ["", "Financeiro", "RH", "TI", "Comercial", "Logística"]
+
+# Softwares comuns a quase toda a frota e uma cauda longa de pacotes raros
+COMMON_SOFTWARE = ["Google Chrome", "Mozilla Firefox", "Microsoft Edge", "7-Zip 23.01 (x64)", "Adobe Acrobat Reader",
+                   "Microsoft 365 Apps for enterprise", "Zoom Workplace", "Microsoft Teams", "VLC media player",
+                   "Notepad++ (64-bit x64)", "Java 8 Update 401", "Microsoft Visual C++ 2015-2022 Redistributable"]
+LONG_TAIL_SOFTWARE = [f"{prefix}-{index}" for prefix in ("lib", "python3", "fonts", "app", "driver", "tool")
+                      for index in range(800)]
+
+# Coletas do agente e a faixa de duração (s) de cada uma. As de cache longo
+# aparecem como 'cached' nos reenvios, como no agente real.
+PROBES = {'device_model': (0.05, 0.4), 'serial_number': (0.05, 0.4), 'os_info': (0.05, 0.3),
+          'ram_slots': (0.1, 1.5), 'disks': (0.001, 0.02), 'ip_address': (0.001, 0.05),
+          'storage_health': (0.2, 3.0), 'gpu_info': (0.05, 0.8), 'windows_update_status': (0.5, 6.0),
+          'installed_software': (0.2, 4.0), 'monitors': (0.05, 0.6)}
+CACHED_PROBES = ('device_model', 'serial_number', 'os_info', 'ram_slots', 'gpu_info')
+
+
+def make_version(rnd):
+    return f"{rnd.randint(1, 30)}.{rnd.randint(0, 9)}.{rnd.randint(0, 99)}"
+
+
+def make_probe_status(rnd, repeat=False):
+    """'probe_status' de um relatório: duração de cada coleta ou idade do cache."""
+    status = {}
+    for name, (low, high) in PROBES.items():
+        if repeat and name in CACHED_PROBES:
+            status[name] = {'status': 'cached', 'age': rnd.randint(3600, 6 * 86400)}
+        else:
+            status[name] = {'status': 'ok', 'seconds': round(rnd.uniform(low, high), 3)}
+    return status
+
+
+def with_hashes(document):
+    """Acrescenta 'section_hashes', calculado como no agente."""
+    document['section_hashes'] = {section: section_hash(document, section) for section in SECTIONS}
+    return document
+
+
+def compact(document, previous_hashes):
+    """Cópia sem as seções inalteradas desde o envio anterior (mesma regra do agente)."""
+    compacted = dict(document)
+    for section, columns in SECTIONS.items():
+        if previous_hashes.get(section) == document['section_hashes'][section]:
+            for column in columns:
+                compacted.pop(column, None)
+    return compacted
+
+
+def make_document(index, rnd):
+    """Documento sintético com o formato de get_inventory_data()."""
+    manufacturer, model = rnd.choice(MODELS)
+    system, architecture = rnd.choice(SYSTEMS)
+    cores = rnd.choice([2, 4, 6, 8])
+    software = rnd.sample(COMMON_SOFTWARE, rnd.randint(6, len(COMMON_SOFTWARE)))
+    software += rnd.sample(LONG_TAIL_SOFTWARE, rnd.randint(80, 400))
+    disks = []
+    for number in range(rnd.choice([1, 1, 2, 3, 4])):
+        total = rnd.choice([119.2, 238.5, 476.9, 931.5])
+        used = round(total * rnd.uniform(0.1, 0.95), 2)
+        mountpoint = f"{'CDEF'[number]}:\\" if system.startswith("Microsoft") else ["/", "/home", "/data", "/var"][number]
+        disks.append({'device': mountpoint, 'mountpoint': mountpoint, 'total_gb': total,
+                      'used_gb': used, 'percent_used': round(used / total * 100, 1)})
+    storage_devices = [{'device': "/dev/nvme0n1", 'model': f"{manufacturer} NVMe", 'protocol': "NVMe",
+                        'health': rnd.choice(["PASSED"] * 50 + ["FAILED"]), 'temperature_c': rnd.randint(30, 65),
+                        'wear_percent_used': rnd.randint(0, 100), 'media_errors': rnd.choice([0] * 20 + [3]),
+                        'power_on_hours': rnd.randint(100, 40000)}]
+    monitors = [{"manufacturer": maker, "model": name, "serial_number": f"MN{rnd.randint(10000, 99999)}"}
+                for maker, name in rnd.sample(MONITORS, rnd.randint(0, 3))]
+
+    return with_hashes({
+        'id_patrimonio': "", 'fabricante': "", 'data_compra': "", 'fornecedor': "", 'custo': "",
+        'garantia_venc': "", 'local_fisico': "", 'centro_custo': "",
+        'usuario_designado': f"usuario{index:06d}", 'departamento': rnd.choice(DEPARTAMENTOS),
+        'status': "Em uso", 'ultima_manutencao': "",
+        'hostname': f"BR-NB-{index:06d}",
+        'serial_number': f"SN{rnd.randint(10 ** 7, 10 ** 8 - 1)}",
+        'device_model': f"{manufacturer} {model}",
+        'os': system, 'architecture': architecture, 'cpu_model': rnd.choice(CPUS),
+        'cpu_cores_physical': cores, 'cpu_cores_logical': cores * 2,
+        'ram_total_gb': rnd.choice([7.7, 15.7, 31.7]), 'ram_slots': f"{rnd.choice([1, 2])} slots ocupados",
+        'disks': disks,
+        'mac_address': ":".join(f"{rnd.randint(0, 255):02x}" for _ in range(6)),
+        'ip_address': f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+        'last_updated': datetime.datetime.now().isoformat(),
+        'storage_health': f"{storage_devices[0]['model']}: {storage_devices[0]['health']}",
+        'storage_devices': storage_devices,
+        'gpu_info': rnd.choice(GPUS),
+        'windows_update_status': f"{rnd.randint(5, 80)} atualizações instaladas" if system.startswith("Microsoft") else "Não aplicável",
+        'installed_software': "; ".join(software),
+        'software_versions': {name: make_version(rnd) for name in software},
+        'monitors': monitors or "Nenhum monitor detectado",
+        'probe_status': make_probe_status(rnd),
+    })
+
+
+def drift(document, rnd):
+    """Simula um novo relatório do mesmo host: uso de disco muda, às vezes um pacote novo ou atualizado."""
+    document = dict(document, last_updated=datetime.datetime.now().isoformat(),
+                    probe_status=make_probe_status(rnd, repeat=True))
+    disks = []
+    for disk in document['disks']:
+        used = min(disk['total_gb'], round(disk['used_gb'] + rnd.uniform(0, 0.5), 2))
+        disks.append(dict(disk, used_gb=used, percent_used=round(used / disk['total_gb'] * 100, 1)))
+    document['disks'] = disks
+    if rnd.random() < 0.1:
+        name = f"{rnd.choice(LONG_TAIL_SOFTWARE)}-update"
+        document['installed_software'] += f"; {name}"
+        document['software_versions'] = dict(document['software_versions'], **{name: make_version(rnd)})
+    elif rnd.random() < 0.1:
+        name = rnd.choice(list(document['software_versions']))
+        document['software_versions'] = dict(document['software_versions'], **{name: make_version(rnd)})
+    return with_hashes(document)
+
+
+def generate_fleet(hosts, seed):
+    rnd = random.Random(seed)
+    return [make_document(index, rnd) for index in range(hosts)]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def print_report(title, documents, requests_made, elapsed, latencies, errors):
+    print("=" * 70)
+    print(title)
+    print("=" * 70)
+    print(f"Documentos:        {documents}")
+    print(f"Requisições/lotes: {requests_made} ({errors} com erro)")
+    print(f"Tempo total:       {elapsed:.2f} s")
+    print(f"Vazão:             {documents / elapsed:.1f} documentos/s | {requests_made / elapsed:.1f} req/s")
+    if latencies:
+        print(f"Latência (ms):     p50={percentile(latencies, 0.50) * 1000:.1f} "
+              f"p95={percentile(latencies, 0.95) * 1000:.1f} p99={percentile(latencies, 0.99) * 1000:.1f} "
+              f"média={statistics.mean(latencies) * 1000:.1f} máx={max(latencies) * 1000:.1f}")
+
+
+def round_title(number):
+    return f"rodada {number} ({'primeira ingestão' if number == 1 else 'reenvio'})"
+
+
+def run_http(args, rounds):
+    import requests
+
+    local = threading.local()
+    endpoint = args.url.rstrip('/') + ('/api/inventory/batch' if args.batch_size > 1 else '/api/inventory')
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def send(item):
+        scheduled, documents = item
+        # Controle de taxa: cada requisição tem seu horário de disparo
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        body = json.dumps(documents if args.batch_size > 1 else documents[0]).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if args.gzip:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        start = time.perf_counter()
+        try:
+            response = session().post(endpoint, data=body, headers=headers, timeout=args.timeout)
+            ok = response.status_code in (200, 202)
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    for number, documents in enumerate(rounds, 1):
+        chunks = [documents[start:start + max(1, args.batch_size)]
+                  for start in range(0, len(documents), max(1, args.batch_size))]
+        start = time.perf_counter()
+        interval = 1 / args.rate if args.rate else 0
+        work = [(start + index * interval, chunk) for index, chunk in enumerate(chunks)]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(send, work))
+        elapsed = time.perf_counter() - start
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        print_report(f"HTTP {endpoint} - {round_title(number)}", len(documents), len(chunks), elapsed, latencies, errors)
+
+
+def run_db(args, rounds):
+    import api_receiver
+
+    db_file = args.db or os.path.join(tempfile.mkdtemp(prefix='bench_ingest_'), 'inventory.db')
+    api_receiver.DB_FILE = db_file
+    api_receiver.init_db()
+    print(f"Banco do benchmark: {db_file}")
+
+    for number, documents in enumerate(rounds, 1):
+        latencies = []
+        errors = 0
+        start = time.perf_counter()
+        for offset in range(0, len(documents), args.batch_size):
+            batch = documents[offset:offset + args.batch_size]
+            batch_start = time.perf_counter()
+            try:
+                api_receiver.save_documents(batch)
+            except Exception as e:
+                errors += 1
+                print(f"ERRO no lote {offset // args.batch_size}: {type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - batch_start)
+        elapsed = time.perf_counter() - start
+        print_report(f"DB (save_documents, lotes de {args.batch_size}) - {round_title(number)}",
+                     len(documents), len(latencies), elapsed, latencies, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da ingestão de inventários com uma frota sintética.")
+    parser.add_argument('mode', choices=('http', 'db'), help="http: contra a API; db: direto no caminho de gravação")
+    parser.add_argument('--hosts', type=int, default=1000, help="quantidade de hosts sintéticos")
+    parser.add_argument('--rounds', type=int, default=1,
+                        help="rodadas de relatórios; a partir da 2ª os hosts reenviam com pequenas mudanças")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="documentos por requisição (>1 usa /api/inventory/batch) ou por transação no modo db")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', default="http://127.0.0.1:5000", help="URL base da API (modo http)")
+    parser.add_argument('--concurrency', type=int, default=16, help="requisições simultâneas (modo http)")
+    parser.add_argument('--rate', type=float, default=0, help="requisições por segundo; 0 = sem limite (modo http)")
+    parser.add_argument('--gzip', action='store_true', help="envia os corpos compactados com gzip (modo http)")
+    parser.add_argument('--timeout', type=float, default=30, help="timeout por requisição em segundos (modo http)")
+    parser.add_argument('--db', help="arquivo de banco para o modo db (padrão: temporário)")
+    parser.add_argument('--no-compact', action='store_true',
+                        help="reenvios com o inventário completo, sem omitir as seções inalteradas")
+    args = parser.parse_args()
+    args.batch_size = max(1, args.batch_size)
+
+    print(f"Gerando {args.hosts} documentos sintéticos...")
+    fleet = generate_fleet(args.hosts, args.seed)
+    rnd = random.Random(args.seed + 1)
+    reports = [fleet]
+    for _ in range(args.rounds - 1):
+        reports.append([drift(document, rnd) for document in reports[-1]])
+    rounds = [fleet]
+    for previous, current in zip(reports, reports[1:]):
+        rounds.append(current if args.no_compact else
+                      [compact(document, before['section_hashes']) for before, document in zip(previous, current)])
+
+    if args.mode == 'http':
+        run_http(args, rounds)
+    else:
+        run_db(args, rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Descompressão transparente do corpo das requisições (Content-Encoding).
+
+O middleware WSGI abaixo descompacta corpos gzip (e zstd, se o pacote
+'zstandard' estiver instalado) antes de o Flask ler a requisição, então os
+endpoints continuam usando request.json / request.stream normalmente. O
+tamanho descompactado é limitado para proteger a memória contra "zip bombs".
+
+As recusas (415, 413 e 400) acontecem antes do Flask; quem monta o middleware
+recebe cada uma pelo 'on_error' para registrá-la nas métricas.
+"""
+import io
+import json
+import zlib
+
+from werkzeug.wsgi import get_input_stream
+
+try:
+    import zstandard
+except ImportError:
+    # zstd é opcional: sem o pacote, apenas gzip é aceito
+    zstandard = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+def supported_encodings():
+    """Codificações aceitas pelo servidor, na ordem de preferência."""
+    return ['zstd', 'gzip'] if zstandard else ['gzip']
+
+
+def _decompress_gzip(stream, max_size):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    output = bytearray()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        # 'max_length' impede que um único bloco expanda além do limite
+        output += decompressor.decompress(chunk, max_size + 1 - len(output))
+        if len(output) > max_size or decompressor.unconsumed_tail:
+            raise PayloadTooLarge()
+    output += decompressor.flush()
+    if len(output) > max_size:
+        raise PayloadTooLarge()
+    return bytes(output)
+
+
+def _decompress_zstd(stream, max_size):
+    reader = zstandard.ZstdDecompressor().stream_reader(stream)
+    output = bytearray()
+    while True:
+        chunk = reader.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        output += chunk
+        if len(output) > max_size:
+            raise PayloadTooLarge()
+    return bytes(output)
+
+
+def decompress(stream, encoding, max_size):
+    """Descompacta o conteúdo de 'stream'. Lança ValueError se a codificação não for suportada."""
+    if encoding == 'gzip':
+        return _decompress_gzip(stream, max_size)
+    if encoding == 'zstd' and zstandard:
+        return _decompress_zstd(stream, max_size)
+    raise ValueError(encoding)
+
+
+class DecompressionMiddleware:
+    """Middleware WSGI que descompacta o corpo conforme o cabeçalho Content-Encoding.
+
+    'on_error(environ, status, motivo)' é chamado a cada corpo recusado, com o
+    status HTTP (int) e o motivo ('UnsupportedEncoding', 'PayloadTooLarge' ou
+    'InvalidCompressedBody').
+    """
+
+    def __init__(self, app, max_size, on_error=None):
+        self.app = app
+        self.max_size = max_size
+        self.on_error = on_error
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return self.app(environ, start_response)
+
+        try:
+            # get_input_stream respeita o Content-Length (ou o chunked) da requisição
+            body = decompress(get_input_stream(environ), encoding, self.max_size)
+        except ValueError:
+            return self._error(environ, start_response, '415 Unsupported Media Type', 'UnsupportedEncoding',
+                               f"Content-Encoding '{encoding}' não suportado",
+                               [('Accept-Encoding', ', '.join(supported_encodings()))])
+        except PayloadTooLarge:
+            return self._error(environ, start_response, '413 Payload Too Large', 'PayloadTooLarge',
+                               f"Corpo descompactado excede {self.max_size} bytes")
+        except (zlib.error, EOFError) as e:
+            return self._error(environ, start_response, '400 Bad Request', 'InvalidCompressedBody',
+                               f"Corpo compactado inválido: {e}")
+        except Exception as e:
+            if zstandard and isinstance(e, zstandard.ZstdError):
+                return self._error(environ, start_response, '400 Bad Request', 'InvalidCompressedBody',
+                                   f"Corpo compactado inválido: {e}")
+            raise
+
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        environ.pop('HTTP_CONTENT_ENCODING', None)
+        return self.app(environ, start_response)
+
+    def _error(self, environ, start_response, status, reason, message, extra_headers=()):
+        if self.on_error:
+            self.on_error(environ, int(status.split()[0]), reason)
+        body = json.dumps({"status": "error", "message": message}).encode('utf-8')
+        start_response(status, [('Content-Type', 'application/json'),
+                                ('Content-Length', str(len(body))), *extra_headers])
+        return [body]
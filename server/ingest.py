@@ -0,0 +1,259 @@
+"""Caminho de gravação dos inventários recebidos pela API.
+
+Cada documento é dividido em seções (hardware, software, discos, monitores...)
+e o hash do conteúdo de cada seção fica salvo em 'asset_section_hashes'. Na
+gravação, apenas as colunas das seções cujo hash mudou são reescritas; um
+relatório idêntico ao anterior atualiza somente 'last_updated'.
+
+O agente pode omitir as seções que não mudaram desde o último envio e mandar
+apenas os hashes delas em 'section_hashes'. Se o hash informado não bater com
+o que está salvo, a seção é devolvida em 'missing_sections' para reenvio.
+
+SECTIONS e section_hash() vêm de 'agent/inventory_sections.py', o mesmo
+arquivo usado pelo agente, para que os hashes dos dois lados coincidam.
+"""
+import datetime
+import itertools
+import json
+import threading
+
+from agent.inventory_sections import SECTIONS, section_hash
+from db import disk_health, disk_series, history, probe_timings, search, software
+from db.assets import ASSET_COLUMNS
+
+# Campos das seções que não são colunas de 'assets' ('storage_devices', 'software_versions')
+# vão para tabelas próprias e ficam fora do UPDATE e do histórico campo a campo.
+
+UPSERT_ASSET_SQL = f'''
+    INSERT OR REPLACE INTO assets ({", ".join(ASSET_COLUMNS)})
+    VALUES ({", ".join("?" for _ in ASSET_COLUMNS)})
+'''
+
+UPSERT_HASH_SQL = "INSERT OR REPLACE INTO asset_section_hashes (hostname, section, hash) VALUES (?, ?, ?)"
+
+# Limite de parâmetros por consulta 'IN (...)'
+_CHUNK = 500
+
+
+def column_value(data, column):
+    """Valor de uma coluna da tabela 'assets' a partir do documento recebido."""
+    if column == 'disks':
+        return json.dumps(data.get('disks', []))
+    if column == 'monitors':
+        return json.dumps(data.get('monitors', 'Não coletado'))
+    return data.get(column)
+
+
+def report_time(data, received_at):
+    """Momento em que o relatório foi coletado ('last_updated' do agente).
+
+    Relatórios guardados no spool do agente chegam depois de coletados. Sem um
+    'last_updated' válido (ou com data no futuro) vale o momento do recebimento.
+    """
+    try:
+        collected = datetime.datetime.fromisoformat(data.get('last_updated'))
+    except (TypeError, ValueError):
+        return received_at
+    if collected.tzinfo is not None:
+        collected = collected.astimezone().replace(tzinfo=None)
+    return min(collected, received_at)
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def validate_document(data):
+    """Motivo pelo qual o documento não pode ser gravado, ou None se ele for válido.
+
+    Colunas de 'assets' precisam de valores simples (texto, número, booleano ou
+    null); 'disks' e 'monitors' são gravados como JSON, mas os campos de cada
+    disco também vão para a série de uso e precisam ser simples.
+    """
+    if not isinstance(data, dict):
+        return "Documento de inventário precisa ser um objeto JSON"
+    hostname = data.get('hostname')
+    if not isinstance(hostname, str) or not hostname.strip():
+        return "Dados inválidos ou hostname ausente"
+    for column in ASSET_COLUMNS:
+        if column not in ('disks', 'monitors') and not _is_scalar(data.get(column)):
+            return f"Campo '{column}' precisa ser um valor simples (texto, número ou null)"
+    disks = data.get('disks')
+    if isinstance(disks, list) and not all(
+            not isinstance(disk, dict) or all(_is_scalar(value) for value in disk.values()) for disk in disks):
+        return "Campo 'disks' precisa ser uma lista de objetos com valores simples"
+    versions = data.get('software_versions')
+    if versions is not None and not (isinstance(versions, dict) and all(map(_is_scalar, versions.values()))):
+        return "Campo 'software_versions' precisa ser um objeto nome -> versão"
+    return None
+
+
+def asset_row(data):
+    """Converte um documento de inventário na tupla de valores da tabela 'assets'."""
+    return tuple(column_value(data, column) for column in ASSET_COLUMNS)
+
+
+def _load_state(conn, hostnames):
+    """Retorna os hosts já cadastrados e os hashes salvos de cada um."""
+    existing = set()
+    stored = {}
+    hostnames = list(hostnames)
+    for start in range(0, len(hostnames), _CHUNK):
+        chunk = hostnames[start:start + _CHUNK]
+        marks = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"SELECT hostname FROM assets WHERE hostname IN ({marks})", chunk):
+            existing.add(row[0])
+        for row in conn.execute(
+                f"SELECT hostname, section, hash FROM asset_section_hashes WHERE hostname IN ({marks})", chunk):
+            stored.setdefault(row[0], {})[row[1]] = row[2]
+    return existing, stored
+
+
+def _plan_document(data, exists, known):
+    """Decide quais seções do documento precisam ser gravadas.
+
+    Retorna (hashes novos por seção, seções ausentes que o servidor não conhece).
+    """
+    sent_hashes = data.get('section_hashes')
+    if not isinstance(sent_hashes, dict):
+        sent_hashes = None
+    changed = {}
+    missing = []
+    for section, columns in SECTIONS.items():
+        if sent_hashes is not None and not any(column in data for column in columns):
+            # Seção omitida pelo agente: só é válida se o hash conferir com o salvo
+            if known.get(section) != sent_hashes.get(section):
+                missing.append(section)
+            continue
+        digest = section_hash(data, section)
+        if not exists or known.get(section) != digest:
+            changed[section] = digest
+    return changed, missing
+
+
+class SectionHashCache:
+    """Hashes das seções aceitas de cada host, em memória, para o modo write-behind.
+
+    Responde 'missing_sections' sem ler o banco na requisição. Um host que este
+    processo ainda não viu tem todas as seções omitidas devolvidas como
+    ausentes: o agente reenvia o inventário completo uma vez após um reinício.
+    """
+
+    def __init__(self):
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def accept(self, data):
+        """Registra as seções do documento enfileirado e retorna as omitidas desconhecidas."""
+        with self._lock:
+            known = self._hashes.get(data['hostname'], {})
+            changed, missing = _plan_document(data, True, known)
+            self._hashes[data['hostname']] = {**known, **changed}
+        return missing
+
+
+def write_documents(conn, documents):
+    """Grava os documentos na transação corrente de 'conn', pulando as seções inalteradas.
+
+    Retorna, para cada documento, as seções gravadas e as que precisam ser reenviadas.
+    """
+    existing, stored = _load_state(conn, {data['hostname'] for data in documents})
+    # Momento da coleta de cada documento: relatórios reenviados do spool do agente
+    # entram no histórico e nas séries com a data em que foram coletados
+    received_at = datetime.datetime.now()
+    collected_at = [report_time(data, received_at) for data in documents]
+    stamps = [moment.isoformat(timespec='seconds') for moment in collected_at]
+    host_stamps = {}
+    for data, changed_at in zip(documents, stamps):
+        host_stamps.setdefault(data['hostname'], []).append(changed_at)
+    statements = []
+    hash_rows = []
+    results = []
+    new_hosts = {}
+    # Deltas por campo para o histórico e os valores atuais usados para calculá-los
+    field_changes = {}
+    current_values = {}
+    for data, changed_at in zip(documents, stamps):
+        hostname = data['hostname']
+        known = stored.setdefault(hostname, {})
+        changed, missing = _plan_document(data, hostname in existing, known)
+
+        if hostname not in existing:
+            statements.append((UPSERT_ASSET_SQL, asset_row(data)))
+            existing.add(hostname)
+            new_hosts[hostname] = True
+            current_values[hostname] = dict(zip(ASSET_COLUMNS, asset_row(data)))
+        else:
+            columns = [column for section in changed
+                       for column in SECTIONS[section] if column in ASSET_COLUMNS] + ['last_updated']
+            assignments = ", ".join(f"{column}=?" for column in columns)
+            statements.append((f"UPDATE assets SET {assignments} WHERE hostname=?",
+                               tuple(column_value(data, column) for column in columns) + (hostname,)))
+            tracked = [column for column in columns if column not in history.IGNORED_COLUMNS]
+            if tracked:
+                if hostname not in current_values:
+                    current_values[hostname] = _current_values(conn, hostname)
+                old = current_values[hostname]
+                for column in tracked:
+                    value = column_value(data, column)
+                    if old.get(column) != value:
+                        field_changes.setdefault((hostname, changed_at), []).append((column, value))
+                        old[column] = value
+
+        for section, digest in changed.items():
+            hash_rows.append((hostname, section, digest))
+            known[section] = digest
+        results.append({"hostname": hostname, "changed_sections": sorted(changed), "missing_sections": missing})
+
+    # Hosts sem snapshot (gravados antes do histórico) ganham um ponto de partida antes da mudança
+    changed_hosts = {result['hostname'] for result in results if result['changed_sections']}
+    for hostname in changed_hosts.difference(new_hosts):
+        history.checkpoint(conn, hostname, min(host_stamps[hostname]))
+
+    # Comandos consecutivos com o mesmo SQL vão juntos em um executemany (a ordem é preservada)
+    for sql, group in itertools.groupby(statements, key=lambda statement: statement[0]):
+        conn.executemany(sql, [params for _, params in group])
+    conn.executemany(UPSERT_HASH_SQL, hash_rows)
+    for (hostname, changed_at), changes in field_changes.items():
+        history.record_changes(conn, hostname, changed_at, changes)
+
+    # Catálogo normalizado: só é sincronizado quando a seção de software mudou
+    for data, result, changed_at in zip(documents, results, stamps):
+        if 'software' in result['changed_sections']:
+            added, removed = software.sync_host_software(
+                conn, data['hostname'], software.parse_installed_software(
+                    data.get('installed_software'), data.get('software_versions')))
+            if data['hostname'] not in new_hosts:
+                history.record_software_changes(conn, data['hostname'], changed_at, added, removed)
+
+    # Série temporal de uso de disco: um ponto a cada gravação da seção 'disks'
+    for data, result, moment in zip(documents, results, collected_at):
+        if 'disks' in result['changed_sections']:
+            disk_series.record(conn, data['hostname'], data.get('disks'), moment.timestamp())
+
+    # Saúde dos discos: os discos do host são substituídos quando a seção 'storage' muda
+    for data, result, changed_at in zip(documents, results, stamps):
+        if 'storage' in result['changed_sections']:
+            disk_health.record(conn, data['hostname'], disk_health.rows_from_devices(
+                data['hostname'], data.get('storage_devices'), changed_at))
+
+    # Tempos das coletas: vêm em todo relatório, independente das seções alteradas
+    probe_timings.record(conn, [row for data, changed_at in zip(documents, stamps)
+                                for row in probe_timings.rows_from_status(
+                                    data['hostname'], data.get('probe_status'), changed_at)])
+
+    # Índice de busca textual: só os hosts com alguma seção indexada alterada
+    indexed = [result['hostname'] for result in results
+               if any(section in search.INDEXED_SECTIONS for section in result['changed_sections'])]
+    search.index_hosts(conn, dict.fromkeys(indexed))
+
+    # Hosts novos começam o histórico com um snapshot completo
+    for hostname in new_hosts:
+        history.checkpoint(conn, hostname, max(host_stamps[hostname]), force=True)
+    return results
+
+
+def _current_values(conn, hostname):
+    cursor = conn.execute("SELECT * FROM assets WHERE hostname=?", (hostname,))
+    row = cursor.fetchone()
+    return dict(zip([description[0] for description in cursor.description], row)) if row else {}
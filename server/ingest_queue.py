@@ -0,0 +1,116 @@
+"""Fila de gravação assíncrona (write-behind) para a ingestão de inventários.
+
+No modo write-behind o endpoint apenas valida e enfileira o documento; uma
+thread dedicada esvazia a fila e grava os documentos em grupos (group commit),
+a cada 'max_batch' documentos ou a cada 'max_delay_ms' milissegundos, o que
+ocorrer primeiro. Assim a latência da requisição deixa de depender do fsync.
+Se o commit de um grupo falhar, os documentos são regravados um a um, para que
+um documento com problema não leve junto os demais já confirmados com 202.
+
+O 202 não é durável: a fila fica em memória, então documentos enfileirados se
+perdem se o processo morrer, e um documento que falha sozinho é descartado. Por
+isso o agente só considera um relatório gravado (e atualiza os hashes das
+seções) quando recebe 200.
+"""
+import atexit
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Fila limitada com uma thread escritora que grava os documentos em grupos."""
+
+    def __init__(self, write_batch, max_batch=500, max_delay_ms=200, max_queue=10000):
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'rejected': 0, 'written': 0, 'batches': 0, 'failed': 0}
+
+    @property
+    def depth(self):
+        """Quantidade de documentos aguardando gravação."""
+        return self._queue.qsize()
+
+    def start(self):
+        """Inicia a thread escritora (apenas uma vez) e registra o flush no desligamento."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='inventory-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, document):
+        """Enfileira um documento. Retorna False se a fila estiver cheia ou encerrando."""
+        if self._stopping.is_set():
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait(document)
+        except queue.Full:
+            self._count('rejected')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def stop(self, timeout=30):
+        """Para de aceitar documentos e aguarda a gravação de tudo que já estava na fila."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            print(f"ERRO na gravação em lote ({len(batch)} documento(s)): {type(e).__name__}: {e}")
+            if len(batch) > 1:
+                # Um documento com problema não pode descartar os demais do grupo,
+                # que já foram confirmados com 202: regrava um de cada vez
+                for document in batch:
+                    self._write([document])
+                return
+            self._count('failed')
+            hostname = batch[0].get('hostname') if isinstance(batch[0], dict) else None
+            print(f"ERRO: documento do host {hostname!r} descartado.")
+            return
+        self._count('written', len(batch))
+        self._count('batches')
@@ -0,0 +1,146 @@
+"""Métricas internas do servidor no formato texto do Prometheus.
+
+Implementação mínima, sem dependências: contadores, histogramas e gauges
+calculados na hora da coleta. Cada observação custa um lock e algumas
+somas, então a instrumentação pode ficar ligada em produção.
+"""
+import bisect
+import contextlib
+import threading
+import time
+
+# Limites (segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Limites (bytes) do histograma de tamanho de payload
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [contagens por faixa (+Inf no fim), soma, total]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, *label_values):
+        """Mede a duração do bloco 'with' e registra no histograma."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, ([*series[0]], series[1], series[2])) for key, series in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _labels(self.label_names, label_values, [('le', bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge lido de uma função no momento da coleta."""
+
+    def __init__(self, name, help_text, function):
+        self.name = name
+        self.help = help_text
+        self.function = function
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_number(self.function())}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    'inventory_http_requests_total', 'Requisições HTTP por rota, método e status.', ('route', 'method', 'status')))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'inventory_http_request_duration_seconds', 'Latência das requisições HTTP por rota.', ('route',)))
+PAYLOAD_BYTES = REGISTRY.register(Histogram(
+    'inventory_http_payload_bytes', 'Tamanho do corpo recebido (já descompactado) por rota.', ('route',),
+    buckets=SIZE_BUCKETS))
+JSON_PARSE_SECONDS = REGISTRY.register(Histogram(
+    'inventory_json_parse_seconds', 'Tempo de leitura do JSON/NDJSON recebido por rota.', ('route',)))
+SQLITE_EXECUTE_SECONDS = REGISTRY.register(Histogram(
+    'inventory_sqlite_execute_seconds', 'Tempo executando os comandos de gravação no SQLite.'))
+SQLITE_COMMIT_SECONDS = REGISTRY.register(Histogram(
+    'inventory_sqlite_commit_seconds', 'Tempo do commit das gravações no SQLite.'))
+DOCUMENTS_WRITTEN = REGISTRY.register(Counter(
+    'inventory_documents_written_total', 'Documentos de inventário gravados.'))
+ROWS_WRITTEN = REGISTRY.register(Counter(
+    'inventory_sqlite_rows_written_total', 'Linhas inseridas, alteradas ou removidas pelas gravações.'))
+ERRORS = REGISTRY.register(Counter(
+    'inventory_errors_total', 'Erros internos por tipo de exceção e corpos recusados antes do Flask, por motivo.', ('type',)))
@@ -0,0 +1,193 @@
+"""Consulta de suporte/garantia com cache, coalescência e backend plugável.
+
+O backend real seria o serviço (lento) de garantia do fabricante; aqui o
+padrão é um stub local com a mesma regra do mock original. Os resultados
+passam por três níveis:
+
+1. cache em memória TTL + LRU por serial (inclusive negativo: serial não
+   encontrado ou falha do backend);
+2. tabela 'support_status_cache', para que um reinício não comece frio;
+3. o backend, chamado uma única vez por lote e nunca duas vezes ao mesmo
+   tempo para o mesmo serial (requisições concorrentes aguardam a primeira).
+"""
+import collections
+import importlib
+import threading
+import time
+
+from db import storage
+
+# Validade dos resultados positivos/negativos e das falhas do backend (segundos)
+TTL_SECONDS = 24 * 3600
+NEGATIVE_TTL_SECONDS = 3600
+ERROR_TTL_SECONDS = 60
+MAX_CACHE_ENTRIES = 50000
+# Tempo máximo aguardando a consulta de outra requisição para o mesmo serial
+COALESCE_TIMEOUT_SECONDS = 30
+
+
+class StubBackend:
+    """Backend local: mesma regra do mock original (último dígito par = com suporte)."""
+
+    def lookup_many(self, serials):
+        """Retorna {serial: True/False}; backends reais usam None para serial não encontrado."""
+        return {serial: bool(serial) and serial[-1].isdigit() and int(serial[-1]) % 2 == 0
+                for serial in serials}
+
+
+def load_backend(spec):
+    """Instancia um backend a partir de 'modulo:Classe' (vazio = StubBackend)."""
+    if not spec:
+        return StubBackend()
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def build_result(serial, suporte, error=False):
+    if error:
+        mensagem = "Não foi possível consultar o fornecedor no momento."
+    elif suporte is None:
+        mensagem = "Serial não encontrado no fornecedor."
+    elif suporte:
+        mensagem = "Este ativo ainda possui suporte."
+    else:
+        mensagem = "Este ativo não possui mais suporte."
+    return {"serial": serial, "suporte": suporte, "mensagem": mensagem}
+
+
+class TTLCache:
+    """Cache LRU com validade por entrada."""
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SupportResolver:
+    """Resolve o status de suporte de vários seriais de uma vez."""
+
+    def __init__(self, db_file, backend=None):
+        self.db_file = db_file
+        self.backend = backend or StubBackend()
+        self.cache = TTLCache()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'backend_lookups': 0, 'coalesced': 0, 'backend_errors': 0}
+
+    def resolve(self, serial):
+        return self.resolve_many([serial])[serial]
+
+    def resolve_many(self, serials):
+        """Retorna {serial: resultado} para todos os seriais informados."""
+        results = {}
+        pending = []
+        for serial in dict.fromkeys(serials):
+            cached = self.cache.get(serial)
+            if cached is not None:
+                results[serial] = cached
+            else:
+                pending.append(serial)
+        self._count('memory_hits', len(results))
+
+        if pending:
+            persisted = self._load_persisted(pending)
+            results.update(persisted)
+            self._count('db_hits', len(persisted))
+            pending = [serial for serial in pending if serial not in results]
+
+        if pending:
+            # Coalescência: só consulta os seriais que ninguém mais está consultando agora
+            own, waiting = [], {}
+            with self._lock:
+                for serial in pending:
+                    if serial in self._inflight:
+                        waiting[serial] = self._inflight[serial]
+                    else:
+                        self._inflight[serial] = threading.Event()
+                        own.append(serial)
+            if own:
+                results.update(self._lookup(own))
+            self._count('coalesced', len(waiting))
+            for serial, event in waiting.items():
+                event.wait(COALESCE_TIMEOUT_SECONDS)
+                results[serial] = self.cache.get(serial) or build_result(serial, None, error=True)
+        return results
+
+    def _count(self, name, amount=1):
+        # Chamado por várias requisições ao mesmo tempo: '+=' sem a trava perde contagens
+        if amount:
+            with self._lock:
+                self.stats[name] += amount
+
+    def _lookup(self, serials):
+        results = {}
+        try:
+            self._count('backend_lookups')
+            found = self.backend.lookup_many(serials)
+            persisted = []
+            now = time.time()
+            for serial in serials:
+                suporte = found.get(serial)
+                ttl = TTL_SECONDS if suporte is not None else NEGATIVE_TTL_SECONDS
+                results[serial] = build_result(serial, suporte)
+                self.cache.set(serial, results[serial], ttl)
+                persisted.append((serial, None if suporte is None else int(suporte), now, now + ttl))
+            with storage.connection(self.db_file) as conn:
+                with conn:
+                    conn.executemany('''
+                        INSERT OR REPLACE INTO support_status_cache (serial, suporte, checked_at, expires_at)
+                        VALUES (?, ?, ?, ?)
+                    ''', persisted)
+        except Exception as e:
+            # Falha do backend: cache negativo curto só em memória, para não martelar o fornecedor
+            self._count('backend_errors')
+            print(f"ERRO na consulta de suporte: {type(e).__name__}: {e}")
+            for serial in serials:
+                if serial not in results:
+                    results[serial] = build_result(serial, None, error=True)
+                    self.cache.set(serial, results[serial], ERROR_TTL_SECONDS)
+        finally:
+            with self._lock:
+                for serial in serials:
+                    event = self._inflight.pop(serial, None)
+                    if event:
+                        event.set()
+        return results
+
+    def _load_persisted(self, serials):
+        results = {}
+        now = time.time()
+        with storage.connection(self.db_file) as conn:
+            for start in range(0, len(serials), 500):
+                chunk = serials[start:start + 500]
+                marks = ", ".join("?" for _ in chunk)
+                for serial, suporte, expires_at in conn.execute(
+                        f"SELECT serial, suporte, expires_at FROM support_status_cache "
+                        f"WHERE serial IN ({marks}) AND expires_at > ?", (*chunk, now)):
+                    result = build_result(serial, None if suporte is None else bool(suporte))
+                    results[serial] = result
+                    self.cache.set(serial, result, expires_at - now)
+        return results